@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型客户端复用
+同一组 API 配置在进程内只创建一个客户端，连接池（TCP/TLS连接）在多次请求之间保持复用
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import h2  # noqa: F401  安装后（pip install "httpx[http2]"）使用 HTTP/2，并发请求复用同一条连接
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@lru_cache(maxsize=None)
+def get_openai_client(api_key: str, base_url: Optional[str] = None):
+    """获取 OpenAI 兼容的客户端（按 API 密钥和地址缓存）"""
+    from openai import OpenAI
+    options = {}
+    if HTTP2_AVAILABLE:
+        from openai import DefaultHttpxClient  # 保留 SDK 默认的超时和连接池设置
+        options['http_client'] = DefaultHttpxClient(http2=True)
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        **options
+    )
+
+
+def get_genai():
+    """
+    导入 Gemini SDK
+
+    SDK 较重，只在实际使用 Gemini 模型时才导入，仅使用其他模型时不承担其导入开销
+    """
+    import google.generativeai as genai
+    return genai
+
+
+@lru_cache(maxsize=None)
+def get_gemini_model(api_key: str, model: str):
+    """获取 Gemini 模型实例（按 API 密钥和模型名缓存）"""
+    genai = get_genai()
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model)
+
+
+def close_gemini_stream(response):
+    """
+    结束 Gemini 流式响应（提前停止读取或出错时调用）
+
+    底层的流支持取消时直接取消，服务端随即停止生成；否则读完剩余内容，释放连接
+    """
+    iterator = getattr(response, '_iterator', None)
+    cancel = getattr(iterator, 'cancel', None) or getattr(iterator, 'close', None)
+    try:
+        if cancel is not None:
+            cancel()
+        else:
+            response.resolve()
+    except Exception:
+        pass  # 只用于释放连接，失败不影响已读取的结果
+
+
+def clear_client_cache():
+    """清空已缓存的客户端（配置重新加载后调用）"""
+    get_openai_client.cache_clear()
+    get_gemini_model.cache_clear()
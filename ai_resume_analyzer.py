@@ -5,15 +5,167 @@ AI增强简历分析器 - 使用大模型进行智能分析
 """
 
 import os
-import json
-from typing import Dict, Any
-from dotenv import load_dotenv
-from openai import OpenAI
-import google.generativeai as genai
-from config_manager import get_model_config, is_model_available
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+import env_cache
+from config_manager import get_ai_config_manager, is_model_available, get_required_model_config
+from ai_clients import get_openai_client, get_genai, get_gemini_model, clear_client_cache, close_gemini_stream
+from llm_cache import get_llm_cache, get_semantic_cache
+from text_utils import RESUME_CHAR_LIMIT, embed_text, truncate_text
+import json_utils
 
 # 加载环境变量
-load_dotenv()
+env_cache.load()
+
+# 批量分析时的最大并发请求数
+BATCH_CONCURRENCY = int(os.getenv('AI_BATCH_CONCURRENCY', '8'))
+
+# 期望返回JSON的调用是否使用流式输出，JSON对象结束后立即停止接收
+STREAM_JSON = os.getenv('AI_STREAM_JSON', 'true').lower() == 'true'
+
+# 内容近似的简历是否复用已有分析结果（默认关闭：同一模板填写的不同候选人简历相似度同样很高；
+# 开启后也只在缓存结果中的姓名、邮箱和电话都出现在新简历中时复用）
+RESUME_SEMANTIC_CACHE_ENABLED = os.getenv('RESUME_SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+
+# 比较候选人身份信息时忽略的空白和连字符
+_IDENTITY_SEPARATORS_RE = re.compile(r'[\s\-]+')
+
+# 合并请求时每批最多包含的简历数，以及每批简历文本的总字符数上限
+MARSHAL_BATCH_SIZE = 6
+MARSHAL_CHAR_BUDGET = 12000
+
+# 简历分析结果中使用的字段，模型额外返回的字段会被丢弃
+ANALYSIS_FIELDS = {
+    "name": True,
+    "contact": {"email": True, "phone": True},
+    "education": {"degree": True, "school": True, "major": True, "graduation_year": True},
+    "experience_years": True,
+    "work_experience": {"company": True, "position": True, "period": True, "description": True},
+    "skills": True,
+    "projects": {"name": True, "role": True, "description": True, "technologies": True},
+    "summary": True,
+}
+
+# 简历分析结果的JSON格式说明
+ANALYSIS_JSON_FORMAT = """{
+    "name": "候选人姓名",
+    "contact": {
+        "email": "邮箱地址",
+        "phone": "电话号码"
+    },
+    "education": [
+        {
+            "degree": "学历（如：本科、硕士、博士）",
+            "school": "学校名称",
+            "major": "专业",
+            "graduation_year": "毕业年份"
+        }
+    ],
+    "experience_years": 工作年限（数字）,
+    "work_experience": [
+        {
+            "company": "公司名称",
+            "position": "职位",
+            "period": "工作时间段",
+            "description": "工作描述"
+        }
+    ],
+    "skills": [
+        "技能1", "技能2", "技能3"
+    ],
+    "projects": [
+        {
+            "name": "项目名称",
+            "role": "项目角色",
+            "description": "项目描述",
+            "technologies": ["技术栈1", "技术栈2"]
+        }
+    ],
+    "summary": "简历总结（1-2句话概括候选人的核心优势）"
+}"""
+
+# 系统提示词只包含固定内容（角色与输出格式），可变的简历内容放在用户消息末尾，
+# 使各次请求的提示词前缀保持一致，便于服务商复用前缀缓存
+ANALYSIS_SYSTEM_PROMPT = f"""你是一个专业的HR简历分析助手，擅长从简历中提取关键信息并进行结构化分析。请用中文回答，返回JSON格式的结果。
+
+请按照以下JSON格式返回分析结果：
+{ANALYSIS_JSON_FORMAT}
+
+注意：
+1. 如果某些信息在简历中没有，可以省略或设为空
+2. 技能要尽可能详细提取
+3. 工作年限通过工作经历时间段推算
+4. 只返回JSON，不要有其他解释文字"""
+
+# 匹配分析结果的JSON格式说明
+SCREENING_JSON_FORMAT = """{
+    "match_score": 85,  // 匹配度评分（0-100）
+    "strengths": ["优势1", "优势2"],  // 候选人的优势
+    "weaknesses": ["不足1", "不足2"],  // 候选人的不足
+    "recommendations": "招聘建议",  // 是否推荐面试及原因
+    "key_highlights": ["亮点1", "亮点2"],  // 候选人的亮点
+    "concerns": ["关注点1", "关注点2"]  // 需要关注的问题
+}"""
+
+SCREENING_SYSTEM_PROMPT = f"""你是一个经验丰富的HR专家，擅长评估候选人与职位的匹配度。请用中文回答，返回JSON格式。
+
+请作为专业HR，分析候选人是否匹配职位要求，并返回JSON格式的匹配分析：
+{SCREENING_JSON_FORMAT}
+
+只返回JSON，不要有其他文字。"""
+
+# 简历分析与职位匹配合并为一次调用时使用的系统提示词
+ANALYZE_AND_SCREEN_SYSTEM_PROMPT = f"""你是一个专业的HR简历分析助手和经验丰富的HR专家，擅长从简历中提取关键信息，并评估候选人与职位的匹配度。请用中文回答，返回JSON格式的结果。
+
+请返回如下结构的JSON：
+{{"analysis": 简历分析结果, "screening": 匹配分析结果}}
+
+简历分析结果的格式：
+{ANALYSIS_JSON_FORMAT}
+
+匹配分析结果的格式：
+{SCREENING_JSON_FORMAT}
+
+注意：
+1. 如果某些信息在简历中没有，可以省略或设为空
+2. 技能要尽可能详细提取
+3. 工作年限通过工作经历时间段推算
+4. 只返回JSON，不要有其他解释文字"""
+
+# 筛选时不发送给大模型的记录用字段（文件路径、分析时间、调试用原文等）
+SCREENING_IGNORED_FIELDS = frozenset(['file_path', 'analysis_time', 'raw_text', 'ai_enhanced'])
+
+# 用户提示词模板（模块加载时构建一次，每次请求只做一次拼接）
+ANALYSIS_PROMPT_HEAD = "请分析以下简历内容，提取关键信息。\n\n简历内容：\n"
+SCREENING_PROMPT_TEMPLATE = "职位要求：\n%s\n\n候选人简历分析：\n%s"
+ANALYZE_AND_SCREEN_PROMPT_TEMPLATE = "职位要求：\n%s\n\n简历内容：\n%s"
+
+
+@lru_cache(maxsize=16)
+def _system_message(system_prompt: str) -> Dict[str, str]:
+    """系统消息只有少数几种固定内容，构建一次后重复使用（只读，不要修改）"""
+    return {"role": "system", "content": system_prompt}
+
+
+def _same_candidate(analysis: Dict[str, Any], resume_text: str) -> bool:
+    """分析结果中的姓名、邮箱和电话（至少有一项）都出现在简历文本中，即为同一候选人的简历"""
+    contact = analysis.get('contact')
+    if not isinstance(contact, dict):
+        contact = {}
+    values = [
+        _IDENTITY_SEPARATORS_RE.sub('', str(value))
+        for value in (analysis.get('name'), contact.get('email'), contact.get('phone'))
+        if value
+    ]
+    values = [value for value in values if value]
+    if not values:
+        return False
+    text = _IDENTITY_SEPARATORS_RE.sub('', resume_text)
+    return all(value in text for value in values)
+
 
 class AIResumeAnalyzer:
     """基于大模型的简历分析器"""
@@ -25,35 +177,117 @@ class AIResumeAnalyzer:
         Args:
             model_type: 模型类型，从配置管理器动态获取
         """
-        self.model_type = model_type or os.getenv('DEFAULT_AI_MODEL', 'deepseek')
-        
-        # 检查模型是否可用
-        if not is_model_available(self.model_type):
-            raise ValueError(f"模型 '{self.model_type}' 不可用或配置不完整")
+        self.model_type = model_type or get_ai_config_manager().default_model
         
-        # 获取模型配置
-        config = get_model_config(self.model_type)
-        if not config:
-            raise ValueError(f"无法获取模型 '{self.model_type}' 的配置")
+        # 获取模型配置（模型不可用时抛出 ValueError）
+        config = get_required_model_config(self.model_type)
         
         self.api_key = config['api_key']
         self.base_url = config['base_url']
         self.model = config['model']
         self.display_name = config['display_name']
+        self.json_mode = config.get('json_mode', False)
         
-        # 根据模型类型初始化客户端
+        # 根据模型类型获取客户端（进程内复用，避免重复建立连接）
         if self.model_type == 'gemini':
-            # 初始化 Gemini
-            genai.configure(api_key=self.api_key)
-            self.gemini_model = genai.GenerativeModel(self.model)
+            self._genai = get_genai()
+            self.gemini_model = get_gemini_model(self.api_key, self.model)
             self.client = None
         else:
-            # 初始化 OpenAI 兼容的客户端
-            self.client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
+            self._genai = None
+            self.client = get_openai_client(self.api_key, self.base_url)
             self.gemini_model = None
+        
+        self.cache = get_llm_cache()
+        self.semantic_cache = get_semantic_cache()
+        self._extract = json_utils.compile_projection(ANALYSIS_FIELDS)
+    
+    def _chat(self, system_prompt: str, prompt: str, temperature: float, max_tokens: int, json_output: bool = False) -> str:
+        """
+        调用大模型并返回文本结果
+        
+        Args:
+            system_prompt: 系统提示词
+            prompt: 用户提示词
+            temperature: 采样温度
+            max_tokens: 最大输出token数
+            json_output: 是否期望模型返回JSON；模型配置开启 JSON_MODE 时要求服务商以JSON模式输出，
+                开启 AI_STREAM_JSON 时流式读取，JSON对象结束后立即停止接收
+            
+        Returns:
+            模型返回的文本
+        """
+        json_mode = json_output and self.json_mode
+        stream = json_output and STREAM_JSON
+        
+        if self.model_type == 'gemini':
+            # 使用 Gemini API
+            generation_options = {}
+            if json_mode:
+                generation_options['response_mime_type'] = 'application/json'
+            response = self.gemini_model.generate_content(
+                f"{system_prompt}\n\n{prompt}",
+                generation_config=self._genai.types.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_tokens,
+                    **generation_options
+                ),
+                stream=stream
+            )
+            if stream:
+                try:
+                    return json_utils.read_json_stream(chunk.text for chunk in response)
+                finally:
+                    close_gemini_stream(response)
+            return response.text.strip()
+        
+        # 使用 DeepSeek API (OpenAI兼容)
+        response = self.client.chat.completions.create(
+            stream=stream,
+            **self._completion_params(system_prompt, prompt, temperature, max_tokens, json_mode)
+        )
+        if stream:
+            try:
+                return json_utils.read_json_stream(
+                    chunk.choices[0].delta.content
+                    for chunk in response if chunk.choices
+                )
+            finally:
+                # 提前结束时关闭连接，服务端随即停止生成
+                response.close()
+        return response.choices[0].message.content.strip()
+    
+    def _completion_params(self, system_prompt: str, prompt: str, temperature: float, max_tokens: int, json_mode: bool) -> Dict[str, Any]:
+        """构建 OpenAI 兼容接口的请求参数（在线调用与批处理任务共用）"""
+        params = {
+            "model": self.model,
+            "messages": [
+                _system_message(system_prompt),
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if json_mode:
+            params["response_format"] = {"type": "json_object"}
+        return params
+    
+    def _chat_with_cache(self, system_prompt: str, prompt: str, temperature: float, max_tokens: int, json_output: bool = False):
+        """
+        带缓存的大模型调用
+        
+        Returns:
+            (结果文本, 缓存键)；缓存命中时缓存键为 None，调用方解析成功后再用缓存键写入缓存
+        """
+        cache_key = self.cache.make_key(f"{self.model_type}:{self.model}", temperature, system_prompt, prompt)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached, None
+        
+        return self._chat(system_prompt, prompt, temperature, max_tokens, json_output), cache_key
     
     def analyze_resume_with_ai(self, resume_text: str) -> Dict[str, Any]:
         """
@@ -66,50 +300,37 @@ class AIResumeAnalyzer:
             结构化的简历分析结果
         """
         try:
-            prompt = self._create_analysis_prompt(resume_text)
+            # 近似重复的简历直接复用已有分析结果（需开启 RESUME_SEMANTIC_CACHE_ENABLED，且确认是同一候选人）
+            resume_vector = None
+            if RESUME_SEMANTIC_CACHE_ENABLED:
+                resume_vector = embed_text(truncate_text(resume_text))
+                semantic_namespace = f"{self.model_type}:{self.model}:analysis"
+                cached_text = self.semantic_cache.get(semantic_namespace, resume_vector)
+                if cached_text is not None:
+                    cached_result = self._extract(json_utils.loads(cached_text))
+                    if _same_candidate(cached_result, resume_text):
+                        return cached_result
             
-            if self.model_type == 'gemini':
-                # 使用 Gemini API
-                response = self.gemini_model.generate_content(
-                    f"你是一个专业的HR简历分析助手，擅长从简历中提取关键信息并进行结构化分析。请用中文回答，返回JSON格式的结果。\n\n{prompt}",
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.3,
-                        max_output_tokens=2000,
-                    )
-                )
-                result_text = response.text.strip()
-            else:
-                # 使用 DeepSeek API (OpenAI兼容)
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "你是一个专业的HR简历分析助手，擅长从简历中提取关键信息并进行结构化分析。请用中文回答，返回JSON格式的结果。"
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.3,
-                    max_tokens=2000
-                )
-                result_text = response.choices[0].message.content.strip()
+            prompt = self._create_analysis_prompt(resume_text)
+            result_text, cache_key = self._chat_with_cache(
+                ANALYSIS_SYSTEM_PROMPT,
+                prompt,
+                temperature=0.3,
+                max_tokens=2000,
+                json_output=True
+            )
             
             # 尝试解析JSON
             try:
-                # 移除可能的markdown代码块标记
-                if result_text.startswith('```'):
-                    result_text = result_text.split('```')[1]
-                    if result_text.startswith('json'):
-                        result_text = result_text[4:]
-                    result_text = result_text.strip()
-                
-                analysis_result = json.loads(result_text)
+                result_text = json_utils.strip_code_fence(result_text)
+                analysis_result = self._extract(json_utils.loads(result_text))
+                if cache_key:
+                    self.cache.set(cache_key, result_text)
+                if resume_vector is not None:
+                    self.semantic_cache.add(semantic_namespace, resume_vector, result_text)
                 return analysis_result
                 
-            except json.JSONDecodeError:
+            except json_utils.JSONDecodeError:
                 # 如果无法解析JSON，返回文本结果
                 return {
                     'error': 'AI返回结果格式错误',
@@ -121,58 +342,291 @@ class AIResumeAnalyzer:
                 'error': f'AI分析失败: {str(e)}'
             }
     
+    def analyze_resumes_batch(self, resume_texts: List[str], max_workers: int = None) -> List[Dict[str, Any]]:
+        """
+        并发分析多份简历
+        
+        Args:
+            resume_texts: 简历文本列表
+            max_workers: 最大并发数，默认读取 AI_BATCH_CONCURRENCY
+            
+        Returns:
+            与输入顺序一致的分析结果列表
+        """
+        if not resume_texts:
+            return []
+        
+        # 网络请求为主，使用线程池让多个请求的等待时间重叠
+        max_workers = min(max_workers or BATCH_CONCURRENCY, len(resume_texts))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.analyze_resume_with_ai, resume_texts))
+    
+    def analyze_resumes_marshaled(self, resume_texts: List[str], batch_size: int = MARSHAL_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        将多份简历合并到同一次请求中分析
+        
+        每次调用的网络往返和提示词开销由多份简历分摊，适合大量短简历、
+        且单独请求容易触发服务商速率限制的场景。各批次之间仍然并发执行。
+        
+        Args:
+            resume_texts: 简历文本列表
+            batch_size: 每批最多包含的简历数
+            
+        Returns:
+            与输入顺序一致的分析结果列表
+        """
+        if not resume_texts:
+            return []
+        
+        groups = self._split_marshal_groups(resume_texts, batch_size)
+        results = [None] * len(resume_texts)
+        
+        def analyze_group(indexes):
+            return indexes, self._analyze_marshaled_group([resume_texts[i] for i in indexes])
+        
+        with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(groups))) as executor:
+            for indexes, group_results in executor.map(analyze_group, groups):
+                for index, result in zip(indexes, group_results):
+                    results[index] = result
+        
+        return results
+    
+    def _split_marshal_groups(self, resume_texts: List[str], batch_size: int) -> List[List[int]]:
+        """按简历数量和文本长度将简历分组，返回每组的下标列表"""
+        groups = []
+        current, current_chars = [], 0
+        
+        for index, resume_text in enumerate(resume_texts):
+            length = min(len(resume_text), RESUME_CHAR_LIMIT)
+            if current and (len(current) >= batch_size or current_chars + length > MARSHAL_CHAR_BUDGET):
+                groups.append(current)
+                current, current_chars = [], 0
+            current.append(index)
+            current_chars += length
+        
+        if current:
+            groups.append(current)
+        return groups
+    
+    def _analyze_marshaled_group(self, resume_texts: List[str]) -> List[Dict[str, Any]]:
+        """分析一组简历，模型遗漏或返回格式不符的简历逐份单独分析"""
+        if len(resume_texts) == 1:
+            return [self.analyze_resume_with_ai(resume_texts[0])]
+        
+        sections = '\n\n'.join(
+            f"<<简历 {i}>>\n{truncate_text(resume_text)}\n<<结束 {i}>>"
+            for i, resume_text in enumerate(resume_texts, 1)
+        )
+        prompt = f"""请分别分析以下{len(resume_texts)}份简历，每份简历按系统说明的格式返回分析结果。
+将所有结果放入 results 数组，每一项增加 index 字段表示简历编号：
+{{"results": [{{"index": 1, ...单份简历的分析结果}}]}}
+
+{sections}"""
+        
+        by_index, cache_key, result_text = {}, None, ''
+        try:
+            result_text, cache_key = self._chat_with_cache(
+                ANALYSIS_SYSTEM_PROMPT,
+                prompt,
+                temperature=0.3,
+                max_tokens=min(700 * len(resume_texts), 8000),
+                json_output=True
+            )
+            result_text = json_utils.strip_code_fence(result_text)
+            for item in json_utils.loads(result_text).get('results', []):
+                if not isinstance(item, dict):
+                    continue
+                # 模型可能把编号返回为字符串（"1"），无法转换的项视为遗漏
+                try:
+                    index = int(item.get('index'))
+                except (TypeError, ValueError):
+                    continue
+                by_index[index] = self._extract(item)
+        except Exception:
+            # 合并请求失败时全部回退为逐份分析
+            by_index = {}
+        
+        results = []
+        for i, resume_text in enumerate(resume_texts, 1):
+            if i in by_index:
+                results.append(by_index[i])
+            else:
+                results.append(self.analyze_resume_with_ai(resume_text))
+        
+        # 每份简历都有结果时才缓存（编号越界或重复时命中缓存仍需逐份回退）
+        if cache_key and all(i in by_index for i in range(1, len(resume_texts) + 1)):
+            self.cache.set(cache_key, result_text)
+        return results
+    
+    def submit_analysis_batch(self, resume_texts: List[str]) -> str:
+        """
+        将简历分析提交为服务商的离线批处理任务（Batch API）
+        
+        适合夜间等对时效要求不高的大批量分析，费用和总吞吐量优于逐份在线调用。
+        仅支持提供 Batch API 的 OpenAI 兼容服务，Gemini 暂不支持。
+        
+        Args:
+            resume_texts: 简历文本列表
+            
+        Returns:
+            批处理任务ID，用于 collect_analysis_batch 获取结果
+        """
+        if self.client is None:
+            raise ValueError(f"模型 '{self.model_type}' 不支持批处理任务")
+        
+        lines = []
+        for index, resume_text in enumerate(resume_texts):
+            body = self._completion_params(
+                ANALYSIS_SYSTEM_PROMPT,
+                self._create_analysis_prompt(resume_text),
+                temperature=0.3,
+                max_tokens=2000,
+                json_mode=self.json_mode
+            )
+            lines.append(json_utils.dumps({
+                "custom_id": f"resume-{index}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            }))
+        
+        batch_file = self.client.files.create(
+            file=("resume_analysis_batch.jsonl", "\n".join(lines).encode('utf-8')),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+    
+    def collect_analysis_batch(self, batch_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取批处理任务的分析结果
+        
+        Args:
+            batch_id: submit_analysis_batch 返回的任务ID
+            
+        Returns:
+            与提交顺序一致的分析结果列表；任务尚未完成时返回 None
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in ('failed', 'expired', 'cancelled'):
+            raise RuntimeError(f"批处理任务 {batch_id} 未完成，状态: {batch.status}")
+        if batch.status != 'completed':
+            return None
+        
+        results = {}
+        if batch.output_file_id:
+            content = self.client.files.content(batch.output_file_id).text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                record = json_utils.loads(line)
+                index = int(record['custom_id'].rsplit('-', 1)[1])
+                results[index] = self._parse_batch_record(record)
+        
+        total = batch.request_counts.total if batch.request_counts else len(results)
+        return [
+            results.get(index, {'error': 'AI分析失败: 批处理任务未返回结果'})
+            for index in range(total)
+        ]
+    
+    def _parse_batch_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """解析批处理结果文件中的一行"""
+        response = record.get('response') or {}
+        if record.get('error') or response.get('status_code') != 200:
+            return {'error': f"AI分析失败: {record.get('error') or response.get('body')}"}
+        
+        result_text = response['body']['choices'][0]['message']['content'].strip()
+        try:
+            return self._extract(json_utils.loads(json_utils.strip_code_fence(result_text)))
+        except json_utils.JSONDecodeError:
+            return {
+                'error': 'AI返回结果格式错误',
+                'raw_response': result_text
+            }
+    
+    def batch_analyze(self, resume_texts: List[str], poll_interval: int = 60) -> List[Dict[str, Any]]:
+        """
+        提交批处理任务并等待完成（阻塞，适合离线脚本）
+        
+        Args:
+            resume_texts: 简历文本列表
+            poll_interval: 查询任务状态的间隔秒数
+            
+        Returns:
+            与输入顺序一致的分析结果列表
+        """
+        if not resume_texts:
+            return []
+        
+        batch_id = self.submit_analysis_batch(resume_texts)
+        while True:
+            results = self.collect_analysis_batch(batch_id)
+            if results is not None:
+                return results
+            time.sleep(poll_interval)
+    
     def _create_analysis_prompt(self, resume_text: str) -> str:
         """创建分析提示词"""
-        prompt = f"""请分析以下简历内容，提取关键信息并返回JSON格式的结果。
-
-简历内容：
-{resume_text[:3000]}
-
-请按照以下JSON格式返回分析结果：
-{{
-    "name": "候选人姓名",
-    "contact": {{
-        "email": "邮箱地址",
-        "phone": "电话号码"
-    }},
-    "education": [
-        {{
-            "degree": "学历（如：本科、硕士、博士）",
-            "school": "学校名称",
-            "major": "专业",
-            "graduation_year": "毕业年份"
-        }}
-    ],
-    "experience_years": 工作年限（数字）,
-    "work_experience": [
-        {{
-            "company": "公司名称",
-            "position": "职位",
-            "period": "工作时间段",
-            "description": "工作描述"
-        }}
-    ],
-    "skills": [
-        "技能1", "技能2", "技能3"
-    ],
-    "projects": [
-        {{
-            "name": "项目名称",
-            "role": "项目角色",
-            "description": "项目描述",
-            "technologies": ["技术栈1", "技术栈2"]
-        }}
-    ],
-    "summary": "简历总结（1-2句话概括候选人的核心优势）"
-}}
-
-注意：
-1. 如果某些信息在简历中没有，可以省略或设为空
-2. 技能要尽可能详细提取
-3. 工作年限通过工作经历时间段推算
-4. 只返回JSON，不要有其他解释文字"""
+        return ANALYSIS_PROMPT_HEAD + truncate_text(resume_text)
+    
+    def analyze_and_screen(self, resume_text: str, requirements: str) -> Dict[str, Any]:
+        """
+        一次调用同时完成简历分析和职位匹配分析
         
-        return prompt
+        相比先调用 analyze_resume_with_ai 再调用 enhance_screening_with_ai，
+        省去一次网络往返，也无需把分析结果再次发送给模型。
+        
+        Args:
+            resume_text: 简历文本内容
+            requirements: 职位要求
+            
+        Returns:
+            {'analysis': 简历分析结果, 'screening': AI匹配分析}
+        """
+        try:
+            prompt = ANALYZE_AND_SCREEN_PROMPT_TEMPLATE % (requirements, truncate_text(resume_text))
+            result_text, cache_key = self._chat_with_cache(
+                ANALYZE_AND_SCREEN_SYSTEM_PROMPT,
+                prompt,
+                temperature=0.3,
+                max_tokens=2800,
+                json_output=True
+            )
+            
+            result = json_utils.loads(json_utils.strip_code_fence(result_text))
+            analysis, screening = result.get('analysis'), result.get('screening')
+            if isinstance(analysis, dict) and isinstance(screening, dict):
+                if cache_key:
+                    self.cache.set(cache_key, result_text)
+                return {'analysis': self._extract(analysis), 'screening': screening}
+        except Exception:
+            # 合并调用失败时回退为分别调用
+            pass
+        
+        analysis = self.analyze_resume_with_ai(resume_text)
+        if 'error' in analysis:
+            return {'analysis': analysis, 'screening': analysis}
+        return {'analysis': analysis, 'screening': self.enhance_screening_with_ai(analysis, requirements)}
+    
+    @classmethod
+    def _compact_analysis(cls, value):
+        """去掉空值和记录用字段，减少筛选提示词的长度"""
+        if isinstance(value, dict):
+            compacted = {}
+            for key, item in value.items():
+                if key in SCREENING_IGNORED_FIELDS:
+                    continue
+                item = cls._compact_analysis(item)
+                if item not in (None, '', [], {}):
+                    compacted[key] = item
+            return compacted
+        if isinstance(value, list):
+            return [item for item in map(cls._compact_analysis, value) if item not in (None, '', [], {})]
+        return value
     
     def enhance_screening_with_ai(self, resume_analysis: Dict[str, Any], requirements: str) -> Dict[str, Any]:
         """
@@ -186,66 +640,92 @@ class AIResumeAnalyzer:
             AI增强的匹配分析
         """
         try:
-            prompt = f"""请作为专业HR，分析以下候选人是否匹配职位要求。
-
-职位要求：
-{requirements}
-
-候选人简历分析：
-{json.dumps(resume_analysis, ensure_ascii=False, indent=2)}
-
-请返回JSON格式的匹配分析：
-{{
-    "match_score": 85,  // 匹配度评分（0-100）
-    "strengths": ["优势1", "优势2"],  // 候选人的优势
-    "weaknesses": ["不足1", "不足2"],  // 候选人的不足
-    "recommendations": "招聘建议",  // 是否推荐面试及原因
-    "key_highlights": ["亮点1", "亮点2"],  // 候选人的亮点
-    "concerns": ["关注点1", "关注点2"]  // 需要关注的问题
-}}
-
-只返回JSON，不要有其他文字。"""
+            # 职位要求在同一批筛选中保持不变，放在候选人信息之前
+            prompt = SCREENING_PROMPT_TEMPLATE % (
+                requirements,
+                json_utils.dumps(self._compact_analysis(resume_analysis))
+            )
             
-            if self.model_type == 'gemini':
-                # 使用 Gemini API
-                response = self.gemini_model.generate_content(
-                    f"你是一个经验丰富的HR专家，擅长评估候选人与职位的匹配度。请用中文回答，返回JSON格式。\n\n{prompt}",
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.5,
-                        max_output_tokens=1500,
-                    )
-                )
-                result_text = response.text.strip()
-            else:
-                # 使用 DeepSeek API
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "你是一个经验丰富的HR专家，擅长评估候选人与职位的匹配度。请用中文回答，返回JSON格式。"
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.5,
-                    max_tokens=1500
-                )
-                result_text = response.choices[0].message.content.strip()
+            result_text, cache_key = self._chat_with_cache(
+                SCREENING_SYSTEM_PROMPT,
+                prompt,
+                temperature=0.5,
+                max_tokens=800,
+                json_output=True
+            )
             
             # 解析JSON
-            if result_text.startswith('```'):
-                result_text = result_text.split('```')[1]
-                if result_text.startswith('json'):
-                    result_text = result_text[4:]
-                result_text = result_text.strip()
-            
-            ai_analysis = json.loads(result_text)
+            result_text = json_utils.strip_code_fence(result_text)
+            ai_analysis = json_utils.loads(result_text)
+            if cache_key:
+                self.cache.set(cache_key, result_text)
             return ai_analysis
             
         except Exception as e:
             return {
                 'error': f'AI筛选分析失败: {str(e)}'
             }
+
+
+@lru_cache(maxsize=None)
+def _get_analyzer(model_type: str) -> AIResumeAnalyzer:
+    return AIResumeAnalyzer(model_type=model_type)
+
+
+def get_analyzer(model_type: str = None) -> AIResumeAnalyzer:
+    """
+    获取共享的AI分析器实例（每种模型一个）
+    
+    分析器本身不保存请求相关的状态，可在多个请求和线程之间共享
+    """
+    return _get_analyzer(model_type or get_ai_config_manager().default_model)
+
+
+def clear_analyzer_cache():
+    """清空共享的分析器与客户端（模型配置重新加载后调用）"""
+    _get_analyzer.cache_clear()
+    clear_client_cache()
+
+
+def analyze_dual(resume_text: str, model_types: List[str] = None) -> Dict[str, Any]:
+    """
+    使用多个模型同时分析同一份简历，用于需要交叉验证的重要筛选
+    
+    各模型的请求并发执行，总耗时取决于最慢的模型，而不是各模型耗时之和。
+    
+    Args:
+        resume_text: 简历文本内容
+        model_types: 参与分析的模型列表，默认使用 deepseek 和 gemini
+        
+    Returns:
+        {
+            'results': {模型: 分析结果},
+            'merged': 以第一个成功的模型为准的分析结果,
+            'disagreements': 各模型结果不一致的字段列表
+        }
+    """
+    model_types = [m for m in (model_types or ['deepseek', 'gemini']) if is_model_available(m)]
+    if not model_types:
+        return {'results': {}, 'merged': {'error': '没有可用的AI模型'}, 'disagreements': []}
+    
+    def analyze(model_type):
+        return get_analyzer(model_type).analyze_resume_with_ai(resume_text)
+    
+    with ThreadPoolExecutor(max_workers=len(model_types)) as executor:
+        results = dict(zip(model_types, executor.map(analyze, model_types)))
+    
+    succeeded = [result for result in results.values() if 'error' not in result]
+    if not succeeded:
+        return {'results': results, 'merged': results[model_types[0]], 'disagreements': []}
+    
+    merged = dict(succeeded[0])
+    disagreements = []
+    for field in ANALYSIS_FIELDS:
+        values = [result.get(field) for result in succeeded if field in result]
+        if any(value != values[0] for value in values[1:]):
+            disagreements.append(field)
+        if field not in merged and values:
+            # 主模型遗漏的字段由其他模型补充
+            merged[field] = values[0]
+    
+    return {'results': results, 'merged': merged, 'disagreements': disagreements}
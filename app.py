@@ -5,76 +5,495 @@ HR简历筛选系统 - 主应用程序
 遵循KISS原则，使用Flask轻量级框架
 """
 
-from flask import Flask, request, jsonify, render_template, redirect, url_for
+from flask import Flask, Request, Response, request, jsonify, render_template, redirect, url_for, send_from_directory, stream_with_context
 import os
+import hashlib
+import secrets
+import tempfile
 import sqlite3
+import time
+import threading
+import mimetypes
+import logging
+from urllib.parse import quote
+from logging.handlers import RotatingFileHandler
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
-import json
-from datetime import datetime
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import env_cache
 from resume_analyzer import ResumeAnalyzer
 from resume_screener import ResumeScreener
-from ai_resume_analyzer import AIResumeAnalyzer
+from ai_resume_analyzer import BATCH_CONCURRENCY, get_analyzer, clear_analyzer_cache
 from document_chat import DocumentChatAgent
-from batch_screener import BatchResumeScreener
-from benefit_screener import BenefitScreener
+from batch_screener import get_batch_screener, clear_batch_screener_cache
+from benefit_screener import get_benefit_screener, clear_benefit_screener_cache
 from config_manager import get_ai_config_manager, get_available_models, reload_config
+from db import get_conn
+from pool_store import create_pool
+from pdf_utils import remove_cached_text
+import json_utils
 
 # 加载环境变量
-load_dotenv()
+env_cache.load()
 
-# 初始化代理（在请求时动态创建，以支持模型切换）
-# chat_agent 将在需要时动态创建
+# 日志：同时输出到控制台和按大小滚动的日志文件
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+    handlers=[
+        logging.StreamHandler(),
+        RotatingFileHandler(os.getenv('LOG_FILE', 'app.log'), maxBytes=10 * 1024 * 1024, backupCount=3, encoding='utf-8')
+    ]
+)
 
-# 全局简历池和福利池（跨模型共享）
-global_resume_pool = {}
-global_benefit_pool = {}
+# 共享的基础简历分析器（无请求相关状态，可在线程间共享）
+resume_analyzer = ResumeAnalyzer()
+
+# 共享的规则筛选器（只保存权重配置，可在线程间共享）
+resume_screener = ResumeScreener()
+
+# 文档对话代理（首次使用时创建，对话历史保存在该实例中，需在请求之间共享）
+_chat_agent = None
+
+def get_chat_agent():
+    """获取共享的文档对话代理"""
+    global _chat_agent
+    if _chat_agent is None:
+        _chat_agent = DocumentChatAgent()
+    return _chat_agent
+
+@lru_cache(maxsize=1024)
+def cached_conversation_history(doc_id, version):
+    """
+    按版本号缓存对话历史接口的响应体，历史变化后版本号改变，旧条目不再命中
+    
+    缓存序列化后的字节串（不可变），调用方无法修改已缓存的内容
+    """
+    history = get_chat_agent().get_conversation_history(doc_id)
+    return json_utils.dumps_bytes({
+        'doc_id': doc_id,
+        'history': history,
+        'count': len(history)
+    })
+
+def load_ai_key_flags():
+    """读取是否配置了旧版API密钥（GOOGLE_API_KEY / OPENAI_API_KEY），决定是否启用AI增强分析"""
+    return {
+        'gemini': os.getenv('GOOGLE_API_KEY') is not None,
+        'default': os.getenv('OPENAI_API_KEY') is not None
+    }
+
+ai_key_flags = load_ai_key_flags()
+
+def requested_model_type(params):
+    """请求参数中指定的模型，未指定时使用默认模型（配置加载时读取一次，不必每次请求读取环境变量）"""
+    return params.get('model_type', get_ai_config_manager().default_model)
+
+def is_true(value):
+    """解析请求中的布尔参数：JSON 的 true / 1，或字符串 "true" / "1"（不区分大小写），其余均为 False"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1')
+    return value is True or (type(value) is int and value == 1)
+
+def is_ai_enabled(model_type):
+    """检查指定模型是否启用AI增强分析"""
+    return ai_key_flags['gemini' if model_type == 'gemini' else 'default']
+
+# 全局简历池和福利池（跨模型共享；保存在 POOL_DB_PATH 指定的 SQLite 文件或 REDIS_URL 指定的 Redis 中，多个 worker 进程共享）
+global_resume_pool = create_pool('resume_pool')
+global_benefit_pool = create_pool('benefit_pool')
+# 保护两个全局池的增删与复制（进程内的锁；池保存在 SQLite 或 Redis 中时，不同进程之间的查重与写入不互斥）
+pool_lock = threading.RLock()
+
+# 池状态响应缓存 {池名称: (池版本号, JSON字节串)}，池有增删时版本号变化后重新生成
+pool_status_cache = {}
+# ETag 前缀（进程重启后内存池的版本号从 0 重新计数，避免与重启前的 ETag 混淆）
+POOL_ETAG_PREFIX = secrets.token_hex(4)
+
+class UploadRequest(Request):
+    """表单中的文件直接写入上传目录下的临时文件，保存时建立硬链接即可，不必再复制一遍"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile('wb+', dir=app.config['UPLOAD_FOLDER'], prefix='.upload_')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify 和 request.get_json 使用 json_utils（安装了 orjson 时序列化与解析更快）"""
+    
+    def dumps(self, obj, **kwargs):
+        return json_utils.dumps(obj)
+    
+    def loads(self, s, **kwargs):
+        return json_utils.loads(s)
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+app.json = FastJSONProvider(app)
 app.config['SECRET_KEY'] = 'hr_resume_system_2024'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# 由 Apache / lighttpd 发送下载文件（响应只带 X-Sendfile 头，不经过 Python 读写文件内容）
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+
+# 由 nginx 发送下载文件时的内部路径前缀（如 /protected_uploads/，需在 nginx 中配置为 internal 并指向上传目录）
+X_ACCEL_REDIRECT_PREFIX = os.getenv('X_ACCEL_REDIRECT_PREFIX', '')
+
+# 保存上传文件时的读写缓冲区大小
+UPLOAD_BUFFER_SIZE = 512 * 1024
+
+# 单文件上传接口（文档对话、批量筛选池、福利政策库）的请求体大小上限，/upload 沿用全局上限
+SINGLE_UPLOAD_MAX_LENGTH = int(os.getenv('SINGLE_UPLOAD_MAX_LENGTH', str(10 * 1024 * 1024)))
 
 # 允许的文件扩展名
-ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'txt'}
+ALLOWED_EXTENSIONS = frozenset({'.pdf', '.doc', '.docx', '.txt'})
+# 批量筛选池和福利政策库只支持的格式
+POOL_EXTENSIONS = frozenset({'.pdf', '.txt'})
+# 文档对话只支持PDF
+DOCUMENT_EXTENSIONS = frozenset({'.pdf'})
 
 # 确保上传目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-def allowed_file(filename):
+# 后台分析简历的线程池（/upload 使用 async=true 时）
+upload_executor = ThreadPoolExecutor(max_workers=int(os.getenv('UPLOAD_WORKERS', '4')))
+
+# 筛选时并发请求AI的线程池（各请求共用，避免每次筛选都创建线程）
+screening_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY)
+
+def allowed_file(filename, extensions=ALLOWED_EXTENSIONS):
     """检查文件扩展名是否允许"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1].lower() in extensions
 
-def init_database():
-    """初始化数据库"""
-    conn = sqlite3.connect('resumes.db')
-    cursor = conn.cursor()
-    
-    # 创建简历表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS resumes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            filename TEXT NOT NULL,
-            original_name TEXT NOT NULL,
-            upload_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-            analysis_result TEXT,
-            file_path TEXT NOT NULL
-        )
-    ''')
-    
-    # 创建筛选记录表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS screening_records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            requirements TEXT NOT NULL,
-            results TEXT,
-            created_time DATETIME DEFAULT CURRENT_TIMESTAMP
+def content_too_large(limit):
+    """请求头声明的请求体长度是否超过上限（在解析表单、写入磁盘之前检查）"""
+    return request.content_length is not None and request.content_length > limit
+
+def json_response(obj, status=200):
+    """返回JSON响应（用于结果较大的接口，序列化速度快于 jsonify）"""
+    return app.response_class(json_utils.dumps_bytes(obj), status=status, mimetype='application/json')
+
+def send_upload(file_path, download_name):
+    """
+    以附件形式发送上传目录中的文件
+    
+    支持条件请求（If-None-Match / If-Modified-Since 返回304）和断点续传，
+    MIME类型按原始文件名判断（PDF、TXT均可）；
+    配置了 X_ACCEL_REDIRECT_PREFIX 时交给 nginx 直接从磁盘发送
+    """
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    if X_ACCEL_REDIRECT_PREFIX:
+        response = app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = X_ACCEL_REDIRECT_PREFIX + quote(os.path.basename(file_path))
+        response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+        return response
+    
+    return send_from_directory(
+        os.path.abspath(app.config['UPLOAD_FOLDER']),  # 与保存文件时一样相对当前工作目录
+        os.path.basename(file_path),
+        as_attachment=True,
+        download_name=download_name,  # 使用原始文件名
+        mimetype=mimetype,
+        conditional=True
+    )
+
+def stream_save(file, file_path):
+    """
+    保存上传的文件
+    
+    文件已由 UploadRequest 写入上传目录时直接建立硬链接，只读取一遍计算哈希；
+    否则流式复制，使用较大的缓冲区减少大文件的读写次数
+    
+    Returns:
+        文件内容的 BLAKE2b 摘要（16字节，用于识别重复上传）
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    temp_path = getattr(file.stream, 'name', None)
+    if isinstance(temp_path, str) and os.path.dirname(temp_path) == os.path.abspath(app.config['UPLOAD_FOLDER']):
+        file.stream.seek(0)  # 同时写出缓冲区中的数据
+        try:
+            os.link(temp_path, file_path)
+        except OSError:
+            pass  # 文件系统不支持硬链接时复制
+        else:
+            while True:
+                chunk = file.stream.read(UPLOAD_BUFFER_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+            return hasher.digest()
+    
+    with open(file_path, 'wb') as f:
+        while True:
+            chunk = file.stream.read(UPLOAD_BUFFER_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            f.write(chunk)
+    return hasher.digest()
+
+def pool_status_response(name, pool, items_key):
+    """
+    返回池状态（文档列表）
+    
+    序列化结果按池的版本号缓存，池未变化时直接返回缓存的字节串；
+    以版本号作为ETag，轮询时池未变化返回 304
+    """
+    version = pool.version  # 先读版本号，读取期间池发生变化时下次请求会重新生成
+    cached = pool_status_cache.get(name)
+    if cached is None or cached[0] != version:
+        with pool_lock:
+            pool_items = list(pool.items())
+        documents = [
+            {
+                'doc_id': doc_id,
+                'filename': data['filename'],
+                'parse_error': data.get('parse_error', False)
+            }
+            for doc_id, data in pool_items
+        ]
+        cached = (version, json_utils.dumps_bytes({'total_count': len(pool_items), items_key: documents}))
+        pool_status_cache[name] = cached
+    
+    response = app.response_class(cached[1], mimetype='application/json')
+    response.set_etag(f'{POOL_ETAG_PREFIX}-{name}-{version}')
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def remove_pool_text_cache(entries):
+    """删除移出池的文档的PDF文本缓存（缓存中保存着简历全文）"""
+    for data in entries:
+        if data.get('file_path'):
+            remove_cached_text(data['file_path'])
+
+def find_pool_duplicate(pool, content_hash):
+    """
+    在全局池中查找内容相同的文档（按内容哈希索引查找，不遍历整个池）
+    
+    返回 (文档ID, 条目)，没有时返回 (None, None)；
+    条目解析失败（parse_error）时调用方不作为重复文件返回，而是用新的解析结果替换
+    """
+    with pool_lock:
+        doc_id = pool.find_by_hash(content_hash)
+        data = pool.get(doc_id) if doc_id is not None else None
+    if data is None or data.get('content_hash') != content_hash:
+        return None, None
+    return doc_id, data
+
+def remove_file(file_path):
+    """删除重复上传的文件（文件已不存在时忽略）"""
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+def replace_failed_pool_entry(failed):
+    """同内容的新文档已替换解析失败的条目后，删除原条目的文件和PDF文本缓存"""
+    if failed is not None:
+        remove_file(failed['file_path'])
+        remove_pool_text_cache([failed])
+
+# 请求处理中反复执行的SQL（文本固定不变，连接的语句缓存可直接复用已编译的语句）
+# 分析失败的简历（重新上传相同内容的文件时重新分析，不作为重复文件返回）
+SQL_RESUME_FAILED = "(status = 'failed' OR json_extract(analysis_result, '$.error') IS NOT NULL)"
+# 相同内容的简历已存在时不写入；已有记录分析失败时用新的结果替换（WHERE 中的字段指已有记录）
+SQL_INSERT_RESUME = f'''
+    INSERT INTO resumes (filename, original_name, analysis_result, file_path, status,
+                         candidate_name, experience_years, skills, skills_count, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (content_hash) DO UPDATE SET
+        filename = excluded.filename, original_name = excluded.original_name,
+        analysis_result = excluded.analysis_result, file_path = excluded.file_path, status = excluded.status,
+        candidate_name = excluded.candidate_name, experience_years = excluded.experience_years,
+        skills = excluded.skills, skills_count = excluded.skills_count
+    WHERE {SQL_RESUME_FAILED}
+'''
+# 筛选时每次从游标读取的行数
+SCREEN_FETCH_SIZE = 256
+SQL_SELECT_SCREENING_RESUMES = 'SELECT id, filename, original_name, analysis_result FROM resumes'
+SQL_SELECT_SCREENING_RESUMES_MIN_YEARS = '''
+    SELECT id, filename, original_name, analysis_result FROM resumes
+    WHERE experience_years >= ? OR experience_years IS NULL
+'''
+SQL_INSERT_SCREENING = 'INSERT INTO screening_records (requirements, results) VALUES (?, ?)'
+SQL_LIST_RESUMES = '''
+    SELECT id, original_name, upload_time, candidate_name, experience_years, skills_count,
+           CASE WHEN skills_count IS NULL THEN analysis_result END
+    FROM resumes ORDER BY upload_time DESC
+'''
+SQL_SELECT_RESUMES_VERSION = 'SELECT version FROM resumes_version WHERE id = 0'
+SQL_SELECT_RESUME_DETAIL = 'SELECT original_name, upload_time, analysis_result FROM resumes WHERE id = ?'
+
+# 全文索引：初始化成功后启用，SQLite 不支持 FTS5 时筛选照常对全部简历进行AI分析
+fts_enabled = False
+
+# 筛选时只对全文检索排名靠前的简历调用AI
+SCREEN_AI_TOP_K = int(os.getenv('SCREEN_AI_TOP_K', '100'))
+
+def ensure_column(cursor, table, column, definition):
+    """为已存在的表补充缺少的列"""
+    columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def extract_resume_features(analysis_result):
+    """
+    从分析结果中提取结构化字段
+    
+    Returns:
+        (候选人姓名, 工作年限, 技能, 技能数量) 技能为小写、按行分隔的文本；分析失败或尚未分析时均为 None
+    """
+    if not analysis_result or 'error' in analysis_result:
+        return None, None, None, None
+    
+    experience_years = analysis_result.get('experience_years')
+    if not isinstance(experience_years, (int, float)) or isinstance(experience_years, bool):
+        experience_years = None
+    
+    skill_list = analysis_result.get('skills') or []
+    skills = '\n'.join(str(skill).lower() for skill in skill_list)
+    return analysis_result.get('name'), experience_years, skills, len(skill_list)
+
+def index_resume_text(cursor, resume_id, analysis_result):
+    """更新简历的全文索引（分析失败或尚未分析的简历不建立索引）"""
+    if not fts_enabled:
+        return
+    
+    cursor.execute('DELETE FROM resume_fts WHERE rowid = ?', (resume_id,))
+    name, _, skills, _ = extract_resume_features(analysis_result)
+    if skills is not None:
+        cursor.execute(
+            'INSERT INTO resume_fts (rowid, candidate_name, skills, content) VALUES (?, ?, ?, ?)',
+            (resume_id, name or '', skills, analysis_result.get('raw_text', ''))
         )
-    ''')
+
+def search_resume_ids(cursor, terms, limit):
+    """
+    按BM25相关度检索包含任一关键词的简历
     
-    conn.commit()
-    conn.close()
+    Returns:
+        相关度最高的简历ID集合；未启用全文索引、没有可检索的关键词或没有匹配结果时返回 None
+    """
+    # trigram 分词要求检索词至少3个字符
+    terms = {term.strip().lower() for term in terms}
+    terms = [term for term in terms if len(term) >= 3]
+    if not fts_enabled or not terms:
+        return None
+    
+    query = ' OR '.join('"' + term.replace('"', '""') + '"' for term in terms)
+    cursor.execute(
+        'SELECT rowid FROM resume_fts WHERE resume_fts MATCH ? ORDER BY bm25(resume_fts) LIMIT ?',
+        (query, limit)
+    )
+    return {row[0] for row in cursor.fetchall()} or None
+
+def init_database():
+    """初始化数据库"""
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        
+        # WAL 模式：写入简历时不阻塞列表、详情等读请求（设置后对数据库文件持久生效）
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
+        # 创建简历表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS resumes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                original_name TEXT NOT NULL,
+                upload_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+                analysis_result TEXT,
+                file_path TEXT NOT NULL
+            )
+        ''')
+        
+        # 分析状态列（后台分析时为 pending，旧数据库升级时补充该列）
+        ensure_column(cursor, 'resumes', 'status', "TEXT DEFAULT 'done'")
+        
+        # 从分析结果中提取的结构化字段，筛选时可直接在SQL中过滤
+        ensure_column(cursor, 'resumes', 'candidate_name', 'TEXT')
+        ensure_column(cursor, 'resumes', 'experience_years', 'REAL')
+        ensure_column(cursor, 'resumes', 'skills', 'TEXT')
+        ensure_column(cursor, 'resumes', 'skills_count', 'INTEGER')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_resumes_experience_years ON resumes (experience_years)')
+        
+        # 为升级前已分析的简历补充结构化字段（与 extract_resume_features 的提取规则一致），
+        # 之后列表接口不再需要解析这些记录的分析结果
+        cursor.execute('''
+            UPDATE resumes SET
+                candidate_name = json_extract(analysis_result, '$.name'),
+                experience_years = CASE
+                    WHEN json_type(analysis_result, '$.experience_years') IN ('integer', 'real')
+                    THEN json_extract(analysis_result, '$.experience_years')
+                END,
+                skills = COALESCE((
+                    SELECT group_concat(lower(value), char(10))
+                    FROM json_each(analysis_result, '$.skills')
+                ), ''),
+                skills_count = COALESCE(json_array_length(analysis_result, '$.skills'), 0)
+            WHERE skills_count IS NULL AND analysis_result IS NOT NULL
+              AND json_valid(analysis_result) AND json_extract(analysis_result, '$.error') IS NULL
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_resumes_upload_time ON resumes (upload_time DESC)')
+        
+        # 文件内容哈希，重复上传同一文件时直接返回已有记录，不再重复分析
+        ensure_column(cursor, 'resumes', 'content_hash', 'BLOB')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_resumes_content_hash ON resumes (content_hash)')
+        
+        # 简历表的版本号：触发器在每次增删改后加一，列表、详情接口按版本号缓存响应（多进程下同样有效）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS resumes_version (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                version INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO resumes_version (id, version) VALUES (0, 0)')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS resumes_version_{event.lower()} AFTER {event} ON resumes
+                BEGIN
+                    UPDATE resumes_version SET version = version + 1 WHERE id = 0;
+                END
+            ''')
+        
+        # 创建筛选记录表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS screening_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                requirements TEXT NOT NULL,
+                results TEXT,
+                created_time DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 全文索引（rowid 与 resumes.id 一致；trigram 分词同时适用于中英文）
+        global fts_enabled
+        try:
+            fts_exists = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'resume_fts'"
+            ).fetchone() is not None
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS resume_fts
+                USING fts5(candidate_name, skills, content, tokenize='trigram')
+            ''')
+            if not fts_exists:
+                # 首次创建时为已有简历建立索引
+                cursor.execute('''
+                    INSERT INTO resume_fts (rowid, candidate_name, skills, content)
+                    SELECT id, COALESCE(json_extract(analysis_result, '$.name'), ''), COALESCE(skills, ''),
+                           COALESCE(json_extract(analysis_result, '$.raw_text'), '')
+                    FROM resumes
+                    WHERE analysis_result IS NOT NULL AND json_extract(analysis_result, '$.error') IS NULL
+                ''')
+            fts_enabled = True
+        except sqlite3.OperationalError as e:
+            app.logger.warning("SQLite 不支持 FTS5 trigram 全文索引，筛选将不使用全文检索: %s", e)
+
+def warm_up_ai_analyzer():
+    """启动时预先创建默认模型的共享分析器，后续请求直接复用其客户端连接"""
+    try:
+        get_analyzer()
+    except Exception as e:
+        app.logger.warning("默认AI分析器初始化失败，将在请求时重试: %s", e)
 
 @app.route('/')
 def index():
@@ -96,9 +515,72 @@ def document_chat():
     """文档对话页面"""
     return render_template('document_chat.html')
 
+def find_resume_by_hash(content_hash):
+    """
+    按内容哈希查找已入库的简历，返回与上传结果相同格式的记录
+    
+    没有记录或已有记录分析失败（需要重新分析）时返回 None
+    """
+    with get_conn() as conn:
+        row = conn.execute(
+            f'SELECT id, original_name, status, analysis_result FROM resumes '
+            f'WHERE content_hash = ? AND NOT {SQL_RESUME_FAILED}',
+            (content_hash,)
+        ).fetchone()
+    
+    if not row:
+        return None
+    
+    resume_id, original_name, status, analysis_json = row
+    return {
+        'id': resume_id,
+        'filename': original_name,
+        'status': status,
+        'analysis': json_utils.loads(analysis_json) if analysis_json else None,
+        'duplicate': True
+    }
+
+def analyze_uploaded_resume(analyzer, ai_analyzer, file_path, use_ai):
+    """分析已保存的简历文件：先用基础分析器提取文本，配置了AI时再进行AI增强分析"""
+    analysis_result = analyzer.analyze_resume(file_path)
+    
+    # 如果配置了AI，使用AI增强分析
+    if use_ai and 'raw_text' in analysis_result:
+        ai_result = ai_analyzer.analyze_resume_with_ai(analysis_result['raw_text'])
+        if 'error' not in ai_result:
+            # 合并AI分析结果
+            analysis_result.update(ai_result)
+            analysis_result['ai_enhanced'] = True
+    
+    return analysis_result
+
+def process_resume_job(resume_id, file_path, model_type, use_ai):
+    """后台任务：分析简历并更新数据库中的分析结果和状态"""
+    try:
+        analysis_result = analyze_uploaded_resume(resume_analyzer, get_analyzer(model_type), file_path, use_ai)
+        status = 'failed' if 'error' in analysis_result else 'done'
+    except Exception as e:
+        analysis_result = {'error': f'分析简历时出错: {str(e)}'}
+        status = 'failed'
+    
+    with get_conn() as conn:
+        conn.execute('''
+            UPDATE resumes SET analysis_result = ?, status = ?, candidate_name = ?, experience_years = ?, skills = ?,
+                               skills_count = ?
+            WHERE id = ?
+        ''', (json_utils.dumps(analysis_result), status, *extract_resume_features(analysis_result), resume_id))
+        index_resume_text(conn.cursor(), resume_id, analysis_result)
+
 @app.route('/upload', methods=['POST'])
 def upload_files():
-    """处理文件上传"""
+    """
+    处理文件上传
+    
+    表单参数 async=true 时只保存文件并立即返回（202），分析在后台进行，
+    可通过 /resume/<id>/status 查询进度。
+    内容与已有简历相同的文件不会重复保存和分析，直接返回已有记录（duplicate=true）。
+    处理某个文件出错时返回 500，出错的文件被删除，之前处理好的文件照常保存（files 中返回其记录）
+    """
     if 'files' not in request.files:
         return jsonify({'error': '没有选择文件'}), 400
     
@@ -106,69 +588,147 @@ def upload_files():
     if not files or files[0].filename == '':
         return jsonify({'error': '没有选择文件'}), 400
     
+    # 先检查全部文件格式，避免保存了前面的文件后才发现后面的文件不支持
+    for file in files:
+        if not file or not allowed_file(file.filename):
+            return jsonify({'error': f'不支持的文件格式: {file.filename}'}), 400
+    
     # 获取模型选择（从表单数据中获取）
-    model_type = request.form.get('model_type', os.getenv('DEFAULT_AI_MODEL', 'deepseek'))
+    model_type = requested_model_type(request.form)
+    run_async = request.form.get('async', 'false').lower() == 'true'
     
     uploaded_files = []
-    analyzer = ResumeAnalyzer()
-    ai_analyzer = AIResumeAnalyzer(model_type=model_type)
+    rows = []  # 待写入数据库的记录
+    new_files = []  # 与 rows 一一对应的返回信息
+    seen_hashes = {}  # 本批次已保存文件的内容哈希 -> 返回信息
+    batch_duplicates = []  # 本批次内的重复文件及其首次出现的文件
+    ai_analyzer = None if run_async else get_analyzer(model_type)
     
     # 检查是否配置了AI
-    if model_type == 'gemini':
-        use_ai = os.getenv('GOOGLE_API_KEY') is not None
-    else:
-        use_ai = os.getenv('OPENAI_API_KEY') is not None
+    use_ai = is_ai_enabled(model_type)
     
-    for file in files:
-        if file and allowed_file(file.filename):
-            # 安全的文件名处理
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-            unique_filename = timestamp + filename
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    # 同一批次共用一个前缀（纳秒时间戳 + 随机串，避免与并发的其他请求重名），用序号区分批次内的文件
+    timestamp = f"{time.time_ns()}_{secrets.token_hex(4)}_"
+    error = None  # 处理某个文件出错时停止处理后续文件，但之前处理好的文件照常保存
+    
+    for i, file in enumerate(files):
+        # 安全的文件名处理
+        filename = secure_filename(file.filename)
+        unique_filename = f"{timestamp}{i:03d}_{filename}"
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+        
+        try:
+            # 保存文件
+            content_hash = stream_save(file, file_path)
             
-            try:
-                # 保存文件
-                file.save(file_path)
-                
-                # 分析简历 - 先用基础分析器提取文本
-                analysis_result = analyzer.analyze_resume(file_path)
-                
-                # 如果配置了AI，使用AI增强分析
-                if use_ai and 'raw_text' in analysis_result:
-                    ai_result = ai_analyzer.analyze_resume_with_ai(analysis_result['raw_text'])
-                    if 'error' not in ai_result:
-                        # 合并AI分析结果
-                        analysis_result.update(ai_result)
-                        analysis_result['ai_enhanced'] = True
-                
-                # 保存到数据库
-                conn = sqlite3.connect('resumes.db')
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO resumes (filename, original_name, analysis_result, file_path)
-                    VALUES (?, ?, ?, ?)
-                ''', (unique_filename, file.filename, json.dumps(analysis_result, ensure_ascii=False), file_path))
-                conn.commit()
-                resume_id = cursor.lastrowid
-                conn.close()
-                
-                uploaded_files.append({
-                    'id': resume_id,
-                    'filename': file.filename,
-                    'analysis': analysis_result
-                })
-                
-            except Exception as e:
-                return jsonify({'error': f'处理文件 {file.filename} 时出错: {str(e)}'}), 500
-        else:
-            return jsonify({'error': f'不支持的文件格式: {file.filename}'}), 400
+            # 重复上传（同一批次中已出现或已入库）时删除刚写入的文件，返回已有记录
+            original = seen_hashes.get(content_hash)
+            duplicate = dict(original, duplicate=True) if original else find_resume_by_hash(content_hash)
+            if duplicate is not None:
+                remove_file(file_path)
+                if original:
+                    batch_duplicates.append((duplicate, original))
+                uploaded_files.append(duplicate)
+                continue
+            
+            if run_async:
+                analysis_result, status = None, 'pending'
+            else:
+                analysis_result = analyze_uploaded_resume(resume_analyzer, ai_analyzer, file_path, use_ai)
+                status = 'failed' if 'error' in analysis_result else 'done'
+            
+            # 先收集，全部处理完后一次性写入数据库
+            rows.append((
+                unique_filename, file.filename,
+                json_utils.dumps(analysis_result) if analysis_result is not None else None,
+                file_path, status, *extract_resume_features(analysis_result), content_hash
+            ))
+            uploaded = {
+                'id': None,
+                'filename': file.filename,
+                'status': status,
+                'analysis': analysis_result
+            }
+            new_files.append(uploaded)
+            uploaded_files.append(uploaded)
+            seen_hashes[content_hash] = uploaded
+            
+        except Exception as e:
+            remove_file(file_path)
+            error = f'处理文件 {file.filename} 时出错: {str(e)}'
+            break
+    
+    # 保存到数据库（同一事务内写入，只提交一次）
+    replaced_files = []  # 被替换的失败记录原来的文件，提交后删除
+    try:
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            for row, uploaded in zip(rows, new_files):
+                existing = cursor.execute(
+                    'SELECT id, file_path FROM resumes WHERE content_hash = ?', (row[-1],)
+                ).fetchone()
+                cursor.execute(SQL_INSERT_RESUME, row)
+                if cursor.rowcount == 0:
+                    # 其他请求已先写入了相同内容的简历
+                    remove_file(row[3])
+                    uploaded['id'] = existing[0]
+                    uploaded['duplicate'] = True
+                    continue
+                if existing:
+                    # 替换了分析失败的记录（保留原记录ID）
+                    uploaded['id'] = existing[0]
+                    if existing[1] and existing[1] != row[3]:
+                        replaced_files.append(existing[1])
+                else:
+                    uploaded['id'] = cursor.lastrowid
+                if uploaded['analysis'] is not None or existing:
+                    index_resume_text(cursor, uploaded['id'], uploaded['analysis'])
+            cursor.execute('COMMIT')
+    except Exception as e:
+        # 没有写入数据库的文件不再保留
+        for row in rows:
+            remove_file(row[3])
+        return jsonify({'error': f'保存简历时出错: {str(e)}'}), 500
+    
+    for file_path in replaced_files:
+        remove_file(file_path)
+    
+    # 同一批次内的重复文件引用首次出现的文件的记录ID
+    for duplicate, original in batch_duplicates:
+        duplicate['id'] = original['id']
+    
+    if run_async:
+        for row, uploaded in zip(rows, new_files):
+            if not uploaded.get('duplicate'):
+                upload_executor.submit(process_resume_job, uploaded['id'], row[3], model_type, use_ai)
+    
+    if error:
+        # 出错文件之前的文件已保存（files 中为其记录）
+        return jsonify({'error': error, 'files': uploaded_files}), 500
+    
+    if run_async:
+        return jsonify({
+            'message': f'已接收 {len(uploaded_files)} 个文件，正在后台分析',
+            'files': uploaded_files
+        }), 202
     
     return jsonify({
         'message': f'成功上传 {len(uploaded_files)} 个文件',
         'files': uploaded_files
     })
 
+@app.route('/resume/<int:resume_id>/status')
+def get_resume_status(resume_id):
+    """查询简历的后台分析状态（pending / done / failed）"""
+    with get_conn() as conn:
+        row = conn.execute('SELECT status FROM resumes WHERE id = ?', (resume_id,)).fetchone()
+    
+    if not row:
+        return jsonify({'error': '简历不存在'}), 404
+    
+    return jsonify({'id': resume_id, 'status': row[0]})
+
 @app.route('/screen', methods=['POST'])
 def screen_resumes():
     """根据需求筛选简历"""
@@ -177,137 +737,202 @@ def screen_resumes():
         return jsonify({'error': '请输入筛选需求'}), 400
     
     requirements = data['requirements']
-    model_type = data.get('model_type', os.getenv('DEFAULT_AI_MODEL', 'deepseek'))
+    model_type = requested_model_type(data)
+    
+    # strict=true 时直接排除工作年限不满足要求的简历（默认按比例打分，不排除）
+    strict = is_true(data.get('strict', False))
     
     try:
-        # 获取所有简历
-        conn = sqlite3.connect('resumes.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, filename, original_name, analysis_result FROM resumes')
-        resumes = cursor.fetchall()
-        conn.close()
+        screener = resume_screener
+        
+        # 获取简历（严格模式下在SQL中按工作年限预先过滤，缺少结构化字段的旧数据照常参与筛选）
+        parsed_requirements = screener.parse_requirements(requirements)
+        min_years = parsed_requirements['min_experience_years'] if strict else 0
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.arraysize = SCREEN_FETCH_SIZE
+            if min_years:
+                cursor.execute(SQL_SELECT_SCREENING_RESUMES_MIN_YEARS, (min_years,))
+            else:
+                cursor.execute(SQL_SELECT_SCREENING_RESUMES)
+            
+            # 分批读取并立即解析分析结果，不同时保留全部原始JSON文本
+            resumes, analyses = [], []
+            for rows in iter(cursor.fetchmany, []):
+                for resume_id, filename, original_name, analysis_json in rows:
+                    resumes.append((resume_id, filename, original_name))
+                    analyses.append(json_utils.loads(analysis_json) if analysis_json else {})
+            
+            # 全文检索需求中的技能和关键词，只对相关度靠前的简历进行AI分析
+            ai_candidate_ids = search_resume_ids(
+                cursor,
+                parsed_requirements['required_skills'] + parsed_requirements['keywords'],
+                SCREEN_AI_TOP_K
+            )
         
         if not resumes:
+            if min_years:
+                return jsonify({'error': f'没有工作年限满足 {min_years} 年的简历'}), 400
             return jsonify({'error': '没有可筛选的简历'}), 400
         
         # 执行筛选
-        screener = ResumeScreener()
-        ai_analyzer = AIResumeAnalyzer(model_type=model_type)
+        ai_analyzer = get_analyzer(model_type)
         
         # 检查是否配置了AI
-        if model_type == 'gemini':
-            use_ai = os.getenv('GOOGLE_API_KEY') is not None
-        else:
-            use_ai = os.getenv('OPENAI_API_KEY') is not None
+        use_ai = is_ai_enabled(model_type)
+        
+        # AI增强筛选分析（各简历的请求并发执行，总耗时接近单次请求）
+        ai_insights_list = [None] * len(resumes)
+        ai_indexes = [
+            i for i, resume in enumerate(resumes)
+            if ai_candidate_ids is None or resume[0] in ai_candidate_ids
+        ]
+        if use_ai and ai_indexes:
+            insights = screening_executor.map(
+                lambda i: ai_analyzer.enhance_screening_with_ai(analyses[i], requirements),
+                ai_indexes
+            )
+            for i, ai_insights in zip(ai_indexes, insights):
+                ai_insights_list[i] = ai_insights
         
         screening_results = []
         
-        for resume in resumes:
-            resume_id, filename, original_name, analysis_json = resume
-            analysis_result = json.loads(analysis_json) if analysis_json else {}
+        for resume, analysis_result, ai_insights in zip(resumes, analyses, ai_insights_list):
+            resume_id, filename, original_name = resume
             
             # 基础筛选
-            match_score, match_details = screener.screen_resume(analysis_result, requirements)
+            match_score, match_details = screener.screen_resume(analysis_result, requirements, parsed_requirements)
             
-            # AI增强筛选分析
-            ai_insights = None
-            if use_ai:
-                ai_insights = ai_analyzer.enhance_screening_with_ai(analysis_result, requirements)
-                # 如果AI给出了评分，可以与基础评分结合
-                if 'match_score' in ai_insights and 'error' not in ai_insights:
-                    # 综合评分：基础评分70% + AI评分30%
-                    match_score = match_score * 0.7 + ai_insights['match_score'] * 0.3
+            # 如果AI给出了评分，可以与基础评分结合
+            ai_score = ai_insights.get('match_score') if ai_insights and 'error' not in ai_insights else None
+            score_source = 'basic'
+            if isinstance(ai_score, (int, float)) and not isinstance(ai_score, bool):
+                # 综合评分：基础评分70% + AI评分30%
+                match_score = match_score * 0.7 + ai_score * 0.3
+                score_source = 'ai'
             
             screening_results.append({
                 'id': resume_id,
                 'filename': original_name,
                 'match_score': round(match_score, 2),
+                'score_source': score_source,  # ai：基础评分与AI评分的综合评分；basic：只有基础评分
                 'match_details': match_details,
                 'ai_insights': ai_insights,  # 添加AI洞察
                 'analysis': analysis_result
             })
         
-        # 按匹配度排序
-        screening_results.sort(key=lambda x: x['match_score'], reverse=True)
+        # 两种评分不可直接比较，分别按匹配度排序：有AI综合评分的简历在前，只有基础评分的在后
+        screening_results.sort(key=lambda x: (x['score_source'] == 'ai', x['match_score']), reverse=True)
+        
+        # 筛选结果只序列化一次，同时用于保存筛选记录和响应
+        results_json = json_utils.dumps_bytes(screening_results)
         
         # 保存筛选记录
-        conn = sqlite3.connect('resumes.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO screening_records (requirements, results)
-            VALUES (?, ?)
-        ''', (requirements, json.dumps(screening_results, ensure_ascii=False)))
-        conn.commit()
-        conn.close()
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_INSERT_SCREENING, (requirements, results_json.decode('utf-8')))
         
-        return jsonify({
-            'message': '筛选完成',
-            'requirements': requirements,
-            'results': screening_results,
-            'total_count': len(screening_results)
-        })
+        # 分段写出响应，不再拼接出包含全部结果的完整响应体
+        head = json_utils.dumps_bytes({'message': '筛选完成', 'requirements': requirements})
+        return app.response_class(iter((
+            head[:-1], b',"results":', results_json,
+            b',"total_count":', str(len(screening_results)).encode(), b'}'
+        )), mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': f'筛选过程中出错: {str(e)}'}), 500
 
+# 简历列表响应缓存 (简历表版本号, JSON字节串)
+resume_list_cache = None
+
+def get_resumes_version():
+    """读取简历表的版本号（简历有增删改时变化）"""
+    with get_conn() as conn:
+        return conn.execute(SQL_SELECT_RESUMES_VERSION).fetchone()[0]
+
 @app.route('/resumes')
 def list_resumes():
-    """获取所有简历列表"""
-    conn = sqlite3.connect('resumes.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, original_name, upload_time, analysis_result FROM resumes ORDER BY upload_time DESC')
-    resumes = cursor.fetchall()
-    conn.close()
+    """获取所有简历列表（简历表未变化时直接返回缓存的响应）"""
+    global resume_list_cache
+    version = get_resumes_version()
+    cached = resume_list_cache
+    if cached is not None and cached[0] == version:
+        return app.response_class(cached[1], mimetype='application/json')
+    
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        # 摘要直接读取结构化字段；只有还没有这些字段的旧数据才取出分析结果解析
+        cursor.execute(SQL_LIST_RESUMES)
+        resumes = cursor.fetchall()
     
     resume_list = []
     for resume in resumes:
-        resume_id, original_name, upload_time, analysis_json = resume
-        analysis_result = json.loads(analysis_json) if analysis_json else {}
+        resume_id, original_name, upload_time, name, experience_years, skills_count, analysis_json = resume
+        if analysis_json:
+            analysis_result = json_utils.loads(analysis_json)
+            name = analysis_result.get('name', '未识别')
+            experience_years = analysis_result.get('experience_years', 0)
+            skills_count = len(analysis_result.get('skills', []))
         
         resume_list.append({
             'id': resume_id,
             'filename': original_name,
             'upload_time': upload_time,
             'summary': {
-                'name': analysis_result.get('name', '未识别'),
-                'experience_years': analysis_result.get('experience_years', 0),
-                'skills_count': len(analysis_result.get('skills', []))
+                'name': name if name is not None else '未识别',
+                'experience_years': experience_years if experience_years is not None else 0,
+                'skills_count': skills_count or 0
             }
         })
     
-    return jsonify(resume_list)
+    payload = json_utils.dumps_bytes(resume_list)
+    resume_list_cache = (version, payload)
+    return app.response_class(payload, mimetype='application/json')
 
-@app.route('/resume/<int:resume_id>')
-def get_resume_detail(resume_id):
-    """获取简历详情"""
-    conn = sqlite3.connect('resumes.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT original_name, upload_time, analysis_result FROM resumes WHERE id = ?', (resume_id,))
-    resume = cursor.fetchone()
-    conn.close()
+@lru_cache(maxsize=1024)
+def cached_resume_detail(resume_id, version):
+    """按简历表版本号缓存简历详情的JSON字节串，简历不存在时返回 None"""
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_SELECT_RESUME_DETAIL, (resume_id,))
+        resume = cursor.fetchone()
     
     if not resume:
-        return jsonify({'error': '简历不存在'}), 404
+        return None
     
     original_name, upload_time, analysis_json = resume
-    analysis_result = json.loads(analysis_json) if analysis_json else {}
+    analysis_result = json_utils.loads(analysis_json) if analysis_json else {}
     
-    return jsonify({
+    return json_utils.dumps_bytes({
         'id': resume_id,
         'filename': original_name,
         'upload_time': upload_time,
         'analysis': analysis_result
     })
 
+@app.route('/resume/<int:resume_id>')
+def get_resume_detail(resume_id):
+    """获取简历详情"""
+    payload = cached_resume_detail(resume_id, get_resumes_version())
+    if payload is None:
+        return jsonify({'error': '简历不存在'}), 404
+    
+    return app.response_class(payload, mimetype='application/json')
+
 @app.route('/api/available_models', methods=['GET'])
 def api_available_models():
     """API: 获取可用的AI模型列表"""
+    global ai_key_flags
     try:
         # 检查是否需要重新加载配置
         force_reload = request.args.get('reload', 'false').lower() == 'true'
         
         if force_reload:
             config_manager = reload_config()
+            clear_analyzer_cache()
+            clear_batch_screener_cache()
+            clear_benefit_screener_cache()
+            ai_key_flags = load_ai_key_flags()
         else:
             config_manager = get_ai_config_manager()
             
@@ -330,6 +955,9 @@ def api_available_models():
 @app.route('/api/upload_document', methods=['POST'])
 def api_upload_document():
     """API: 上传文档并分析"""
+    if content_too_large(SINGLE_UPLOAD_MAX_LENGTH):
+        return jsonify({'error': '文件过大'}), 413
+    
     if 'file' not in request.files:
         return jsonify({'error': '没有选择文件'}), 400
     
@@ -337,22 +965,21 @@ def api_upload_document():
     if file.filename == '':
         return jsonify({'error': '没有选择文件'}), 400
     
-    if not file.filename.lower().endswith('.pdf'):
+    if not allowed_file(file.filename, DOCUMENT_EXTENSIONS):
         return jsonify({'error': '只支持PDF格式'}), 400
     
     try:
         # 保存文件
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        unique_filename = timestamp + filename
+        unique_filename = f"{time.time_ns()}_{secrets.token_hex(4)}_{filename}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+        stream_save(file, file_path)
         
-        # 生成文档ID
-        doc_id = unique_filename.replace('.pdf', '')
+        # 生成文档ID（移除扩展名）
+        doc_id = os.path.splitext(unique_filename)[0]
         
-        # 使用AI分析文档（动态创建代理）
-        chat_agent = DocumentChatAgent()
+        # 使用AI分析文档
+        chat_agent = get_chat_agent()
         result = chat_agent.analyze_document(file_path, doc_id)
         
         if 'error' in result:
@@ -375,8 +1002,7 @@ def api_chat_with_document():
     message = data['message']
     
     try:
-        # 动态创建代理
-        chat_agent = DocumentChatAgent()
+        chat_agent = get_chat_agent()
         result = chat_agent.chat_with_document(doc_id, message)
         
         if 'error' in result:
@@ -387,6 +1013,36 @@ def api_chat_with_document():
     except Exception as e:
         return jsonify({'error': f'对话时出错: {str(e)}'}), 500
 
+@app.route('/api/chat_with_document_stream', methods=['POST'])
+def api_chat_with_document_stream():
+    """API: 与文档对话（以 Server-Sent Events 流式返回回复）"""
+    data = request.get_json()
+    
+    if not data or 'doc_id' not in data or 'message' not in data:
+        return jsonify({'error': '缺少必要参数'}), 400
+    
+    try:
+        chunks = get_chat_agent().chat_with_document_stream(data['doc_id'], data['message'])
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 400
+    except Exception as e:
+        return jsonify({'error': f'对话时出错: {str(e)}'}), 500
+    
+    def generate():
+        # 每个事件为一行JSON：{"delta": 回复片段}，结束时发送 {"done": true}，出错时发送 {"error": 错误信息}
+        try:
+            for chunk in chunks:
+                yield f"data: {json_utils.dumps({'delta': chunk})}\n\n"
+            yield f"data: {json_utils.dumps({'done': True})}\n\n"
+        except Exception as e:
+            app.logger.exception("流式对话失败")
+            yield f"data: {json_utils.dumps({'error': f'对话时出错: {str(e)}'})}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 禁止反向代理缓冲，片段到达即转发
+    return response
+
 @app.route('/api/clear_conversation', methods=['POST'])
 def api_clear_conversation():
     """API: 清除对话历史"""
@@ -396,8 +1052,7 @@ def api_clear_conversation():
         return jsonify({'error': '缺少文档ID'}), 400
     
     doc_id = data['doc_id']
-    # 动态创建代理
-    chat_agent = DocumentChatAgent()
+    chat_agent = get_chat_agent()
     success = chat_agent.clear_conversation(doc_id)
     
     return jsonify({
@@ -408,20 +1063,24 @@ def api_clear_conversation():
 @app.route('/api/conversation_history/<doc_id>')
 def api_get_conversation_history(doc_id):
     """API: 获取对话历史"""
-    # 动态创建代理
-    chat_agent = DocumentChatAgent()
-    history = chat_agent.get_conversation_history(doc_id)
-    return jsonify({
-        'doc_id': doc_id,
-        'history': history,
-        'count': len(history)
-    })
+    chat_agent = get_chat_agent()
+    version = chat_agent.get_history_version(doc_id)
+    response = app.response_class(cached_conversation_history(doc_id, version), mimetype='application/json')
+    
+    # 以版本号作为ETag，轮询时历史未变化直接返回 304
+    response.set_etag(str(version))
+    response.cache_control.private = True
+    response.cache_control.max_age = 1
+    return response.make_conditional(request)
 
 # ============= 批量筛选相关API =============
 
 @app.route('/api/batch_add_resume', methods=['POST'])
 def api_batch_add_resume():
     """API: 添加简历到批量筛选池（静默处理）"""
+    if content_too_large(SINGLE_UPLOAD_MAX_LENGTH):
+        return jsonify({'success': False, 'error': '文件过大'}), 413
+    
     if 'file' not in request.files:
         return jsonify({'success': False, 'error': '没有选择文件'}), 400
     
@@ -430,8 +1089,7 @@ def api_batch_add_resume():
         return jsonify({'success': False, 'error': '没有选择文件'}), 400
     
     # 支持PDF和TXT格式
-    allowed_extensions = ['.pdf', '.txt']
-    if not any(file.filename.lower().endswith(ext) for ext in allowed_extensions):
+    if not allowed_file(file.filename, POOL_EXTENSIONS):
         return jsonify({'success': False, 'error': '只支持PDF和TXT格式'}), 400
     
     try:
@@ -441,32 +1099,44 @@ def api_batch_add_resume():
         # 获取文件扩展名
         file_extension = os.path.splitext(original_filename)[1].lower()
         
-        # 生成安全的文件名用于存储（使用时间戳+随机数）
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        import random
-        safe_filename = f"{timestamp}{random.randint(1000, 9999)}{file_extension}"
+        # 生成安全的文件名用于存储（纳秒时间戳，附加短随机串避免多线程同时上传时重名）
+        safe_filename = f"{time.time_ns()}_{secrets.token_hex(4)}{file_extension}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
-        file.save(file_path)
+        content_hash = stream_save(file, file_path)
         
-        # 生成文档ID（移除扩展名）
-        doc_id = os.path.splitext(safe_filename)[0]
+        # 相同内容的文件已在池中时不再重复解析
+        existing_id, existing = find_pool_duplicate(global_resume_pool, content_hash)
+        if existing is not None and not existing.get('parse_error'):
+            remove_file(file_path)
+            return jsonify({
+                'success': True,
+                'doc_id': existing_id,
+                'filename': original_filename,
+                'duplicate': True,
+                'message': '简历已在筛选池中'
+            })
+        
+        # 生成文档ID（移除扩展名）；同内容的文档之前解析失败时沿用其ID，新的解析结果替换原条目
+        doc_id = existing_id if existing is not None else os.path.splitext(safe_filename)[0]
         
-        # 使用临时screener来添加简历，然后将结果存入全局池
+        # 使用共享的screener解析简历（写入临时的池），然后将结果存入全局池
         # 获取模型类型（从请求中获取，默认为默认模型）
-        model_type = request.form.get('model_type', os.getenv('DEFAULT_AI_MODEL', 'deepseek'))
-        temp_screener = BatchResumeScreener(model_type=model_type)
-        result = temp_screener.add_resume_to_pool(doc_id, file_path, original_filename)
+        model_type = requested_model_type(request.form)
+        parsed = {}
+        result = get_batch_screener(model_type).add_resume_to_pool(doc_id, file_path, original_filename, parsed)
         
         # 将简历数据添加到全局池
-        if result['success'] and doc_id in temp_screener.resume_pool:
-            global_resume_pool[doc_id] = temp_screener.resume_pool[doc_id]
+        pool_data = parsed.get(doc_id)
+        if result['success'] and pool_data is not None:
+            pool_data['content_hash'] = content_hash
+            with pool_lock:
+                global_resume_pool[doc_id] = pool_data
+            replace_failed_pool_entry(existing)
         
         return jsonify(result)
         
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"批量上传错误: {error_detail}")  # 打印到控制台
+        app.logger.exception("批量上传错误")
         return jsonify({'success': False, 'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/batch_query', methods=['POST'])
@@ -478,16 +1148,15 @@ def api_batch_query():
         return jsonify({'success': False, 'error': '缺少查询参数'}), 400
     
     query = data['query']
-    model_type = data.get('model_type', os.getenv('DEFAULT_AI_MODEL', 'deepseek'))
+    model_type = requested_model_type(data)
     
     try:
-        # 创建临时screener（使用指定的模型）
-        screener = BatchResumeScreener(model_type=model_type)
-        # 将全局池数据复制到临时screener
-        screener.resume_pool = global_resume_pool.copy()
+        # 使用全局池的副本查询（共享的screener，按指定的模型）
+        with pool_lock:
+            pool = global_resume_pool.copy()
         
-        result = screener.query_resumes(query)
-        return jsonify(result)
+        result = get_batch_screener(model_type).query_resumes(query, pool)
+        return json_response(result)
         
     except Exception as e:
         return jsonify({'success': False, 'error': f'查询失败: {str(e)}'}), 500
@@ -496,19 +1165,7 @@ def api_batch_query():
 def api_batch_pool_status():
     """API: 获取简历池状态"""
     try:
-        # 使用全局池计算状态
-        resumes = []
-        for doc_id, data in global_resume_pool.items():
-            resumes.append({
-                'doc_id': doc_id,
-                'filename': data['filename'],
-                'parse_error': data.get('parse_error', False)
-            })
-        
-        return jsonify({
-            'total_count': len(global_resume_pool),
-            'resumes': resumes
-        })
+        return pool_status_response('resume_pool', global_resume_pool, 'resumes')
     except Exception as e:
         return jsonify({'error': f'获取状态失败: {str(e)}'}), 500
 
@@ -516,8 +1173,10 @@ def api_batch_pool_status():
 def api_batch_clear_pool():
     """API: 清空简历池"""
     try:
-        global global_resume_pool
-        global_resume_pool = {}
+        with pool_lock:
+            removed = global_resume_pool.copy()
+            global_resume_pool.clear()
+        remove_pool_text_cache(removed.values())
         return jsonify({
             'success': True,
             'message': '简历池已清空'
@@ -535,8 +1194,10 @@ def api_batch_remove_resume():
     
     try:
         doc_id = data['doc_id']
-        if doc_id in global_resume_pool:
-            del global_resume_pool[doc_id]
+        with pool_lock:
+            removed = global_resume_pool.pop(doc_id, None)
+        if removed is not None:
+            remove_pool_text_cache([removed])
             return jsonify({
                 'success': True,
                 'message': '简历已移除'
@@ -551,10 +1212,10 @@ def api_download_resume(doc_id):
     """API: 下载简历文件"""
     try:
         # 从全局简历池获取文件信息
-        if doc_id not in global_resume_pool:
+        resume_data = global_resume_pool.get(doc_id)
+        if resume_data is None:
             return jsonify({'error': '简历不存在'}), 404
         
-        resume_data = global_resume_pool[doc_id]
         file_path = resume_data['file_path']
         original_filename = resume_data['filename']
         
@@ -563,13 +1224,7 @@ def api_download_resume(doc_id):
             return jsonify({'error': '文件不存在'}), 404
         
         # 发送文件
-        from flask import send_file
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=original_filename,  # 使用原始文件名
-            mimetype='application/pdf'
-        )
+        return send_upload(file_path, original_filename)
         
     except Exception as e:
         return jsonify({'error': f'下载失败: {str(e)}'}), 500
@@ -579,6 +1234,9 @@ def api_download_resume(doc_id):
 @app.route('/api/benefit_add_document', methods=['POST'])
 def api_benefit_add_document():
     """API: 添加福利政策文档到库中（静默处理）"""
+    if content_too_large(SINGLE_UPLOAD_MAX_LENGTH):
+        return jsonify({'success': False, 'error': '文件过大'}), 413
+    
     if 'file' not in request.files:
         return jsonify({'success': False, 'error': '没有选择文件'}), 400
     
@@ -587,8 +1245,7 @@ def api_benefit_add_document():
         return jsonify({'success': False, 'error': '没有选择文件'}), 400
     
     # 支持PDF和TXT格式
-    allowed_extensions = ['.pdf', '.txt']
-    if not any(file.filename.lower().endswith(ext) for ext in allowed_extensions):
+    if not allowed_file(file.filename, POOL_EXTENSIONS):
         return jsonify({'success': False, 'error': '只支持PDF和TXT格式'}), 400
     
     try:
@@ -598,32 +1255,44 @@ def api_benefit_add_document():
         # 获取文件扩展名
         file_extension = os.path.splitext(original_filename)[1].lower()
         
-        # 生成安全的文件名用于存储
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        import random
-        safe_filename = f"benefit_{timestamp}{random.randint(1000, 9999)}{file_extension}"
+        # 生成安全的文件名用于存储（纳秒时间戳，附加短随机串避免多线程同时上传时重名）
+        safe_filename = f"benefit_{time.time_ns()}_{secrets.token_hex(4)}{file_extension}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
-        file.save(file_path)
+        content_hash = stream_save(file, file_path)
         
-        # 生成文档ID（移除扩展名）
-        doc_id = os.path.splitext(safe_filename)[0]
+        # 相同内容的文件已在池中时不再重复解析
+        existing_id, existing = find_pool_duplicate(global_benefit_pool, content_hash)
+        if existing is not None and not existing.get('parse_error'):
+            remove_file(file_path)
+            return jsonify({
+                'success': True,
+                'doc_id': existing_id,
+                'filename': original_filename,
+                'duplicate': True,
+                'message': '文档已在福利政策库中'
+            })
         
-        # 使用临时screener来添加文档，然后将结果存入全局池
+        # 生成文档ID（移除扩展名）；同内容的文档之前解析失败时沿用其ID，新的解析结果替换原条目
+        doc_id = existing_id if existing is not None else os.path.splitext(safe_filename)[0]
+        
+        # 使用共享的screener解析文档（写入临时的池），然后将结果存入全局池
         # 获取模型类型（从请求中获取，默认为默认模型）
-        model_type = request.form.get('model_type', os.getenv('DEFAULT_AI_MODEL', 'deepseek'))
-        temp_screener = BenefitScreener(model_type=model_type)
-        result = temp_screener.add_document_to_pool(doc_id, file_path, original_filename)
+        model_type = requested_model_type(request.form)
+        parsed = {}
+        result = get_benefit_screener(model_type).add_document_to_pool(doc_id, file_path, original_filename, parsed)
         
         # 将文档数据添加到全局池
-        if result['success'] and doc_id in temp_screener.benefit_pool:
-            global_benefit_pool[doc_id] = temp_screener.benefit_pool[doc_id]
+        pool_data = parsed.get(doc_id)
+        if result['success'] and pool_data is not None:
+            pool_data['content_hash'] = content_hash
+            with pool_lock:
+                global_benefit_pool[doc_id] = pool_data
+            replace_failed_pool_entry(existing)
         
         return jsonify(result)
         
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"福利政策上传错误: {error_detail}")
+        app.logger.exception("福利政策上传错误")
         return jsonify({'success': False, 'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/benefit_query', methods=['POST'])
@@ -634,15 +1303,14 @@ def api_benefit_query():
     if not data or 'query' not in data:
         return jsonify({'success': False, 'error': '缺少查询内容'}), 400
     
-    model_type = data.get('model_type', os.getenv('DEFAULT_AI_MODEL', 'deepseek'))
+    model_type = requested_model_type(data)
     
     try:
-        # 创建临时screener（使用指定的模型）
-        screener = BenefitScreener(model_type=model_type)
-        # 将全局池数据复制到临时screener
-        screener.benefit_pool = global_benefit_pool.copy()
+        # 使用全局池的副本查询（共享的screener，按指定的模型）
+        with pool_lock:
+            pool = global_benefit_pool.copy()
         
-        result = screener.query_benefits(data['query'])
+        result = get_benefit_screener(model_type).query_benefits(data['query'], pool)
         return jsonify(result)
     except Exception as e:
         return jsonify({'success': False, 'error': f'查询失败: {str(e)}'}), 500
@@ -651,19 +1319,7 @@ def api_benefit_query():
 def api_benefit_pool_status():
     """API: 获取福利政策库状态"""
     try:
-        # 使用全局池计算状态
-        documents = []
-        for doc_id, data in global_benefit_pool.items():
-            documents.append({
-                'doc_id': doc_id,
-                'filename': data['filename'],
-                'parse_error': data.get('parse_error', False)
-            })
-        
-        return jsonify({
-            'total_count': len(global_benefit_pool),
-            'documents': documents
-        })
+        return pool_status_response('benefit_pool', global_benefit_pool, 'documents')
     except Exception as e:
         return jsonify({'success': False, 'error': f'获取状态失败: {str(e)}'}), 500
 
@@ -671,8 +1327,10 @@ def api_benefit_pool_status():
 def api_benefit_clear_pool():
     """API: 清空福利政策库"""
     try:
-        global global_benefit_pool
-        global_benefit_pool = {}
+        with pool_lock:
+            removed = global_benefit_pool.copy()
+            global_benefit_pool.clear()
+        remove_pool_text_cache(removed.values())
         return jsonify({
             'success': True,
             'message': '福利政策库已清空'
@@ -690,8 +1348,10 @@ def api_benefit_remove_document():
     
     try:
         doc_id = data['doc_id']
-        if doc_id in global_benefit_pool:
-            del global_benefit_pool[doc_id]
+        with pool_lock:
+            removed = global_benefit_pool.pop(doc_id, None)
+        if removed is not None:
+            remove_pool_text_cache([removed])
             return jsonify({
                 'success': True,
                 'message': '文档已移除'
@@ -706,10 +1366,10 @@ def api_download_benefit(doc_id):
     """API: 下载福利政策文档"""
     try:
         # 从全局福利政策池获取文件信息
-        if doc_id not in global_benefit_pool:
+        doc_data = global_benefit_pool.get(doc_id)
+        if doc_data is None:
             return jsonify({'error': '文档不存在'}), 404
         
-        doc_data = global_benefit_pool[doc_id]
         file_path = doc_data['file_path']
         original_filename = doc_data['filename']
         
@@ -718,19 +1378,14 @@ def api_download_benefit(doc_id):
             return jsonify({'error': '文件不存在'}), 404
         
         # 发送文件
-        from flask import send_file
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=original_filename,
-            mimetype='application/pdf'
-        )
+        return send_upload(file_path, original_filename)
         
     except Exception as e:
         return jsonify({'error': f'下载失败: {str(e)}'}), 500
 
 if __name__ == '__main__':
     init_database()
+    warm_up_ai_analyzer()
     # 使用 use_reloader=True 启用自动重载
     # use_debugger=True 启用调试器
     app.run(debug=True, host='0.0.0.0', port=5001, use_reloader=True, use_debugger=True)
@@ -6,15 +6,35 @@
 """
 
 import os
-import json
-from typing import List, Dict, Any
-from dotenv import load_dotenv
-from openai import OpenAI
-import google.generativeai as genai
-from resume_analyzer import ResumeAnalyzer
-from config_manager import get_model_config, is_model_available
+import logging
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
+import env_cache
+from resume_analyzer import ResumeAnalyzer, analyze_resume_file
+from text_utils import embed_text, sparse_terms, sparse_similarity
+from config_manager import get_ai_config_manager, get_required_model_config
+from ai_clients import get_openai_client, get_genai, get_gemini_model, close_gemini_stream
+from llm_cache import get_llm_cache, pool_fingerprint
+from ai_resume_analyzer import BATCH_CONCURRENCY, STREAM_JSON
+import json_utils
 
-load_dotenv()
+env_cache.load()
+
+logger = logging.getLogger(__name__)
+
+# 查询时只把与查询文本最相似的前N份简历发给AI（0 表示发送整个简历池）。
+# 相似度按文本的字词重合计算，会漏掉排在前N之外的简历：按学历、年限等属性查询时
+# 与简历文本重合的字词很少，简历池较大时建议设为 0（分片查询已限制了单次提示词的长度）
+QUERY_TOP_K = int(os.getenv('BATCH_QUERY_TOP_K', '30'))
+
+# 发给AI的简历超过该数量时分片并发查询，再合并各分片的结果（0 表示不分片）
+QUERY_SHARD_SIZE = int(os.getenv('BATCH_QUERY_SHARD_SIZE', '20'))
+
+# 查询时每份简历最多发送的字符数（入池时截取一次，避免token超限）
+PROMPT_TEXT_LIMIT = 3000
 
 class BatchResumeScreener:
     """批量简历筛选器"""
@@ -26,38 +46,33 @@ class BatchResumeScreener:
         Args:
             model_type: 模型类型，从配置管理器动态获取
         """
-        self.model_type = model_type or os.getenv('DEFAULT_AI_MODEL', 'deepseek')
-        
-        # 检查模型是否可用
-        if not is_model_available(self.model_type):
-            raise ValueError(f"模型 '{self.model_type}' 不可用或配置不完整")
+        self.model_type = model_type or get_ai_config_manager().default_model
         
-        # 获取模型配置
-        config = get_model_config(self.model_type)
-        if not config:
-            raise ValueError(f"无法获取模型 '{self.model_type}' 的配置")
+        # 获取模型配置（模型不可用时抛出 ValueError）
+        config = get_required_model_config(self.model_type)
         
         self.api_key = config['api_key']
         self.base_url = config['base_url']
         self.model = config['model']
         self.display_name = config['display_name']
+        self.json_mode = config.get('json_mode', False)
         
-        # 根据模型类型初始化客户端
+        # 根据模型类型获取客户端（进程内复用，避免重复建立连接）
         if self.model_type == 'gemini':
-            genai.configure(api_key=self.api_key)
-            self.gemini_model = genai.GenerativeModel(self.model)
+            self._genai = get_genai()
+            self.gemini_model = get_gemini_model(self.api_key, self.model)
             self.client = None
         else:
-            self.client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
+            self._genai = None
+            self.client = get_openai_client(self.api_key, self.base_url)
             self.gemini_model = None
         
+        self.cache = get_llm_cache()
         self.resume_analyzer = ResumeAnalyzer()
         self.resume_pool = {}  # 存储简历池 {doc_id: {文件信息, 提取的文本}}
+        self._lock = threading.RLock()  # 保护池的增删，避免并发移除与读取冲突
     
-    def add_resume_to_pool(self, doc_id: str, file_path: str, filename: str) -> Dict[str, Any]:
+    def add_resume_to_pool(self, doc_id: str, file_path: str, filename: str, pool: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         将简历添加到池中（静默处理，不返回分析内容）
         
@@ -65,37 +80,41 @@ class BatchResumeScreener:
             doc_id: 文档ID
             file_path: 文件路径
             filename: 原始文件名
+            pool: 简历池 {doc_id: 简历数据}，默认使用自身的池
             
         Returns:
             简单的确认信息（不包含简历内容）
         """
+        pool = self.resume_pool if pool is None else pool
         try:
-            print(f"[批量筛选] 开始处理: {filename}")  # 添加日志
+            logger.debug("[批量筛选] 开始处理: %s", filename)  # 添加日志
             
             # 提取文本
-            analysis_result = self.resume_analyzer.analyze_resume(file_path)
+            analysis_result = analyze_resume_file(file_path, self.resume_analyzer)
             
-            print(f"[批量筛选] 解析结果: {list(analysis_result.keys())}")  # 显示解析的字段
+            logger.debug("[批量筛选] 解析结果: %s", list(analysis_result))  # 显示解析的字段
             
             if 'error' in analysis_result:
-                print(f"[批量筛选] 解析错误: {analysis_result['error']}")  # 记录错误
+                logger.warning("[批量筛选] 解析错误: %s", analysis_result['error'])  # 记录错误
                 # 即使分析失败，也添加到池中，只是标记为未分析
-                self.resume_pool[doc_id] = {
-                    'doc_id': doc_id,
-                    'filename': filename,
-                    'file_path': file_path,
-                    'raw_text': '',
-                    'basic_info': {
-                        'name': filename.replace('.pdf', ''),  # 使用文件名作为临时名称
-                        'contact': {},
-                        'education': [],
-                        'experience_years': 0,
-                        'skills': []
-                    },
-                    'parse_error': True,
-                    'error_message': analysis_result.get('error', '解析失败')
-                }
-                print(f"[批量筛选] 已添加(解析失败): {doc_id} -> {filename}")
+                with self._lock:
+                    pool[doc_id] = {
+                        'doc_id': doc_id,
+                        'filename': filename,
+                        'file_path': file_path,
+                        'raw_text': '',
+                        'basic_info': {
+                            'name': filename.replace('.pdf', ''),  # 使用文件名作为临时名称
+                            'contact': {},
+                            'education': [],
+                            'experience_years': 0,
+                            'skills': []
+                        },
+                        'embedding': None,
+                        'parse_error': True,
+                        'error_message': analysis_result.get('error', '解析失败')
+                    }
+                logger.debug("[批量筛选] 已添加(解析失败): %s -> %s", doc_id, filename)
                 return {
                     'success': True,  # 仍然返回成功，但标记为部分成功
                     'doc_id': doc_id,
@@ -108,23 +127,27 @@ class BatchResumeScreener:
             # 直接使用文件名，不尝试识别姓名
             display_name = filename.replace('.pdf', '').replace('.PDF', '')
             
-            self.resume_pool[doc_id] = {
-                'doc_id': doc_id,
-                'filename': filename,
-                'file_path': file_path,
-                'raw_text': analysis_result.get('raw_text', ''),
-                'basic_info': {
-                    'name': display_name,  # 直接使用文件名
-                    'contact': analysis_result.get('contact', {}),
-                    'education': analysis_result.get('education', []),
-                    'experience_years': analysis_result.get('experience_years', 0),
-                    'skills': analysis_result.get('skills', [])
-                },
-                'parse_error': False
-            }
+            raw_text = analysis_result.get('raw_text', '')
+            with self._lock:
+                pool[doc_id] = {
+                    'doc_id': doc_id,
+                    'filename': filename,
+                    'file_path': file_path,
+                    'raw_text': raw_text[:PROMPT_TEXT_LIMIT],  # 池中只保留查询时发送的部分
+                    'basic_info': {
+                        'name': display_name,  # 直接使用文件名
+                        'contact': analysis_result.get('contact', {}),
+                        'education': analysis_result.get('education', []),
+                        'experience_years': analysis_result.get('experience_years', 0),
+                        'skills': analysis_result.get('skills', [])
+                    },
+                    # 入池时计算一次文本向量，查询时只需计算查询文本的向量
+                    'embedding': embed_text(raw_text),
+                    'parse_error': False
+                }
             
-            print(f"[批量筛选] 已添加(成功): {doc_id} -> {filename}")
-            print(f"[批量筛选] 当前池大小: {len(self.resume_pool)}")
+            logger.debug("[批量筛选] 已添加(成功): %s -> %s", doc_id, filename)
+            logger.debug("[批量筛选] 当前池大小: %d", len(pool))
             
             return {
                 'success': True,
@@ -134,27 +157,27 @@ class BatchResumeScreener:
             }
             
         except Exception as e:
-            print(f"[批量筛选] 异常: {filename} - {str(e)}")
-            import traceback
-            traceback.print_exc()  # 打印完整堆栈
+            logger.exception("[批量筛选] 异常: %s", filename)
             # 捕获异常，但仍然添加到池中
-            self.resume_pool[doc_id] = {
-                'doc_id': doc_id,
-                'filename': filename,
-                'file_path': file_path,
-                'raw_text': '',
-                'basic_info': {
-                    'name': filename.replace('.pdf', ''),
-                    'contact': {},
-                    'education': [],
-                    'experience_years': 0,
-                    'skills': []
-                },
-                'parse_error': True,
-                'error_message': str(e)
-            }
-            print(f"[批量筛选] 已添加(异常): {doc_id} -> {filename}")
-            print(f"[批量筛选] 当前池大小: {len(self.resume_pool)}")
+            with self._lock:
+                pool[doc_id] = {
+                    'doc_id': doc_id,
+                    'filename': filename,
+                    'file_path': file_path,
+                    'raw_text': '',
+                    'basic_info': {
+                        'name': filename.replace('.pdf', ''),
+                        'contact': {},
+                        'education': [],
+                        'experience_years': 0,
+                        'skills': []
+                    },
+                    'embedding': None,
+                    'parse_error': True,
+                    'error_message': str(e)
+                }
+            logger.debug("[批量筛选] 已添加(异常): %s -> %s", doc_id, filename)
+            logger.debug("[批量筛选] 当前池大小: %d", len(pool))
             return {
                 'success': True,
                 'doc_id': doc_id,
@@ -163,113 +186,44 @@ class BatchResumeScreener:
                 'message': '简历已添加到筛选池'
             }
     
-    def query_resumes(self, query: str) -> Dict[str, Any]:
+    def query_resumes(self, query: str, pool: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         根据自然语言查询筛选简历
         
         Args:
             query: 查询条件，如"帮我找到本科以上的候选人"
+            pool: 简历池 {doc_id: 简历数据}，默认使用自身的池
             
         Returns:
             匹配的简历列表和AI分析
         """
+        pool = self.resume_pool if pool is None else pool
         try:
-            if not self.resume_pool:
+            if not pool:
                 return {
                     'success': False,
                     'error': '简历池为空，请先上传简历'
                 }
             
-            # 准备完整简历信息（包含原始文本）
-            resume_data_list = []
-            for doc_id, resume_data in self.resume_pool.items():
-                # 发送完整的简历文本，而不是仅摘要
-                full_data = {
-                    'doc_id': doc_id,
-                    'filename': resume_data['filename'],
-                    'name': resume_data['basic_info']['name'],
-                    'full_text': resume_data['raw_text'][:3000],  # 限制每份简历最多3000字符，避免token超限
-                    'basic_info': {
-                        'education': resume_data['basic_info']['education'],
-                        'experience_years': resume_data['basic_info']['experience_years'],
-                        'skills': resume_data['basic_info']['skills']
-                    }
-                }
-                resume_data_list.append(full_data)
-            
-            # 构建AI提示 - 包含完整简历文本
-            prompt = f"""你是一个专业的HR助手。我有{len(self.resume_pool)}份简历，需要根据以下要求进行筛选：
-
-查询要求：{query}
-
-以下是所有简历的完整信息（包含原始简历文本）：
-
-{json.dumps(resume_data_list, ensure_ascii=False, indent=2)}
-
-请仔细阅读每份简历的完整内容（full_text字段），分析工作经历、项目经验、教育背景等所有细节，然后返回符合要求的候选人。
-
-返回JSON格式：
-{{
-    "matched_candidates": [
-        {{
-            "doc_id": "文档ID",
-            "filename": "文件名",
-            "name": "候选人姓名",
-            "reason": "符合原因（基于简历原文的详细说明）",
-            "highlights": ["亮点1（具体工作经历）", "亮点2（具体项目经验）", "亮点3"]
-        }}
-    ],
-    "summary": "筛选总结（一句话）",
-    "match_count": 匹配数量
-}}
-
-只返回JSON，不要其他文字。"""
-            
-            # 调用AI分析
-            if self.model_type == 'gemini':
-                # 使用 Gemini API
-                response = self.gemini_model.generate_content(
-                    f"你是一个专业的HR筛选助手，擅长仔细阅读简历原文并根据要求筛选候选人。返回JSON格式结果。\n\n{prompt}",
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.3,
-                        max_output_tokens=4000,
-                    )
-                )
-                result_text = response.text.strip()
-            else:
-                # 使用 DeepSeek API
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "你是一个专业的HR筛选助手，擅长仔细阅读简历原文并根据要求筛选候选人。返回JSON格式结果。"
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.3,
-                    max_tokens=4000  # 增加token限制，因为需要处理更多内容
-                )
-                result_text = response.choices[0].message.content.strip()
-            
-            # 解析JSON
-            if result_text.startswith('```'):
-                result_text = result_text.split('```')[1]
-                if result_text.startswith('json'):
-                    result_text = result_text[4:]
-                result_text = result_text.strip()
+            # 相同查询且简历池内容未变时直接复用上次的AI结果，不再重复发送整个简历池
+            cache_key = self.cache.make_key(
+                f"{self.model_type}:{self.model}", 0.3, 'query_resumes', query, pool_fingerprint(pool)
+            )
+            result_text = self.cache.get(cache_key)
+            cache_hit = result_text is not None
+            if not cache_hit:
+                result_text = self._ask_ai(query, pool)
             
-            ai_result = json.loads(result_text)
+            ai_result = json_utils.loads(result_text)
+            if not cache_hit:
+                self.cache.set(cache_key, result_text)
             
             # 补充完整的简历信息
             matched_resumes = []
             for candidate in ai_result.get('matched_candidates', []):
                 doc_id = candidate['doc_id']
-                if doc_id in self.resume_pool:
-                    resume_data = self.resume_pool[doc_id]
+                if doc_id in pool:
+                    resume_data = pool[doc_id]
                     matched_resumes.append({
                         'doc_id': doc_id,
                         'filename': resume_data['filename'],
@@ -282,7 +236,9 @@ class BatchResumeScreener:
             return {
                 'success': True,
                 'query': query,
-                'total_resumes': len(self.resume_pool),
+                'total_resumes': len(pool),
+                # 实际发给AI筛选的简历数（BATCH_QUERY_TOP_K 限制了数量时小于 total_resumes）
+                'considered_resumes': min(len(pool), QUERY_TOP_K) if QUERY_TOP_K else len(pool),
                 'match_count': len(matched_resumes),
                 'matched_resumes': matched_resumes,
                 'summary': ai_result.get('summary', ''),
@@ -295,9 +251,180 @@ class BatchResumeScreener:
                 'error': f'查询失败: {str(e)}'
             }
     
+    def _ask_ai(self, query: str, pool: Dict[str, Any]) -> str:
+        """
+        选出与查询最相关的简历并调用AI筛选
+        
+        Returns:
+            AI回复的JSON文本（分片查询时为合并后的结果）
+        """
+        # 准备完整简历信息（包含原始文本），只取与查询最相关的简历；
+        # 选中的简历按池中顺序排列，选中范围不变时简历部分与上次完全相同，可命中服务商的前缀缓存
+        selected = {doc_id for doc_id, _ in self.rank_resumes(query, pool, top_k=QUERY_TOP_K or None)}
+        resume_data_list = []
+        for doc_id, resume_data in pool.items():
+            if doc_id not in selected:
+                continue
+            # 发送完整的简历文本，而不是仅摘要
+            full_data = {
+                'doc_id': doc_id,
+                'filename': resume_data['filename'],
+                'name': resume_data['basic_info']['name'],
+                'full_text': resume_data['raw_text'],  # 入池时已截取到 PROMPT_TEXT_LIMIT 字符
+                'basic_info': {
+                    'education': resume_data['basic_info']['education'],
+                    'experience_years': resume_data['basic_info']['experience_years'],
+                    'skills': resume_data['basic_info']['skills']
+                }
+            }
+            resume_data_list.append(full_data)
+        
+        if not QUERY_SHARD_SIZE or len(resume_data_list) <= QUERY_SHARD_SIZE:
+            return self._ask_shard(query, resume_data_list)
+        
+        # 简历较多时分片并发调用AI，每个分片的提示词更短，总耗时接近单个分片的耗时
+        shards = [
+            resume_data_list[i:i + QUERY_SHARD_SIZE]
+            for i in range(0, len(resume_data_list), QUERY_SHARD_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(shards))) as executor:
+            shard_results = [
+                json_utils.loads(text)
+                for text in executor.map(lambda shard: self._ask_shard(query, shard), shards)
+            ]
+        
+        # 合并各分片的候选人和总结
+        matched_candidates = [
+            candidate
+            for result in shard_results
+            for candidate in result.get('matched_candidates', [])
+        ]
+        return json_utils.dumps({
+            'matched_candidates': matched_candidates,
+            'summary': '；'.join(result['summary'] for result in shard_results if result.get('summary')),
+            'match_count': len(matched_candidates)
+        })
+    
+    def _ask_shard(self, query: str, resume_data_list: List[Dict[str, Any]]) -> str:
+        """
+        对一组简历调用AI筛选
+        
+        Returns:
+            去掉代码块标记后的AI回复文本
+        """
+        # 构建AI提示 - 包含完整简历文本；不变的简历内容在前，每次不同的查询要求放在最后
+        # （角色和“返回JSON”的要求已在系统提示词中说明，这里不再重复）
+        prompt = f"""我有{len(resume_data_list)}份简历，需要根据最后给出的查询要求进行筛选。
+
+以下是所有简历的完整信息（包含原始简历文本）：
+
+{json_utils.dumps(resume_data_list)}
+
+请仔细阅读每份简历的完整内容（full_text字段），分析工作经历、项目经验、教育背景等所有细节，然后返回符合要求的候选人。
+
+返回JSON格式：
+{{
+    "matched_candidates": [
+        {{
+            "doc_id": "文档ID",
+            "filename": "文件名",
+            "name": "候选人姓名",
+            "reason": "符合原因（基于简历原文的详细说明）",
+            "highlights": ["亮点1（具体工作经历）", "亮点2（具体项目经验）", "亮点3"]
+        }}
+    ],
+    "summary": "筛选总结（一句话）",
+    "match_count": 匹配数量
+}}
+
+查询要求：{query}"""
+        
+        # 调用AI分析（开启 AI_STREAM_JSON 时流式读取，JSON对象结束后立即停止接收）
+        if self.model_type == 'gemini':
+            # 使用 Gemini API
+            generation_options = {}
+            if self.json_mode:
+                generation_options['response_mime_type'] = 'application/json'
+            response = self.gemini_model.generate_content(
+                f"你是一个专业的HR筛选助手，擅长仔细阅读简历原文并根据要求筛选候选人。返回JSON格式结果。\n\n{prompt}",
+                generation_config=self._genai.types.GenerationConfig(
+                    temperature=0.3,
+                    max_output_tokens=4000,
+                    **generation_options
+                ),
+                stream=STREAM_JSON
+            )
+            if STREAM_JSON:
+                try:
+                    result_text = json_utils.read_json_stream(chunk.text for chunk in response)
+                finally:
+                    close_gemini_stream(response)
+            else:
+                result_text = response.text.strip()
+        else:
+            # 使用 DeepSeek API（开启 JSON 模式时由服务商保证输出为JSON）
+            completion_options = {}
+            if self.json_mode:
+                completion_options['response_format'] = {"type": "json_object"}
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "你是一个专业的HR筛选助手，擅长仔细阅读简历原文并根据要求筛选候选人。返回JSON格式结果。"
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=4000,  # 增加token限制，因为需要处理更多内容
+                stream=STREAM_JSON,
+                **completion_options
+            )
+            if STREAM_JSON:
+                try:
+                    result_text = json_utils.read_json_stream(
+                        chunk.choices[0].delta.content
+                        for chunk in response if chunk.choices
+                    )
+                finally:
+                    # 提前结束时关闭连接，服务端随即停止生成
+                    response.close()
+            else:
+                result_text = response.choices[0].message.content.strip()
+        
+        # 未开启JSON模式的模型仍可能返回代码块
+        return json_utils.strip_code_fence(result_text)
+    
+    def rank_resumes(self, query: str, pool: Dict[str, Any] = None, top_k: int = None) -> List[Tuple[str, float]]:
+        """
+        按与查询文本的相似度对简历池排序
+        
+        Args:
+            query: 查询条件
+            pool: 简历池 {doc_id: 简历数据}，默认使用自身的池
+            top_k: 只返回相似度最高的前N份，默认返回全部
+            
+        Returns:
+            [(doc_id, 相似度), ...]，相似度从高到低；没有文本向量的简历相似度为 0
+        """
+        pool = self.resume_pool if pool is None else pool
+        # 查询文本较短，向量中只有少量非零分量，只计算这些分量可省去绝大部分乘法
+        query_terms = sparse_terms(embed_text(query))
+        scores = [
+            (doc_id, sparse_similarity(query_terms, data['embedding']) if data.get('embedding') else 0.0)
+            for doc_id, data in pool.items()
+        ]
+        if top_k is not None and top_k < len(scores):
+            return heapq.nlargest(top_k, scores, key=lambda item: item[1])
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores
+    
     def get_pool_status(self) -> Dict[str, Any]:
         """获取简历池状态"""
-        print(f"[批量筛选] 获取池状态: 总数={len(self.resume_pool)}")
+        logger.debug("[批量筛选] 获取池状态: 总数=%d", len(self.resume_pool))
         
         resumes_list = []
         for doc_id, data in self.resume_pool.items():
@@ -309,7 +436,7 @@ class BatchResumeScreener:
                 'error_message': data.get('error_message', '')
             }
             resumes_list.append(resume_info)
-            print(f"[批量筛选]   - {doc_id}: {data['filename']}")
+            logger.debug("[批量筛选]   - %s: %s", doc_id, data['filename'])
         
         return {
             'total_count': len(self.resume_pool),
@@ -318,8 +445,9 @@ class BatchResumeScreener:
     
     def clear_pool(self) -> Dict[str, Any]:
         """清空简历池"""
-        count = len(self.resume_pool)
-        self.resume_pool.clear()
+        with self._lock:
+            count = len(self.resume_pool)
+            self.resume_pool.clear()
         return {
             'success': True,
             'message': f'已清空{count}份简历'
@@ -327,9 +455,10 @@ class BatchResumeScreener:
     
     def remove_resume(self, doc_id: str) -> Dict[str, Any]:
         """从池中移除指定简历"""
-        if doc_id in self.resume_pool:
-            filename = self.resume_pool[doc_id]['filename']
-            del self.resume_pool[doc_id]
+        with self._lock:
+            data = self.resume_pool.pop(doc_id, None)
+        if data is not None:
+            filename = data['filename']
             return {
                 'success': True,
                 'message': f'已移除简历: {filename}'
@@ -338,3 +467,22 @@ class BatchResumeScreener:
             'success': False,
             'error': '简历不存在'
         }
+
+
+@lru_cache(maxsize=None)
+def _get_batch_screener(model_type: str) -> BatchResumeScreener:
+    return BatchResumeScreener(model_type=model_type)
+
+
+def get_batch_screener(model_type: str = None) -> BatchResumeScreener:
+    """
+    获取共享的筛选器实例（每种模型一个）
+    
+    共享实例只用于解析和查询，池的数据由调用方通过 pool 参数传入
+    """
+    return _get_batch_screener(model_type or get_ai_config_manager().default_model)
+
+
+def clear_batch_screener_cache():
+    """清空共享的实例（模型配置重新加载后调用）"""
+    _get_batch_screener.cache_clear()
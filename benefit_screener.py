@@ -5,16 +5,24 @@
 功能：批量上传福利政策文档，基于所有文档进行智能问答
 """
 
-import os
-import json
+import logging
+import threading
+from functools import lru_cache
 from typing import List, Dict, Any
-from dotenv import load_dotenv
-from openai import OpenAI
-import google.generativeai as genai
-from resume_analyzer import ResumeAnalyzer  # 复用PDF解析功能
-from config_manager import get_model_config, is_model_available
+import env_cache
+from resume_analyzer import ResumeAnalyzer, analyze_resume_file  # 复用PDF解析功能
+from config_manager import get_ai_config_manager, get_required_model_config
+from ai_clients import get_openai_client, get_genai, get_gemini_model, close_gemini_stream
+from llm_cache import get_llm_cache, pool_fingerprint
+from ai_resume_analyzer import STREAM_JSON
+import json_utils
 
-load_dotenv()
+env_cache.load()
+
+logger = logging.getLogger(__name__)
+
+# 查询时每份文档最多发送的字符数（入池时截取一次）
+PROMPT_TEXT_LIMIT = 5000
 
 class BenefitScreener:
     """员工福利政策管理和查询"""
@@ -26,38 +34,33 @@ class BenefitScreener:
         Args:
             model_type: 模型类型，从配置管理器动态获取
         """
-        self.model_type = model_type or os.getenv('DEFAULT_AI_MODEL', 'deepseek')
-        
-        # 检查模型是否可用
-        if not is_model_available(self.model_type):
-            raise ValueError(f"模型 '{self.model_type}' 不可用或配置不完整")
+        self.model_type = model_type or get_ai_config_manager().default_model
         
-        # 获取模型配置
-        config = get_model_config(self.model_type)
-        if not config:
-            raise ValueError(f"无法获取模型 '{self.model_type}' 的配置")
+        # 获取模型配置（模型不可用时抛出 ValueError）
+        config = get_required_model_config(self.model_type)
         
         self.api_key = config['api_key']
         self.base_url = config['base_url']
         self.model = config['model']
         self.display_name = config['display_name']
+        self.json_mode = config.get('json_mode', False)
         
-        # 根据模型类型初始化客户端
+        # 根据模型类型获取客户端（进程内复用，避免重复建立连接）
         if self.model_type == 'gemini':
-            genai.configure(api_key=self.api_key)
-            self.gemini_model = genai.GenerativeModel(self.model)
+            self._genai = get_genai()
+            self.gemini_model = get_gemini_model(self.api_key, self.model)
             self.client = None
         else:
-            self.client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
+            self._genai = None
+            self.client = get_openai_client(self.api_key, self.base_url)
             self.gemini_model = None
         
+        self.cache = get_llm_cache()
         self.document_analyzer = ResumeAnalyzer()  # 复用PDF文本提取
         self.benefit_pool = {}  # 存储福利政策文档池 {doc_id: {文件信息, 文本内容}}
+        self._lock = threading.RLock()  # 保护池的增删，避免并发移除与读取冲突
     
-    def add_document_to_pool(self, doc_id: str, file_path: str, filename: str) -> Dict[str, Any]:
+    def add_document_to_pool(self, doc_id: str, file_path: str, filename: str, pool: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         将福利政策文档添加到池中（静默处理）
         
@@ -65,29 +68,32 @@ class BenefitScreener:
             doc_id: 文档ID
             file_path: 文件路径
             filename: 原始文件名
+            pool: 福利政策库 {doc_id: 文档数据}，默认使用自身的池
             
         Returns:
             确认信息
         """
+        pool = self.benefit_pool if pool is None else pool
         try:
-            print(f"[福利政策] 开始处理: {filename}")
+            logger.debug("[福利政策] 开始处理: %s", filename)
             
             # 提取PDF文本
-            analysis_result = self.document_analyzer.analyze_resume(file_path)
+            analysis_result = analyze_resume_file(file_path, self.document_analyzer)
             
-            print(f"[福利政策] 解析结果: {list(analysis_result.keys())}")
+            logger.debug("[福利政策] 解析结果: %s", list(analysis_result))
             
             if 'error' in analysis_result:
-                print(f"[福利政策] 解析错误: {analysis_result['error']}")
-                self.benefit_pool[doc_id] = {
-                    'doc_id': doc_id,
-                    'filename': filename,
-                    'file_path': file_path,
-                    'raw_text': '',
-                    'parse_error': True,
-                    'error_message': analysis_result.get('error', '解析失败')
-                }
-                print(f"[福利政策] 已添加(解析失败): {doc_id} -> {filename}")
+                logger.warning("[福利政策] 解析错误: %s", analysis_result['error'])
+                with self._lock:
+                    pool[doc_id] = {
+                        'doc_id': doc_id,
+                        'filename': filename,
+                        'file_path': file_path,
+                        'raw_text': '',
+                        'parse_error': True,
+                        'error_message': analysis_result.get('error', '解析失败')
+                    }
+                logger.debug("[福利政策] 已添加(解析失败): %s -> %s", doc_id, filename)
                 return {
                     'success': True,
                     'doc_id': doc_id,
@@ -96,17 +102,20 @@ class BenefitScreener:
                     'message': '文档已添加到福利政策库'
                 }
             
-            # 存储到政策池
-            self.benefit_pool[doc_id] = {
-                'doc_id': doc_id,
-                'filename': filename,
-                'file_path': file_path,
-                'raw_text': analysis_result.get('raw_text', ''),
-                'parse_error': False
-            }
+            # 存储到政策池（只保留查询时发送的部分文本）
+            raw_text = analysis_result.get('raw_text', '')
+            with self._lock:
+                pool[doc_id] = {
+                    'doc_id': doc_id,
+                    'filename': filename,
+                    'file_path': file_path,
+                    'raw_text': raw_text[:PROMPT_TEXT_LIMIT],
+                    'text_length': analysis_result.get('text_length', len(raw_text)),
+                    'parse_error': False
+                }
             
-            print(f"[福利政策] 已添加(成功): {doc_id} -> {filename}")
-            print(f"[福利政策] 当前池大小: {len(self.benefit_pool)}")
+            logger.debug("[福利政策] 已添加(成功): %s -> %s", doc_id, filename)
+            logger.debug("[福利政策] 当前池大小: %d", len(pool))
             
             return {
                 'success': True,
@@ -116,20 +125,19 @@ class BenefitScreener:
             }
             
         except Exception as e:
-            print(f"[福利政策] 异常: {filename} - {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[福利政策] 异常: %s", filename)
             
-            self.benefit_pool[doc_id] = {
-                'doc_id': doc_id,
-                'filename': filename,
-                'file_path': file_path,
-                'raw_text': '',
-                'parse_error': True,
-                'error_message': str(e)
-            }
-            print(f"[福利政策] 已添加(异常): {doc_id} -> {filename}")
-            print(f"[福利政策] 当前池大小: {len(self.benefit_pool)}")
+            with self._lock:
+                pool[doc_id] = {
+                    'doc_id': doc_id,
+                    'filename': filename,
+                    'file_path': file_path,
+                    'raw_text': '',
+                    'parse_error': True,
+                    'error_message': str(e)
+                }
+            logger.debug("[福利政策] 已添加(异常): %s -> %s", doc_id, filename)
+            logger.debug("[福利政策] 当前池大小: %d", len(pool))
             return {
                 'success': True,
                 'doc_id': doc_id,
@@ -138,18 +146,20 @@ class BenefitScreener:
                 'message': '文档已添加到福利政策库'
             }
     
-    def query_benefits(self, query: str) -> Dict[str, Any]:
+    def query_benefits(self, query: str, pool: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         根据自然语言查询福利政策
         
         Args:
             query: 查询问题，如"请假政策是什么？"、"年终奖如何计算？"
+            pool: 福利政策库 {doc_id: 文档数据}，默认使用自身的池
             
         Returns:
             AI回答和相关文档信息
         """
+        pool = self.benefit_pool if pool is None else pool
         try:
-            if not self.benefit_pool:
+            if not pool:
                 return {
                     'success': False,
                     'error': '福利政策库为空，请先上传政策文档'
@@ -157,12 +167,12 @@ class BenefitScreener:
             
             # 准备所有福利政策文档的完整文本
             documents_data = []
-            for doc_id, doc_data in self.benefit_pool.items():
+            for doc_id, doc_data in pool.items():
                 if not doc_data.get('parse_error', False):
                     full_data = {
                         'doc_id': doc_id,
                         'filename': doc_data['filename'],
-                        'content': doc_data['raw_text'][:5000]  # 每份文档最多5000字符
+                        'content': doc_data['raw_text']  # 入池时已截取到 PROMPT_TEXT_LIMIT 字符
                     }
                     documents_data.append(full_data)
             
@@ -172,14 +182,51 @@ class BenefitScreener:
                     'error': '所有文档解析失败，无法查询'
                 }
             
-            # 构建AI提示
-            prompt = f"""你是一个专业的HR福利政策助手。我有{len(documents_data)}份员工福利政策文档，员工向你咨询福利相关问题。
-
-员工问题：{query}
+            # 相同问题且政策库内容未变时直接复用上次的AI回答，不再重复发送所有文档
+            cache_key = self.cache.make_key(
+                f"{self.model_type}:{self.model}", 0.3, 'query_benefits', query, pool_fingerprint(pool)
+            )
+            result_text = self.cache.get(cache_key)
+            cache_hit = result_text is not None
+            if not cache_hit:
+                result_text = self._ask_ai(query, documents_data)
+            
+            ai_result = json_utils.loads(result_text)
+            if not cache_hit:
+                self.cache.set(cache_key, result_text)
+            
+            return {
+                'success': True,
+                'query': query,
+                'answer': ai_result.get('answer', ''),
+                'relevant_documents': ai_result.get('relevant_documents', []),
+                'key_points': ai_result.get('key_points', []),
+                'source_quote': ai_result.get('source_quote', ''),
+                'total_documents': len(pool),
+                'message': '查询成功'
+            }
+            
+        except Exception as e:
+            logger.exception("[福利政策] 查询失败")
+            return {
+                'success': False,
+                'error': f'查询失败: {str(e)}'
+            }
+    
+    def _ask_ai(self, query: str, documents_data: List[Dict[str, Any]]) -> str:
+        """
+        构建包含所有政策文档内容的提示词并调用AI回答
+        
+        Returns:
+            去掉代码块标记后的AI回复文本
+        """
+        # 构建AI提示；不变的政策文档在前，每次不同的员工问题放在最后，可命中服务商的前缀缓存
+        # （角色和“返回JSON”的要求已在系统提示词中说明，这里不再重复）
+        prompt = f"""我有{len(documents_data)}份员工福利政策文档，员工向你咨询福利相关问题（见最后）。
 
 以下是所有福利政策文档的完整内容：
 
-{json.dumps(documents_data, ensure_ascii=False, indent=2)}
+{json_utils.dumps(documents_data)}
 
 请仔细阅读所有政策文档的内容（content字段），基于这些文档准确回答员工的问题。
 
@@ -195,69 +242,71 @@ class BenefitScreener:
 1. 回答要准确、详细，基于实际政策内容
 2. 如果多个文档都相关，要综合说明
 3. 如果政策中没有相关信息，要明确告知
-4. 只返回JSON，不要其他文字"""
-            
-            # 调用AI分析
-            if self.model_type == 'gemini':
-                # 使用 Gemini API
-                response = self.gemini_model.generate_content(
-                    f"你是一个专业的HR福利政策助手，擅长阅读政策文档并准确回答员工咨询。返回JSON格式结果。\n\n{prompt}",
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.3,
-                        max_output_tokens=4000,
-                    )
-                )
+
+员工问题：{query}"""
+        
+        # 调用AI分析（开启 AI_STREAM_JSON 时流式读取，JSON对象结束后立即停止接收）
+        if self.model_type == 'gemini':
+            # 使用 Gemini API
+            generation_options = {}
+            if self.json_mode:
+                generation_options['response_mime_type'] = 'application/json'
+            response = self.gemini_model.generate_content(
+                f"你是一个专业的HR福利政策助手，擅长阅读政策文档并准确回答员工咨询。返回JSON格式结果。\n\n{prompt}",
+                generation_config=self._genai.types.GenerationConfig(
+                    temperature=0.3,
+                    max_output_tokens=4000,
+                    **generation_options
+                ),
+                stream=STREAM_JSON
+            )
+            if STREAM_JSON:
+                try:
+                    result_text = json_utils.read_json_stream(chunk.text for chunk in response)
+                finally:
+                    close_gemini_stream(response)
+            else:
                 result_text = response.text.strip()
+        else:
+            # 使用 DeepSeek API（开启 JSON 模式时由服务商保证输出为JSON）
+            completion_options = {}
+            if self.json_mode:
+                completion_options['response_format'] = {"type": "json_object"}
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "你是一个专业的HR福利政策助手，擅长阅读政策文档并准确回答员工咨询。返回JSON格式结果。"
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=4000,
+                stream=STREAM_JSON,
+                **completion_options
+            )
+            if STREAM_JSON:
+                try:
+                    result_text = json_utils.read_json_stream(
+                        chunk.choices[0].delta.content
+                        for chunk in response if chunk.choices
+                    )
+                finally:
+                    # 提前结束时关闭连接，服务端随即停止生成
+                    response.close()
             else:
-                # 使用 DeepSeek API
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "你是一个专业的HR福利政策助手，擅长阅读政策文档并准确回答员工咨询。返回JSON格式结果。"
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.3,
-                    max_tokens=4000
-                )
                 result_text = response.choices[0].message.content.strip()
-            
-            # 解析JSON
-            if result_text.startswith('```'):
-                result_text = result_text.split('```')[1]
-                if result_text.startswith('json'):
-                    result_text = result_text[4:]
-                result_text = result_text.strip()
-            
-            ai_result = json.loads(result_text)
-            
-            return {
-                'success': True,
-                'query': query,
-                'answer': ai_result.get('answer', ''),
-                'relevant_documents': ai_result.get('relevant_documents', []),
-                'key_points': ai_result.get('key_points', []),
-                'source_quote': ai_result.get('source_quote', ''),
-                'total_documents': len(self.benefit_pool),
-                'message': '查询成功'
-            }
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return {
-                'success': False,
-                'error': f'查询失败: {str(e)}'
-            }
+        
+        # 未开启JSON模式的模型仍可能返回代码块
+        return json_utils.strip_code_fence(result_text)
     
     def get_pool_status(self) -> Dict[str, Any]:
         """获取福利政策库状态"""
-        print(f"[福利政策] 获取池状态: 总数={len(self.benefit_pool)}")
+        logger.debug("[福利政策] 获取池状态: 总数=%d", len(self.benefit_pool))
         
         documents_list = []
         for doc_id, data in self.benefit_pool.items():
@@ -266,10 +315,10 @@ class BenefitScreener:
                 'filename': data['filename'],
                 'parse_error': data.get('parse_error', False),
                 'error_message': data.get('error_message', ''),
-                'text_length': len(data.get('raw_text', ''))
+                'text_length': data.get('text_length', 0)
             }
             documents_list.append(doc_info)
-            print(f"[福利政策]   - {doc_id}: {data['filename']}")
+            logger.debug("[福利政策]   - %s: %s", doc_id, data['filename'])
         
         return {
             'total_count': len(self.benefit_pool),
@@ -278,8 +327,9 @@ class BenefitScreener:
     
     def clear_pool(self) -> Dict[str, Any]:
         """清空福利政策库"""
-        count = len(self.benefit_pool)
-        self.benefit_pool.clear()
+        with self._lock:
+            count = len(self.benefit_pool)
+            self.benefit_pool.clear()
         return {
             'success': True,
             'message': f'已清空{count}份政策文档'
@@ -287,9 +337,10 @@ class BenefitScreener:
     
     def remove_document(self, doc_id: str) -> Dict[str, Any]:
         """从池中移除指定文档"""
-        if doc_id in self.benefit_pool:
-            filename = self.benefit_pool[doc_id]['filename']
-            del self.benefit_pool[doc_id]
+        with self._lock:
+            data = self.benefit_pool.pop(doc_id, None)
+        if data is not None:
+            filename = data['filename']
             return {
                 'success': True,
                 'message': f'已移除文档: {filename}'
@@ -299,3 +350,21 @@ class BenefitScreener:
             'error': '文档不存在'
         }
 
+
+@lru_cache(maxsize=None)
+def _get_benefit_screener(model_type: str) -> BenefitScreener:
+    return BenefitScreener(model_type=model_type)
+
+
+def get_benefit_screener(model_type: str = None) -> BenefitScreener:
+    """
+    获取共享的福利政策查询器实例（每种模型一个）
+    
+    共享实例只用于解析和查询，池的数据由调用方通过 pool 参数传入
+    """
+    return _get_benefit_screener(model_type or get_ai_config_manager().default_model)
+
+
+def clear_benefit_screener_cache():
+    """清空共享的实例（模型配置重新加载后调用）"""
+    _get_benefit_screener.cache_clear()
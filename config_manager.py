@@ -4,7 +4,8 @@
 """
 
 import os
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
 
 
 class AIConfigManager:
@@ -14,27 +15,45 @@ class AIConfigManager:
         self.available_models = self._load_available_models()
         self.model_configs = self._load_model_configs()
         self.default_model = os.getenv('DEFAULT_AI_MODEL', 'deepseek')
+        
+        # 配置加载后不再变化，前端模型列表、实际默认模型和配置摘要字段只计算一次
+        self._model_list = tuple(
+            {
+                'value': model,
+                'display_name': config['display_name'],
+                'model_name': config['model']
+            }
+            for model, config in self.model_configs.items()
+        )
+        # 已配置模型名集合（重新加载配置时随管理器一起重建）
+        self._configured_models = frozenset(self.model_configs)
+        self._resolved_default_model = self._resolve_default_model()
+        self._configured_model_names = tuple(self.model_configs)
     
     def _load_available_models(self) -> List[str]:
         """从环境变量加载可用的模型列表"""
         models_str = os.getenv('AI_MODELS', 'deepseek,gemini')
         return [model.strip().lower() for model in models_str.split(',') if model.strip()]
     
-    def _load_model_configs(self) -> Dict[str, Dict[str, str]]:
-        """加载所有模型的配置"""
+    def _load_model_configs(self) -> Dict[str, Mapping[str, str]]:
+        """加载所有模型的配置（只读，调用方不能修改）"""
         configs = {}
+        env = os.environ
         
         for model in self.available_models:
+            prefix = model.upper() + '_'
             config = {
-                'api_key': os.getenv(f'{model.upper()}_API_KEY'),
-                'base_url': os.getenv(f'{model.upper()}_BASE_URL'),
-                'model': os.getenv(f'{model.upper()}_MODEL'),
-                'display_name': os.getenv(f'{model.upper()}_DISPLAY_NAME', model.title())
+                'api_key': env.get(prefix + 'API_KEY'),
+                'base_url': env.get(prefix + 'BASE_URL'),
+                'model': env.get(prefix + 'MODEL'),
+                'display_name': env.get(prefix + 'DISPLAY_NAME', model.title()),
+                # 是否要求模型以JSON模式输出（服务商不支持 response_format 时设为 false）
+                'json_mode': env.get(prefix + 'JSON_MODE', 'true').lower() == 'true'
             }
             
             # 检查必要配置是否存在
             if config['api_key'] and config['model']:
-                configs[model] = config
+                configs[model] = MappingProxyType(config)
             else:
                 missing = []
                 if not config['api_key']:
@@ -46,26 +65,31 @@ class AIConfigManager:
         return configs
     
     def get_available_models(self) -> List[Dict[str, str]]:
-        """获取可用的模型列表，用于前端显示"""
-        models = []
-        for model, config in self.model_configs.items():
-            models.append({
-                'value': model,
-                'display_name': config['display_name'],
-                'model_name': config['model']
-            })
-        return models
+        """获取可用的模型列表，用于前端显示（返回副本，调用方修改不影响缓存）"""
+        return [dict(model) for model in self._model_list]
     
-    def get_model_config(self, model_name: str) -> Optional[Dict[str, str]]:
+    def get_model_config(self, model_name: str) -> Optional[Mapping[str, str]]:
         """获取指定模型的配置"""
         return self.model_configs.get(model_name.lower())
     
+    def get_configured_models(self) -> FrozenSet[str]:
+        """获取已配置的模型名集合"""
+        return self._configured_models
+    
+    def get_all_model_configs(self) -> Mapping[str, Mapping[str, str]]:
+        """获取全部可用模型的配置 {模型: 配置}（只读，按 AI_MODELS 中的顺序）"""
+        return MappingProxyType(self.model_configs)
+    
     def is_model_available(self, model_name: str) -> bool:
         """检查模型是否可用"""
-        return model_name.lower() in self.model_configs
+        return model_name.lower() in self._configured_models
     
     def get_default_model(self) -> str:
         """获取默认模型"""
+        return self._resolved_default_model
+    
+    def _resolve_default_model(self) -> str:
+        """确定实际使用的默认模型（配置的默认模型不可用时使用第一个可用模型）"""
         if self.is_model_available(self.default_model):
             return self.default_model
         elif self.model_configs:
@@ -92,12 +116,12 @@ class AIConfigManager:
         return len(errors) == 0, errors
     
     def get_config_summary(self) -> Dict:
-        """获取配置摘要"""
+        """获取配置摘要（由初始化时算好的字段组装，每次返回新的 dict）"""
         return {
-            'available_models': self.available_models,
-            'configured_models': list(self.model_configs.keys()),
-            'default_model': self.get_default_model(),
-            'model_count': len(self.model_configs),
+            'available_models': list(self.available_models),
+            'configured_models': list(self._configured_model_names),
+            'default_model': self._resolved_default_model,
+            'model_count': len(self._configured_model_names),
             'models': self.get_available_models()
         }
 
@@ -120,8 +144,8 @@ def reload_config():
     _config_manager = None
     
     # 重新加载环境变量
-    from dotenv import load_dotenv
-    load_dotenv(override=True)
+    import env_cache
+    env_cache.load(override=True)
     
     return get_ai_config_manager()
 
@@ -131,11 +155,29 @@ def get_available_models() -> List[Dict[str, str]]:
     return get_ai_config_manager().get_available_models()
 
 
-def get_model_config(model_name: str) -> Optional[Dict[str, str]]:
+def get_model_config(model_name: str) -> Optional[Mapping[str, str]]:
     """获取模型配置（便捷函数）"""
     return get_ai_config_manager().get_model_config(model_name)
 
 
+def get_all_model_configs() -> Mapping[str, Mapping[str, str]]:
+    """获取全部可用模型的配置（便捷函数）"""
+    return get_ai_config_manager().get_all_model_configs()
+
+
 def is_model_available(model_name: str) -> bool:
     """检查模型是否可用（便捷函数）"""
     return get_ai_config_manager().is_model_available(model_name)
+
+
+def get_required_model_config(model_type: str) -> Mapping[str, str]:
+    """
+    获取模型配置，模型不可用或配置不完整时抛出 ValueError（各分析器初始化时共用）
+    """
+    if not is_model_available(model_type):
+        raise ValueError(f"模型 '{model_type}' 不可用或配置不完整")
+    
+    config = get_model_config(model_type)
+    if not config:
+        raise ValueError(f"无法获取模型 '{model_type}' 的配置")
+    return config
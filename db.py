@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 连接池
+复用数据库连接，避免每个请求重复打开/关闭数据库文件
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# 数据库文件路径
+DATABASE_PATH = 'resumes.db'
+
+# 连接池大小
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+
+# 每个连接缓存的已编译SQL语句数量（相同文本的SQL复用已编译的语句）
+STATEMENT_CACHE_SIZE = 256
+
+# 每个连接打开时设置的参数（WAL 模式在数据库文件上持久生效，由 init_database 设置）
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-32000',  # 每个连接约32MB页缓存
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA mmap_size=268435456',
+)
+
+
+class ConnectionPool:
+    """SQLite 连接池 - 连接按需创建，最多 size 个，用完归还复用"""
+
+    def __init__(self, db_path: str = DATABASE_PATH, size: int = POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开新连接（自动提交模式，需要事务时显式 BEGIN）"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        # 连接数已达上限，等待其他请求归还
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，离开 with 块时归还（未结束的事务会被回滚）"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+
+# 全局连接池实例（延迟初始化）
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """获取全局连接池"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_conn():
+    """
+    获取数据库连接（上下文管理器）
+
+    用法：
+        with get_conn() as conn:
+            conn.execute(...)
+    """
+    return get_pool().connection()
@@ -6,64 +6,134 @@
 """
 
 import os
-import base64
-from typing import List, Dict, Any
-from dotenv import load_dotenv
-from openai import OpenAI
-from config_manager import get_model_config, is_model_available
+import time
+import zlib
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator
+import env_cache
+from ai_resume_analyzer import BATCH_CONCURRENCY
+from config_manager import get_ai_config_manager, get_required_model_config
+from ai_clients import get_openai_client
+from pdf_utils import extract_pdf_text
+from llm_cache import get_llm_cache, get_semantic_cache
+from text_utils import embed_text, truncate_text
+import json_utils
 
-load_dotenv()
+env_cache.load()
+
+# 对话历史版本号（所有代理实例共用，保证同一文档重建代理后版本号也不会重复）
+_history_versions = itertools.count(1)
+
+# 发送给大模型的文档文本长度上限（字符数），超出时保留开头和结尾
+DOCUMENT_CHAR_LIMIT = int(os.getenv('DOCUMENT_CHAR_LIMIT', '12000'))
+
+# 最多保留对话的文档数，超出时淘汰最久未使用的文档（为 0 时不限制）
+CHAT_MAX_DOCUMENTS = int(os.getenv('CHAT_MAX_DOCUMENTS', '100'))
+
+# 初次分析文档属于信息提取，使用较低的温度和较小的输出上限（回复更快、结果稳定，缓存更易命中）
+ANALYSIS_TEMPERATURE = 0.2
+ANALYSIS_MAX_TOKENS = int(os.getenv('DOCUMENT_ANALYSIS_MAX_TOKENS', '800'))
+
+# 对话为开放式问答，保留较高的温度
+CHAT_TEMPERATURE = 0.7
+CHAT_MAX_TOKENS = 1500
 
 class DocumentChatAgent:
     """文档对话代理 - 处理PDF并支持对话交互"""
     
     def __init__(self, model_type=None):
         """初始化对话代理"""
-        self.model_type = model_type or os.getenv('DEFAULT_AI_MODEL', 'deepseek')
-        
-        # 检查模型是否可用
-        if not is_model_available(self.model_type):
-            raise ValueError(f"模型 '{self.model_type}' 不可用或配置不完整")
+        self.model_type = model_type or get_ai_config_manager().default_model
         
-        # 获取模型配置
-        config = get_model_config(self.model_type)
-        if not config:
-            raise ValueError(f"无法获取模型 '{self.model_type}' 的配置")
+        # 获取模型配置（模型不可用时抛出 ValueError）
+        config = get_required_model_config(self.model_type)
         
         self.api_key = config['api_key']
         self.base_url = config['base_url']
         self.model = config['model']
         self.display_name = config['display_name']
         
-        # 初始化客户端
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
+        # 获取客户端（进程内复用，避免重复建立连接）
+        self.client = get_openai_client(self.api_key, self.base_url)
+        self.conversation_history = OrderedDict()  # 每个文档的对话记录（不含系统提示词和分析请求），按最近使用排序
+        self.document_texts = {}  # 压缩后的文档文本 {doc_id: zlib数据}，组装消息时再解压
+        self._lock = threading.Lock()  # 保护文档的加入和淘汰
+        self.history_versions = {}  # 对话历史的版本号，历史每次变化时更新 {doc_id: 版本号}
+        self.document_hashes = {}  # 文档文本的哈希 {doc_id: 哈希}，相同内容的文档共用问答缓存
+        self.cache = get_llm_cache()
+        self.semantic_cache = get_semantic_cache()
+    
+    def get_history_version(self, doc_id: str) -> int:
+        """获取文档对话历史的版本号（从未有过对话历史时为 0）"""
+        return self.history_versions.get(doc_id, 0)
+    
+    def _touch_history(self, doc_id: str):
+        """对话历史发生变化，更新版本号"""
+        self.history_versions[doc_id] = next(_history_versions)
+    
+    def _build_messages(self, doc_id: str) -> List[Dict[str, str]]:
+        """
+        组装完整的对话消息（系统提示词和文档内容 + 分析请求 + 对话记录）
+        
+        文档内容放在系统消息中，同一文档每轮对话发送的开头部分逐字节相同，可命中服务商的前缀缓存
+        """
+        document_text = zlib.decompress(self.document_texts[doc_id]).decode('utf-8')
+        return [
+            {
+                "role": "system",
+                "content": f"你是一个专业的HR助手，擅长分析简历并回答相关问题。用户上传了一份简历，请仔细分析。\n\n简历的完整内容：\n\n{document_text}"
+            },
+            {
+                "role": "user",
+                "content": "请分析这份简历，提取关键信息并总结候选人的情况。"
+            },
+            *self.conversation_history[doc_id]
+        ]
+    
+    def _semantic_namespace(self, doc_id: str) -> str:
+        """
+        对话问题的语义缓存命名空间：模型 + 文档内容 + 之前的对话记录
+        
+        只在对话上下文完全相同时复用近似问题的回答（"继续"、"为什么？"等追问的回答取决于之前的对话）
+        """
+        history = json_utils.dumps(self.conversation_history[doc_id]).encode('utf-8')
+        history_digest = hashlib.blake2b(history, digest_size=16).hexdigest()
+        return f"{self.model_type}:{self.model}:chat:{self.document_hashes.get(doc_id, doc_id)}:{history_digest}"
+    
+    def _completion_key(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """对话内容的缓存键"""
+        return self.cache.make_key(
+            f"{self.model_type}:{self.model}", temperature, str(max_tokens),
+            *(f"{message['role']}:{message['content']}" for message in messages)
         )
-        self.conversation_history = {}  # 存储每个文档的对话历史
     
-    def read_pdf_as_base64(self, pdf_path: str) -> str:
-        """读取PDF文件并转换为base64"""
-        try:
-            with open(pdf_path, 'rb') as f:
-                pdf_content = f.read()
-                return base64.b64encode(pdf_content).decode('utf-8')
-        except Exception as e:
-            raise Exception(f"读取PDF文件失败: {str(e)}")
+    def _cached_completion(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """调用大模型，完全相同的对话内容（如重新上传同一份简历）直接返回缓存的回复"""
+        cache_key = self._completion_key(messages, temperature, max_tokens)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        assistant_message = response.choices[0].message.content
+        self.cache.set(cache_key, assistant_message)
+        return assistant_message
     
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """
-        使用PyPDF2简单提取PDF文本
-        这是一个轻量级的备用方案
+        提取PDF文本（优先使用 PyMuPDF，未安装时使用 PyPDF2）
         """
         try:
-            import PyPDF2
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
+            return extract_pdf_text(pdf_path)
         except Exception as e:
             return f"提取PDF文本失败: {str(e)}"
     
@@ -89,33 +159,19 @@ class DocumentChatAgent:
                     'message': pdf_text
                 }
             
-            # 初始化对话历史
-            self.conversation_history[doc_id] = [
-                {
-                    "role": "system",
-                    "content": "你是一个专业的HR助手，擅长分析简历并回答相关问题。用户上传了一份简历，请仔细分析。"
-                },
-                {
-                    "role": "user",
-                    "content": f"这是一份简历的完整内容：\n\n{pdf_text}\n\n请分析这份简历，提取关键信息并总结候选人的情况。"
-                }
-            ]
+            self._start_conversation(doc_id, pdf_text)
             
             # 调用AI分析
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history[doc_id],
-                temperature=0.7,
-                max_tokens=2000
+            assistant_message = self._cached_completion(
+                self._build_messages(doc_id), ANALYSIS_TEMPERATURE, ANALYSIS_MAX_TOKENS
             )
             
-            assistant_message = response.choices[0].message.content
-            
             # 保存AI回复到历史
             self.conversation_history[doc_id].append({
                 "role": "assistant",
                 "content": assistant_message
             })
+            self._touch_history(doc_id)
             
             return {
                 'success': True,
@@ -130,6 +186,156 @@ class DocumentChatAgent:
                 'error': f'分析文档时出错: {str(e)}'
             }
     
+    def analyze_documents_concurrent(self, documents: Dict[str, str], max_workers: int = None) -> Dict[str, Dict[str, Any]]:
+        """
+        并发分析多份文档（在线调用，需要立即得到结果时使用；不急于得到结果时可用 analyze_documents_batch）
+        
+        Args:
+            documents: {doc_id: PDF文件路径}
+            max_workers: 最大并发数，默认读取 AI_BATCH_CONCURRENCY
+            
+        Returns:
+            {doc_id: 分析结果}
+        """
+        if not documents:
+            return {}
+        
+        # 每个线程各自提取PDF文本并等待网络请求，文本提取与其他文档的请求等待相互重叠
+        max_workers = min(max_workers or BATCH_CONCURRENCY, len(documents))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda item: self.analyze_document(item[1], item[0]),
+                documents.items()
+            )
+            return dict(zip(documents, results))
+    
+    def _start_conversation(self, doc_id: str, pdf_text: str):
+        """初始化文档的对话历史（文档文本压缩保存一份，对话记录从空开始）"""
+        document_hash = hashlib.sha256(pdf_text.encode('utf-8')).hexdigest()
+        document_text = zlib.compress(truncate_text(pdf_text, DOCUMENT_CHAR_LIMIT).encode('utf-8'))
+        with self._lock:
+            # 文档数达到上限时淘汰最久未使用的文档
+            while (CHAT_MAX_DOCUMENTS > 0 and doc_id not in self.conversation_history
+                   and len(self.conversation_history) >= CHAT_MAX_DOCUMENTS):
+                evicted_id, _ = self.conversation_history.popitem(last=False)
+                self.document_texts.pop(evicted_id, None)
+                self.document_hashes.pop(evicted_id, None)
+                self._touch_history(evicted_id)
+            
+            self.document_hashes[doc_id] = document_hash
+            self.document_texts[doc_id] = document_text
+            self.conversation_history[doc_id] = []
+            self.conversation_history.move_to_end(doc_id)
+            self._touch_history(doc_id)
+    
+    def submit_documents_batch(self, documents: Dict[str, str]) -> str:
+        """
+        将多份文档的初步分析提交为服务商的离线批处理任务（Batch API）
+        
+        适合批量导入简历等对时效要求不高的场景，费用低于逐份在线调用；交互式对话仍使用 analyze_document。
+        文本提取失败的文档不会提交，结果中也没有对应条目。
+        
+        Args:
+            documents: {doc_id: PDF文件路径}
+            
+        Returns:
+            批处理任务ID，用于 collect_documents_batch 获取结果
+        """
+        lines = []
+        for doc_id, pdf_path in documents.items():
+            pdf_text = self.extract_text_from_pdf(pdf_path)
+            if not pdf_text or pdf_text.startswith("提取PDF文本失败"):
+                continue
+            
+            self._start_conversation(doc_id, pdf_text)
+            lines.append(json_utils.dumps({
+                "custom_id": doc_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": self._build_messages(doc_id),
+                    "temperature": ANALYSIS_TEMPERATURE,
+                    "max_tokens": ANALYSIS_MAX_TOKENS
+                }
+            }))
+        
+        if not lines:
+            raise ValueError("没有可提交的文档（PDF文本提取均失败）")
+        
+        batch_file = self.client.files.create(
+            file=("document_analysis_batch.jsonl", "\n".join(lines).encode('utf-8')),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+    
+    def collect_documents_batch(self, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        获取批处理任务的分析结果，并写入各文档的对话历史（之后可继续 chat_with_document）
+        
+        Args:
+            batch_id: submit_documents_batch 返回的任务ID
+            
+        Returns:
+            {doc_id: 分析结果}；任务尚未完成时返回 None
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in ('failed', 'expired', 'cancelled'):
+            raise RuntimeError(f"批处理任务 {batch_id} 未完成，状态: {batch.status}")
+        if batch.status != 'completed':
+            return None
+        
+        results = {}
+        if batch.output_file_id:
+            content = self.client.files.content(batch.output_file_id).text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                record = json_utils.loads(line)
+                doc_id = record['custom_id']
+                response = record.get('response') or {}
+                if record.get('error') or response.get('status_code') != 200:
+                    results[doc_id] = {'error': f"分析文档时出错: {record.get('error') or response.get('body')}"}
+                    continue
+                
+                assistant_message = response['body']['choices'][0]['message']['content']
+                if doc_id in self.conversation_history:
+                    self.conversation_history[doc_id].append({
+                        "role": "assistant",
+                        "content": assistant_message
+                    })
+                    self._touch_history(doc_id)
+                results[doc_id] = {
+                    'success': True,
+                    'doc_id': doc_id,
+                    'analysis': assistant_message,
+                    'message': '文档分析完成'
+                }
+        return results
+    
+    def analyze_documents_batch(self, documents: Dict[str, str], poll_interval: int = 60) -> Dict[str, Dict[str, Any]]:
+        """
+        提交批处理任务并等待完成（阻塞，适合离线脚本）
+        
+        Args:
+            documents: {doc_id: PDF文件路径}
+            poll_interval: 查询任务状态的间隔秒数
+            
+        Returns:
+            {doc_id: 分析结果}
+        """
+        batch_id = self.submit_documents_batch(documents)
+        while True:
+            results = self.collect_documents_batch(batch_id)
+            if results is not None:
+                return results
+            time.sleep(poll_interval)
+    
     def chat_with_document(self, doc_id: str, user_message: str) -> Dict[str, Any]:
         """
         基于已上传的文档进行对话
@@ -148,34 +354,41 @@ class DocumentChatAgent:
                     'error': '文档未找到，请先上传并分析文档'
                 }
             
+            self.conversation_history.move_to_end(doc_id)
+            
+            # 针对同一文档、相同对话上下文中的近似重复问题直接复用已有回答
+            semantic_namespace = self._semantic_namespace(doc_id)
+            
             # 添加用户消息到历史
             self.conversation_history[doc_id].append({
                 "role": "user",
                 "content": user_message
             })
+            self._touch_history(doc_id)
             
-            # 调用AI获取回复
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history[doc_id],
-                temperature=0.7,
-                max_tokens=1500
-            )
+            question_vector = embed_text(user_message)
+            assistant_message = self.semantic_cache.get(semantic_namespace, question_vector)
             
-            assistant_message = response.choices[0].message.content
+            if assistant_message is None:
+                # 调用AI获取回复
+                assistant_message = self._cached_completion(
+                    self._build_messages(doc_id), CHAT_TEMPERATURE, CHAT_MAX_TOKENS
+                )
+                self.semantic_cache.add(semantic_namespace, question_vector, assistant_message)
             
             # 保存AI回复到历史
             self.conversation_history[doc_id].append({
                 "role": "assistant",
                 "content": assistant_message
             })
+            self._touch_history(doc_id)
             
             return {
                 'success': True,
                 'doc_id': doc_id,
                 'user_message': user_message,
                 'ai_response': assistant_message,
-                'conversation_length': len(self.conversation_history[doc_id])
+                'conversation_length': len(self.conversation_history[doc_id]) + 2  # 含系统提示词和分析请求
             }
             
         except Exception as e:
@@ -183,6 +396,82 @@ class DocumentChatAgent:
                 'error': f'对话时出错: {str(e)}'
             }
     
+    def chat_with_document_stream(self, doc_id: str, user_message: str) -> Iterator[str]:
+        """
+        基于已上传的文档进行对话（流式返回回复，收到一段输出即返回一段）
+        
+        问题和回复在回复全部返回后才一起写入对话历史和缓存（客户端中途断开时不留下没有回复的问题）；
+        命中缓存时一次性返回完整回复。
+        
+        Args:
+            doc_id: 文档ID
+            user_message: 用户的问题或消息
+            
+        Returns:
+            回复文本片段的迭代器
+            
+        Raises:
+            KeyError: 文档未找到
+        """
+        if doc_id not in self.conversation_history:
+            raise KeyError('文档未找到，请先上传并分析文档')
+        
+        self.conversation_history.move_to_end(doc_id)
+        
+        # 相同对话上下文中的近似重复问题或完全相同的对话内容直接复用已有回答
+        semantic_namespace = self._semantic_namespace(doc_id)
+        question_vector = embed_text(user_message)
+        user_turn = {"role": "user", "content": user_message}
+        messages = self._build_messages(doc_id) + [user_turn]
+        cache_key = self._completion_key(messages, CHAT_TEMPERATURE, CHAT_MAX_TOKENS)
+        assistant_message = self.semantic_cache.get(semantic_namespace, question_vector)
+        if assistant_message is None:
+            assistant_message = self.cache.get(cache_key)
+        
+        if assistant_message is not None:
+            self._append_turns(doc_id, user_turn, assistant_message)
+            return iter([assistant_message])
+        
+        return self._stream_reply(doc_id, user_turn, messages, cache_key, semantic_namespace, question_vector)
+    
+    def _append_turns(self, doc_id: str, user_turn: Dict[str, str], assistant_message: str):
+        """保存一轮问答到对话历史（对话期间文档可能已被清除或淘汰）"""
+        if doc_id in self.conversation_history:
+            self.conversation_history[doc_id].append(user_turn)
+            self.conversation_history[doc_id].append({
+                "role": "assistant",
+                "content": assistant_message
+            })
+            self._touch_history(doc_id)
+    
+    def _stream_reply(self, doc_id: str, user_turn: Dict[str, str], messages: List[Dict[str, str]], cache_key: str,
+                      semantic_namespace: str, question_vector) -> Iterator[str]:
+        """流式调用大模型并逐段返回，全部返回后保存本轮问答（中途停止读取或出错时不保存）"""
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=CHAT_TEMPERATURE,
+            max_tokens=CHAT_MAX_TOKENS,
+            stream=True
+        )
+        pieces = []
+        try:
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    pieces.append(delta)
+                    yield delta
+        finally:
+            # 调用方提前停止读取（如客户端断开）时关闭连接，服务端随即停止生成
+            response.close()
+        
+        assistant_message = "".join(pieces)
+        self.cache.set(cache_key, assistant_message)
+        self.semantic_cache.add(semantic_namespace, question_vector, assistant_message)
+        self._append_turns(doc_id, user_turn, assistant_message)
+    
     def get_conversation_history(self, doc_id: str) -> List[Dict[str, str]]:
         """
         获取对话历史
@@ -198,7 +487,7 @@ class DocumentChatAgent:
         
         # 返回除了系统消息外的对话历史
         history = []
-        for msg in self.conversation_history[doc_id]:
+        for msg in self._build_messages(doc_id):
             if msg['role'] != 'system':
                 history.append({
                     'role': msg['role'],
@@ -219,5 +508,8 @@ class DocumentChatAgent:
         """
         if doc_id in self.conversation_history:
             del self.conversation_history[doc_id]
+            self.document_texts.pop(doc_id, None)
+            self.document_hashes.pop(doc_id, None)
+            self._touch_history(doc_id)
             return True
         return False
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+.env 加载缓存 - 各模块导入时都会加载 .env，同一进程内文件未修改时只解析一次
+"""
+
+import os
+import threading
+from dotenv import find_dotenv, load_dotenv
+
+_lock = threading.Lock()
+# 已加载的 .env 文件 {路径: (修改时间, 是否覆盖了已有环境变量)}
+_loaded = {}
+
+
+def load(override: bool = False) -> bool:
+    """
+    加载 .env 到环境变量（与 load_dotenv 相同），文件自上次加载后未修改时直接跳过
+
+    Args:
+        override: 是否覆盖已存在的环境变量（重新加载配置时使用）
+
+    Returns:
+        是否找到 .env 文件
+    """
+    path = find_dotenv()
+    if not path:
+        return False
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+
+    with _lock:
+        previous = _loaded.get(path)
+        # 文件未修改，且上次加载的覆盖方式已满足本次要求
+        if previous is not None and previous[0] == mtime and (previous[1] or not override):
+            return True
+        load_dotenv(path, override=override)
+        _loaded[path] = (mtime, override)
+    return True
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn 配置
+
+默认使用单进程 + 多线程：文件接收、PDF解析和大模型请求在线程间并发，
+等待网络时不会阻塞其他请求。
+
+同时等待大模型响应的请求很多时，可设置 GUNICORN_WORKER_CLASS=gevent
+（需 pip install gevent），单进程内用协程处理数百个并发请求，不受线程数限制。
+
+简历池、福利政策池默认保存在 POOL_DB_PATH 指定的 SQLite 文件中（默认 pools.db），
+同一台机器上可通过 GUNICORN_WORKERS 启动多个进程共享；多台机器部署时设置 REDIS_URL
+由 Redis 保存两个池。POOL_DB_PATH 设为空时两个池只保存在进程内存中，此时只能使用单进程。
+多进程时池的单个读写操作在进程间一致，但先查重再入池等多步操作的锁只在进程内有效。
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))  # 仅 gevent 使用
+
+# 大模型分析单份简历可能耗时数十秒
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '180'))
+keepalive = 5
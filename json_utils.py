@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON工具 - 优先使用 orjson 加速解析与序列化，未安装时回退到标准库 json
+"""
+
+import re
+import json
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+# markdown代码块：取第一个代码块的内容，缺少结尾标记时取到文本末尾
+_CODE_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*(?:```|$)', re.S)
+
+# 解析失败时可能抛出的异常类型（orjson.JSONDecodeError 是 json.JSONDecodeError 的子类）
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(text):
+    """解析JSON字符串或字节串"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def dumps(obj, indent: bool = False) -> str:
+    """
+    序列化为JSON字符串，保留中文字符不转义
+
+    Args:
+        obj: 待序列化的对象
+        indent: 是否使用2空格缩进
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+
+def dumps_bytes(obj) -> bytes:
+    """序列化为UTF-8编码的JSON字节串（用于HTTP响应，省去一次编码）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def strip_code_fence(text: str) -> str:
+    """移除可能的markdown代码块标记（未开启JSON模式的模型仍可能返回代码块）"""
+    match = _CODE_FENCE_RE.match(text)
+    return match.group(1) if match else text
+
+
+def compile_projection(spec: dict):
+    """
+    根据字段规格预先生成提取函数，只保留需要的字段
+
+    规格中 True 表示原样保留该字段；嵌套 dict 表示只保留子字段，
+    对应的值为列表时逐项提取。
+
+    Args:
+        spec: 字段规格，如 {"name": True, "contact": {"email": True}}
+
+    Returns:
+        提取函数 extract(data) -> dict
+    """
+    fields = tuple(
+        (key, compile_projection(sub) if isinstance(sub, dict) else None)
+        for key, sub in spec.items()
+    )
+
+    def extract(data):
+        if isinstance(data, list):
+            return [extract(item) for item in data]
+        if not isinstance(data, dict):
+            return data
+        result = {}
+        for key, sub_extract in fields:
+            if key in data:
+                value = data[key]
+                result[key] = sub_extract(value) if sub_extract else value
+        return result
+
+    return extract
+
+
+class JSONObjectScanner:
+    """增量扫描文本，检测最外层JSON对象何时结束（用于流式输出提前停止）"""
+
+    def __init__(self):
+        self.start = None  # 第一个 { 的位置
+        self.end = None  # 与之匹配的 } 之后的位置
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> bool:
+        """
+        输入新一段文本
+
+        Returns:
+            最外层JSON对象是否已结束
+        """
+        if self.end is not None:
+            return True
+
+        for offset, char in enumerate(chunk):
+            if self.start is None:
+                if char == '{':
+                    self.start = self._position + offset
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = self._position + offset + 1
+                    break
+
+        self._position += len(chunk)
+        return self.end is not None
+
+    def extract(self, text: str) -> Optional[str]:
+        """从已输入的完整文本中取出JSON对象部分"""
+        if self.end is None:
+            return None
+        return text[self.start:self.end]
+
+
+def read_json_stream(pieces) -> str:
+    """读取流式输出，最外层JSON对象结束后不再接收剩余内容"""
+    scanner = JSONObjectScanner()
+    parts = []
+    for piece in pieces:
+        if not piece:
+            continue
+        parts.append(piece)
+        if scanner.feed(piece):
+            return scanner.extract(''.join(parts))
+    return ''.join(parts).strip()
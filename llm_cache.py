@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型响应缓存
+- 精确缓存：内存LRU + SQLite磁盘持久化，相同的请求直接返回已有结果
+- 语义缓存：内容高度相似的输入（如轻微修改后重新上传的简历）复用已有结果
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+from text_utils import cosine_similarity
+
+
+class LLMCache:
+    """大模型响应缓存（精确匹配）"""
+
+    def __init__(self, db_path: Optional[str] = None, max_memory_items: int = 1024):
+        """
+        初始化缓存
+
+        Args:
+            db_path: SQLite缓存文件路径，默认读取 LLM_CACHE_PATH
+            max_memory_items: 内存LRU最多保留的条目数
+        """
+        self.enabled = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        self.db_path = db_path or os.getenv('LLM_CACHE_PATH', 'llm_cache.db')
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()  # 内存LRU {key: response}
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # 每次写入缓存都会提交，WAL + NORMAL 避免每条记录都同步刷盘
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_time DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, *parts: str) -> str:
+        """根据模型、温度和提示词内容生成缓存键"""
+        payload = json.dumps(
+            {'m': model, 't': temperature, 'p': parts},
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中返回 None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+            row = self._conn.execute(
+                'SELECT response FROM llm_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._remember(key, row[0])
+            return row[0]
+
+    def set(self, key: str, response: str):
+        """写入缓存（内存 + 磁盘）"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._remember(key, response)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO llm_cache (key, response) VALUES (?, ?)',
+                (key, response)
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, response: str):
+        """写入内存LRU，超出容量时淘汰最久未使用的条目"""
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+
+class SemanticCache:
+    """语义缓存（近似匹配） - 内容高度相似的输入复用已有结果"""
+
+    def __init__(self, threshold: Optional[float] = None, max_items: int = 512):
+        """
+        初始化语义缓存
+
+        Args:
+            threshold: 余弦相似度命中阈值，默认读取 SEMANTIC_CACHE_THRESHOLD
+            max_items: 每个命名空间最多保留的条目数
+        """
+        self.enabled = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+        if threshold is None:
+            threshold = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.97'))
+        self.threshold = threshold
+        self.max_items = max_items
+        self._entries = {}  # {namespace: [(向量, 结果), ...]}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, vector: array) -> Optional[str]:
+        """查找最相似的条目，相似度达到阈值时返回其结果"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entries = list(self._entries.get(namespace, ()))
+
+        best_score, best_response = 0.0, None
+        for entry_vector, response in entries:
+            score = cosine_similarity(vector, entry_vector)
+            if score > best_score:
+                best_score, best_response = score, response
+
+        if best_score >= self.threshold:
+            return best_response
+        return None
+
+    def add(self, namespace: str, vector: array, response: str):
+        """添加条目，超出容量时淘汰最早的条目"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            entries = self._entries.setdefault(namespace, [])
+            entries.append((vector, response))
+            if len(entries) > self.max_items:
+                del entries[0]
+
+
+def pool_fingerprint(pool) -> str:
+    """
+    计算简历池/政策库内容的指纹，池内文档不变时指纹不变（用作查询结果缓存键的一部分）
+
+    优先使用上传时记录的文件内容哈希，没有时对解析出的文本计算哈希
+    """
+    digest = hashlib.sha256()
+    for doc_id in sorted(pool):
+        data = pool[doc_id]
+        content = data.get('content_hash') or data.get('raw_text', '').encode('utf-8')
+        digest.update(f"{doc_id}\0{len(content)}\0".encode('utf-8'))
+        digest.update(content)
+    return digest.hexdigest()
+
+# 全局缓存实例（延迟初始化）
+_llm_cache = None
+_semantic_cache = None
+
+
+def get_llm_cache() -> LLMCache:
+    """获取全局缓存实例"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
+
+
+def get_semantic_cache() -> SemanticCache:
+    """获取全局语义缓存实例"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+    return _semantic_cache
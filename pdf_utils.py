@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF工具 - 优先使用 PyMuPDF 提取文本（速度明显快于纯Python解析），
+其次使用 pypdfium2，都未安装时回退到 PyPDF2
+提取结果按文件内容缓存到磁盘，同一文件（包括重新上传的相同文件）只解析一次；
+缓存按保留时间和总大小定期清理，文档移出简历池或政策库时删除对应的缓存
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+import threading
+
+# PDF解析后端：auto（按 PyMuPDF、pypdfium2 的顺序使用已安装的库）或 pypdf2（始终使用 PyPDF2）
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'auto').lower()
+
+# PDF文本缓存目录（为空时不缓存）
+PDF_TEXT_CACHE_DIR = os.getenv('PDF_TEXT_CACHE_DIR', os.path.join('.cache', 'pdf_text'))
+# 缓存文件的保留时间（秒，0 表示不限），过期后不再使用并在清理时删除
+PDF_TEXT_CACHE_MAX_AGE = int(os.getenv('PDF_TEXT_CACHE_MAX_AGE', str(30 * 24 * 3600)))
+# 缓存目录的总大小上限（字节，0 表示不限），超出时从最早写入的文件开始删除
+PDF_TEXT_CACHE_MAX_BYTES = int(os.getenv('PDF_TEXT_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+# 写入缓存后清理缓存目录的最短间隔（秒）
+PDF_TEXT_CACHE_PRUNE_INTERVAL = 600
+
+try:
+    import pymupdf
+except ImportError:  # PyMuPDF 为可选依赖，旧版本的模块名为 fitz
+    try:
+        import fitz as pymupdf
+    except ImportError:
+        pymupdf = None
+
+try:
+    import pypdfium2
+except ImportError:  # pypdfium2 为可选依赖
+    pypdfium2 = None
+
+if PDF_BACKEND == 'pypdf2':
+    pymupdf = None
+    pypdfium2 = None
+
+
+# 实际使用的解析后端（不同后端提取的文本略有差异，作为缓存键的一部分）
+_BACKEND_NAME = 'pymupdf' if pymupdf is not None else 'pypdfium2' if pypdfium2 is not None else 'pypdf2'
+
+
+def _file_digest(file_path: str) -> str:
+    """计算文件内容的哈希（分块读取）"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def _cache_expired(mtime: float, now: float) -> bool:
+    return PDF_TEXT_CACHE_MAX_AGE > 0 and now - mtime > PDF_TEXT_CACHE_MAX_AGE
+
+
+def prune_text_cache():
+    """删除过期的缓存文件；总大小仍超出上限时，从最早写入的文件开始删除"""
+    now = time.time()
+    entries = []
+    try:
+        with os.scandir(PDF_TEXT_CACHE_DIR) as scanner:
+            for entry in scanner:
+                if not entry.name.endswith('.txt'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return
+    
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in entries:
+        if not _cache_expired(mtime, now) and (PDF_TEXT_CACHE_MAX_BYTES <= 0 or total <= PDF_TEXT_CACHE_MAX_BYTES):
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def _maybe_prune():
+    """距上次清理超过 PDF_TEXT_CACHE_PRUNE_INTERVAL 秒时清理缓存目录"""
+    global _last_prune
+    now = time.monotonic()
+    with _prune_lock:
+        if _last_prune and now - _last_prune < PDF_TEXT_CACHE_PRUNE_INTERVAL:
+            return
+        _last_prune = now
+    prune_text_cache()
+
+
+def remove_cached_text(file_path: str):
+    """删除文件对应的文本缓存（文档移出简历池或政策库时调用；文件或缓存不存在时忽略）"""
+    if not PDF_TEXT_CACHE_DIR:
+        return
+    try:
+        digest = _file_digest(file_path)
+    except OSError:
+        return
+    for backend in ('pymupdf', 'pypdfium2', 'pypdf2'):
+        try:
+            os.remove(os.path.join(PDF_TEXT_CACHE_DIR, f"{backend}-{digest}.txt"))
+        except OSError:
+            pass
+
+
+def extract_pdf_text(file_path: str) -> str:
+    """提取PDF全部页面的文本，页与页之间以换行分隔（开启缓存时相同内容的文件直接读取上次的结果）"""
+    if not PDF_TEXT_CACHE_DIR:
+        return _extract_pdf_text(file_path)
+    
+    cache_path = os.path.join(PDF_TEXT_CACHE_DIR, f"{_BACKEND_NAME}-{_file_digest(file_path)}.txt")
+    try:
+        with open(cache_path, 'r', encoding='utf-8', newline='') as file:
+            if not _cache_expired(os.fstat(file.fileno()).st_mtime, time.time()):
+                return file.read()
+    except FileNotFoundError:
+        pass
+    
+    text = _extract_pdf_text(file_path)
+    
+    # 先写临时文件再替换，多个进程同时解析同一文件时不会读到写了一半的缓存；缓存写入失败不影响结果
+    try:
+        os.makedirs(PDF_TEXT_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=PDF_TEXT_CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as file:
+                file.write(text)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+    else:
+        _maybe_prune()
+    return text
+
+
+def _extract_pdf_text(file_path: str) -> str:
+    """使用可用的解析库提取PDF文本"""
+    if pymupdf is not None:
+        with pymupdf.open(file_path) as doc:
+            return "\n".join(page.get_text("text") for page in doc) + "\n"
+
+    if pypdfium2 is not None:
+        doc = pypdfium2.PdfDocument(file_path)
+        try:
+            return "".join(page.get_textpage().get_text_range() + "\n" for page in doc)
+        finally:
+            doc.close()
+
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return "".join((page.extract_text() or "") + "\n" for page in pdf_reader.pages)
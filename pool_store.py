@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+简历池 / 福利政策池的存储
+默认保存在 SQLite 文件中（多个 worker 进程共享，重启后直接恢复，无需重新解析文档）；
+设置 REDIS_URL 后保存在 Redis；POOL_DB_PATH 设为空时只保存在进程内存中
+"""
+
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Any, Dict, Optional
+
+import json_utils
+
+# Redis 键名前缀，同一 Redis 上部署多套系统时可区分
+REDIS_KEY_PREFIX = os.getenv('REDIS_KEY_PREFIX', 'hr')
+
+# 保存两个池的 SQLite 文件，多个 worker 进程共享（设为空字符串时只保存在进程内存中）
+POOL_DB_PATH = os.getenv('POOL_DB_PATH', 'pools.db')
+
+
+def _encode_entry(value: Dict[str, Any]) -> bytes:
+    """
+    条目序列化为JSON（不使用 pickle：反序列化外部存储中的数据不能执行任意代码）
+
+    文本向量（array）保存为列表，文件内容哈希（bytes）保存为十六进制字符串
+    """
+    data = dict(value)
+    if data.get('embedding') is not None:
+        data['embedding'] = data['embedding'].tolist()
+    if isinstance(data.get('content_hash'), bytes):
+        data['content_hash'] = data['content_hash'].hex()
+    return json_utils.dumps_bytes(data)
+
+
+def _decode_entry(data: bytes) -> Dict[str, Any]:
+    """还原 _encode_entry 序列化的条目"""
+    value = json_utils.loads(data)
+    if value.get('embedding') is not None:
+        value['embedding'] = array('f', value['embedding'])
+    if isinstance(value.get('content_hash'), str):
+        value['content_hash'] = bytes.fromhex(value['content_hash'])
+    return value
+
+
+class LocalPool(dict):
+    """保存在进程内存中的池，每次增删后更新版本号（用于缓存池状态）"""
+
+    def __init__(self):
+        super().__init__()
+        self.version = 0
+        # 文件内容哈希 -> 文档ID（上传查重时不必遍历整个池）
+        self._hashes = {}
+
+    def __setitem__(self, doc_id: str, value: Dict[str, Any]):
+        super().__setitem__(doc_id, value)
+        if value.get('content_hash') is not None:
+            self._hashes[value['content_hash']] = doc_id
+        self.version += 1
+
+    def pop(self, doc_id: str, default=None):
+        if doc_id not in self:
+            return default
+        value = super().pop(doc_id)
+        if self._hashes.get(value.get('content_hash')) == doc_id:
+            del self._hashes[value['content_hash']]
+        self.version += 1
+        return value
+
+    def clear(self):
+        super().clear()
+        self._hashes.clear()
+        self.version += 1
+
+    def find_by_hash(self, content_hash: bytes) -> Optional[str]:
+        """按文件内容哈希查找文档ID（没有时返回 None）"""
+        return self._hashes.get(content_hash)
+
+
+class SQLitePool:
+    """
+    保存在 SQLite 文件中的池（doc_id -> JSON序列化后的条目）
+
+    与 RedisPool 接口相同：读写都直接访问数据库，不在进程内保留副本，
+    多个 worker 进程打开同一文件时看到同一份数据；版本号同样保存在数据库中。
+    进程重启后直接恢复，无需重新解析文档
+    """
+
+    def __init__(self, db_path: str, name: str):
+        self._name = name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+        # 每次增删都会提交，WAL + NORMAL 避免每条记录都同步刷盘，且读取不阻塞其他进程的写入
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        # 条目以JSON保存（表名与早期 pickle 格式的数据区分，不读取旧数据）；
+        # 文件内容哈希单独成列并建索引，上传查重时不必取出并解析整个池
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS pool_items (
+                pool TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                data BLOB NOT NULL,
+                content_hash BLOB,
+                PRIMARY KEY (pool, doc_id)
+            )
+        ''')
+        self._add_content_hash_column()
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_pool_items_hash ON pool_items (pool, content_hash)'
+        )
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS pool_versions (
+                pool TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        ''')
+        self._conn.commit()
+
+    def _add_content_hash_column(self):
+        """旧版本创建的表没有 content_hash 列时补上，并从已有条目中回填"""
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(pool_items)')}
+        if 'content_hash' in columns:
+            return
+        self._conn.execute('ALTER TABLE pool_items ADD COLUMN content_hash BLOB')
+        rows = self._conn.execute('SELECT pool, doc_id, data FROM pool_items').fetchall()
+        self._conn.executemany(
+            'UPDATE pool_items SET content_hash = ? WHERE pool = ? AND doc_id = ?',
+            [(_decode_entry(data).get('content_hash'), pool, doc_id) for pool, doc_id, data in rows]
+        )
+
+    def _write(self, sql: str, params: tuple):
+        """执行一条修改语句并递增版本号（同一事务内提交）"""
+        with self._lock:
+            return self._write_locked(sql, params)
+
+    def _write_locked(self, sql: str, params: tuple):
+        """同 _write，调用方已持有 self._lock"""
+        try:
+            cursor = self._conn.execute(sql, params)
+            self._conn.execute(
+                'INSERT INTO pool_versions (pool, version) VALUES (?, 1) '
+                'ON CONFLICT (pool) DO UPDATE SET version = version + 1',
+                (self._name,)
+            )
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            raise
+        return cursor
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT version FROM pool_versions WHERE pool = ?', (self._name,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def __setitem__(self, doc_id: str, value: Dict[str, Any]):
+        self._write(
+            'INSERT OR REPLACE INTO pool_items (pool, doc_id, data, content_hash) VALUES (?, ?, ?, ?)',
+            (self._name, doc_id, _encode_entry(value), value.get('content_hash'))
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM pool_items WHERE pool = ?', (self._name,)
+            ).fetchone()[0]
+
+    def get(self, doc_id: str, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM pool_items WHERE pool = ? AND doc_id = ?', (self._name, doc_id)
+            ).fetchone()
+        return _decode_entry(row[0]) if row else default
+
+    def find_by_hash(self, content_hash: bytes) -> Optional[str]:
+        """按文件内容哈希查找文档ID（走索引，没有时返回 None）"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT doc_id FROM pool_items WHERE pool = ? AND content_hash = ? LIMIT 1',
+                (self._name, content_hash)
+            ).fetchone()
+        return row[0] if row else None
+
+    def pop(self, doc_id: str, default=None):
+        """取出并删除条目（读取和删除在同一把锁内；条目不存在时不写入，版本号不变）"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM pool_items WHERE pool = ? AND doc_id = ?', (self._name, doc_id)
+            ).fetchone()
+            if row is None:
+                return default
+            self._write_locked('DELETE FROM pool_items WHERE pool = ? AND doc_id = ?', (self._name, doc_id))
+        return _decode_entry(row[0])
+
+    def clear(self):
+        """只删除本池的条目（各进程共享同一份数据，清空对所有进程生效）"""
+        self._write('DELETE FROM pool_items WHERE pool = ?', (self._name,))
+
+    def copy(self) -> Dict[str, Dict[str, Any]]:
+        """取出全部条目（一次查询）"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT doc_id, data FROM pool_items WHERE pool = ?', (self._name,)
+            ).fetchall()
+        return {doc_id: _decode_entry(data) for doc_id, data in rows}
+
+    def items(self):
+        return self.copy().items()
+
+
+class RedisPool:
+    """
+    保存在 Redis 哈希表中的池（doc_id -> 序列化后的条目）
+
+    提供与 dict 相同的 get / pop / clear / items / copy 及下标赋值接口，另有按内容哈希查找的 find_by_hash；
+    版本号同样保存在 Redis 中，各进程看到的版本一致。
+    每个操作本身是原子的（事务管道），但调用方的进程内锁（app.pool_lock）不跨进程，
+    多个操作组成的步骤（如先查重再写入）在不同进程间不互斥
+    """
+
+    def __init__(self, client, name: str):
+        self._client = client
+        # 条目以JSON保存（键名与早期 pickle 格式的数据区分，不读取旧数据）
+        self._key = f"{REDIS_KEY_PREFIX}:{name}:json"
+        self._version_key = f"{self._key}:version"
+        # 文件内容哈希 -> 文档ID（上传查重时不必 HGETALL 整个池）
+        self._hash_key = f"{self._key}:hashes"
+
+    @property
+    def version(self) -> int:
+        return int(self._client.get(self._version_key) or 0)
+
+    def __setitem__(self, doc_id: str, value: Dict[str, Any]):
+        pipe = self._client.pipeline()
+        pipe.hset(self._key, doc_id, _encode_entry(value))
+        if value.get('content_hash') is not None:
+            pipe.hset(self._hash_key, value['content_hash'], doc_id)
+        pipe.incr(self._version_key)
+        pipe.execute()
+
+    def __len__(self) -> int:
+        return self._client.hlen(self._key)
+
+    def get(self, doc_id: str, default=None):
+        data = self._client.hget(self._key, doc_id)
+        return _decode_entry(data) if data is not None else default
+
+    def pop(self, doc_id: str, default=None):
+        pipe = self._client.pipeline()
+        pipe.hget(self._key, doc_id)
+        pipe.hdel(self._key, doc_id)
+        pipe.incr(self._version_key)
+        data, _, _ = pipe.execute()
+        if data is None:
+            return default
+        value = _decode_entry(data)
+        content_hash = value.get('content_hash')
+        if content_hash is not None and self.find_by_hash(content_hash) == doc_id:
+            self._client.hdel(self._hash_key, content_hash)
+        return value
+
+    def clear(self):
+        pipe = self._client.pipeline()
+        pipe.delete(self._key, self._hash_key)
+        pipe.incr(self._version_key)
+        pipe.execute()
+
+    def find_by_hash(self, content_hash: bytes) -> Optional[str]:
+        """按文件内容哈希查找文档ID（没有时返回 None）"""
+        doc_id = self._client.hget(self._hash_key, content_hash)
+        return doc_id.decode('utf-8') if doc_id is not None else None
+
+    def copy(self) -> Dict[str, Dict[str, Any]]:
+        """取出全部条目（一次 HGETALL）"""
+        return {
+            doc_id.decode('utf-8'): _decode_entry(data)
+            for doc_id, data in self._client.hgetall(self._key).items()
+        }
+
+    def items(self):
+        return self.copy().items()
+
+
+_redis_client = None
+
+
+def _get_redis_client(url: str):
+    """获取共享的 Redis 客户端（内部维护连接池）"""
+    global _redis_client
+    if _redis_client is None:
+        import redis  # 仅在配置了 REDIS_URL 时需要安装
+        _redis_client = redis.Redis.from_url(url)
+    return _redis_client
+
+
+def create_pool(name: str, redis_url: Optional[str] = None):
+    """
+    创建池
+
+    Args:
+        name: 池名称（resume_pool / benefit_pool）
+        redis_url: Redis 地址，默认读取 REDIS_URL；为空时配置了 POOL_DB_PATH 则返回 SQLitePool，
+            否则返回只保存在进程内存中的 LocalPool
+    """
+    redis_url = redis_url if redis_url is not None else os.getenv('REDIS_URL', '')
+    if redis_url:
+        return RedisPool(_get_redis_client(redis_url), name)
+    if POOL_DB_PATH:
+        return SQLitePool(POOL_DB_PATH, name)
+    return LocalPool()
@@ -7,11 +7,52 @@
 
 import os
 import re
-import json
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Any
-import PyPDF2
 import docx
 from datetime import datetime
+from pdf_utils import extract_pdf_text
+from text_utils import truncate_text
+
+# 解析文件的进程数（PDF解析是CPU密集型任务，放到子进程中可同时利用多个核心；为 0 时在当前线程解析）
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', str(min(8, os.cpu_count() or 1))))
+
+# 解析简历使用的正则表达式（模块加载时编译一次）
+_CHINESE_NAME_RE = re.compile(r'^[\u4e00-\u9fa5]{2,4}$')
+_ENGLISH_NAME_RE = re.compile(r'^[A-Za-z\s]{2,20}$')
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PHONE_RES = (
+    re.compile(r'1[3-9]\d{9}'),  # 中国手机号
+    re.compile(r'\d{3}-\d{4}-\d{4}'),  # 美国电话格式
+    re.compile(r'\d{11}'),  # 11位数字
+)
+_EXPERIENCE_YEARS_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(\d+)\s*年.*?经验',
+    r'(\d+)\s*years.*?experience',
+    r'工作.*?(\d+)\s*年',
+    r'经验.*?(\d+)\s*年'
+))
+# 英文模式只在全文出现对应英文单词时使用（中文简历通常不含，可少扫描一遍）
+_EXPERIENCE_YEARS_CJK_RES = _EXPERIENCE_YEARS_RES[:1] + _EXPERIENCE_YEARS_RES[2:]
+_DATE_RANGE_RES = tuple(re.compile(pattern) for pattern in (
+    r'(\d{4})\s*[-至到]\s*(\d{4})',
+    r'(\d{4})\s*[-至到]\s*现在',
+    r'(\d{4})\s*[-至到]\s*至今'
+))
+_PERIOD_RE = re.compile(r'(\d{4})\s*[-至到]\s*(\d{4}|现在|至今)')
+# 各类段落标题合并为一个正则，全文只扫描一遍；全文不含英文标题时只使用中文部分
+_WORK_SECTION_CJK = r'(?:工作经[历验]|职业经历).*?(?=\n\n|\n[A-Z]|\n教育|\n项目|\Z)'
+_WORK_SECTION_EN = r'work experience.*?(?=\n\n|\neducation|\nprojects|\Z)'
+_WORK_SECTION_RE = re.compile(_WORK_SECTION_CJK + '|' + _WORK_SECTION_EN, re.IGNORECASE | re.DOTALL)
+_WORK_SECTION_CJK_RE = re.compile(_WORK_SECTION_CJK, re.IGNORECASE | re.DOTALL)
+# “项目”已包含“项目经历/项目经验”开头的段落
+_PROJECT_SECTION_CJK = r'项目.*?(?=\n\n|\n[A-Z]|\n工作|\n教育|\Z)'
+_PROJECT_SECTION_EN = r'projects.*?(?=\n\n|\nwork|\neducation|\Z)'
+_PROJECT_SECTION_RE = re.compile(_PROJECT_SECTION_CJK + '|' + _PROJECT_SECTION_EN, re.IGNORECASE | re.DOTALL)
+_PROJECT_SECTION_CJK_RE = re.compile(_PROJECT_SECTION_CJK, re.IGNORECASE | re.DOTALL)
 
 class ResumeAnalyzer:
     """简历分析器类"""
@@ -28,8 +69,14 @@ class ResumeAnalyzer:
             'ai_ml': ['机器学习', 'deep learning', 'tensorflow', 'pytorch', 'opencv', 'nlp']
         }
         
+        # 扁平化的技能关键词（小写，去重），提取技能时只需对全文扫描一遍
+        self._skill_terms = tuple(dict.fromkeys(
+            keyword.lower() for keywords in self.skill_keywords.values() for keyword in keywords
+        ))
+        
         # 学历关键词
         self.education_keywords = ['博士', '硕士', '学士', '本科', '专科', '大专', 'phd', 'master', 'bachelor']
+        self._education_terms = tuple((keyword, keyword.lower()) for keyword in self.education_keywords)
         
         # 工作经验关键词
         self.experience_keywords = ['工作经验', '工作经历', '项目经验', '实习经历', '职业经历']
@@ -43,18 +90,24 @@ class ResumeAnalyzer:
             if not text_content:
                 return {'error': '无法提取文件内容'}
             
+            # 全文小写只转换一次，各项提取共用
+            text_lower = text_content.lower()
+            
             # 分析各个维度
             analysis_result = {
                 'file_path': file_path,
                 'analysis_time': datetime.now().isoformat(),
                 'name': self._extract_name(text_content),
                 'contact': self._extract_contact(text_content),
-                'education': self._extract_education(text_content),
-                'experience_years': self._extract_experience_years(text_content),
-                'skills': self._extract_skills(text_content),
-                'work_experience': self._extract_work_experience(text_content),
-                'projects': self._extract_projects(text_content),
-                'raw_text': text_content[:1000]  # 保留前1000字符用于调试
+                'education': self._extract_education(text_content, text_lower),
+                'experience_years': self._extract_experience_years(text_content, text_lower),
+                'skills': self._extract_skills(text_content, text_lower),
+                'work_experience': self._extract_work_experience(text_content, text_lower),
+                'projects': self._extract_projects(text_content, text_lower),
+                # 保留开头和结尾共 RESUME_CHAR_LIMIT 字符，AI分析、筛选和全文检索都使用这部分文本
+                # （技能、证书等常位于末尾，只取开头会丢失）
+                'raw_text': truncate_text(text_content),
+                'text_length': len(text_content)  # 截断前的文本长度
             }
             
             return analysis_result
@@ -80,12 +133,7 @@ class ResumeAnalyzer:
     
     def _extract_from_pdf(self, file_path: str) -> str:
         """从PDF文件提取文本"""
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+        return extract_pdf_text(file_path)
     
     def _extract_from_docx(self, file_path: str) -> str:
         """从Word文件提取文本"""
@@ -108,10 +156,7 @@ class ResumeAnalyzer:
             line = line.strip()
             if line and len(line) <= 10 and not any(keyword in line.lower() for keyword in ['email', 'phone', 'tel', '电话', '邮箱']):
                 # 检查是否包含中文姓名模式
-                chinese_name_pattern = r'^[\u4e00-\u9fa5]{2,4}$'
-                english_name_pattern = r'^[A-Za-z\s]{2,20}$'
-                
-                if re.match(chinese_name_pattern, line) or re.match(english_name_pattern, line):
+                if _CHINESE_NAME_RE.match(line) or _ENGLISH_NAME_RE.match(line):
                     return line
         
         return "未识别"
@@ -121,59 +166,49 @@ class ResumeAnalyzer:
         contact_info = {}
         
         # 提取邮箱
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
+        emails = _EMAIL_RE.findall(text)
         if emails:
             contact_info['email'] = emails[0]
         
         # 提取电话号码
-        phone_patterns = [
-            r'1[3-9]\d{9}',  # 中国手机号
-            r'\d{3}-\d{4}-\d{4}',  # 美国电话格式
-            r'\d{11}',  # 11位数字
-        ]
-        
-        for pattern in phone_patterns:
-            phones = re.findall(pattern, text)
+        for pattern in _PHONE_RES:
+            phones = pattern.findall(text)
             if phones:
                 contact_info['phone'] = phones[0]
                 break
         
         return contact_info
     
-    def _extract_education(self, text: str) -> List[str]:
-        """提取教育背景"""
-        education_info = []
-        text_lower = text.lower()
+    def _extract_education(self, text: str, text_lower: str = None) -> List[str]:
+        """提取教育背景（text_lower 为已转换的小写全文，未传入时在此转换）"""
+        education_info = {}  # 以字典去重，保持出现顺序（结果稳定，便于缓存复用）
+        if text_lower is None:
+            text_lower = text.lower()
         
-        for keyword in self.education_keywords:
-            if keyword.lower() in text_lower:
-                education_info.append(keyword)
+        for keyword, keyword_lower in self._education_terms:
+            if keyword_lower in text_lower:
+                education_info[keyword] = None
         
         # 提取学校名称（简单实现）
         university_keywords = ['大学', '学院', 'university', 'college', 'institute']
-        lines = text.split('\n')
         
-        for line in lines:
+        for line, line_lower in zip(text.split('\n'), text_lower.split('\n')):
             for keyword in university_keywords:
-                if keyword in line.lower():
-                    education_info.append(line.strip())
+                if keyword in line_lower:
+                    education_info[line.strip()] = None
                     break
         
-        return list(set(education_info))  # 去重
+        return list(education_info)
     
-    def _extract_experience_years(self, text: str) -> int:
+    def _extract_experience_years(self, text: str, text_lower: str = None) -> int:
         """提取工作年限"""
-        # 查找年限相关的表述
-        year_patterns = [
-            r'(\d+)\s*年.*?经验',
-            r'(\d+)\s*years.*?experience',
-            r'工作.*?(\d+)\s*年',
-            r'经验.*?(\d+)\s*年'
-        ]
+        if text_lower is None:
+            text_lower = text.lower()
         
-        for pattern in year_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        # 查找年限相关的表述
+        patterns = _EXPERIENCE_YEARS_RES if 'years' in text_lower else _EXPERIENCE_YEARS_CJK_RES
+        for pattern in patterns:
+            matches = pattern.findall(text)
             if matches:
                 try:
                     return int(matches[0])
@@ -181,17 +216,11 @@ class ResumeAnalyzer:
                     continue
         
         # 通过工作经历时间段推算
-        date_patterns = [
-            r'(\d{4})\s*[-至到]\s*(\d{4})',
-            r'(\d{4})\s*[-至到]\s*现在',
-            r'(\d{4})\s*[-至到]\s*至今'
-        ]
-        
         total_years = 0
         current_year = datetime.now().year
         
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text)
+        for pattern in _DATE_RANGE_RES:
+            matches = pattern.findall(text)
             for match in matches:
                 try:
                     start_year = int(match[0])
@@ -202,109 +231,127 @@ class ResumeAnalyzer:
         
         return min(total_years, 50)  # 限制最大年限
     
-    def _extract_skills(self, text: str) -> List[str]:
-        """提取技能"""
-        skills = []
-        text_lower = text.lower()
-        
-        # 遍历技能关键词库
-        for category, keywords in self.skill_keywords.items():
-            for keyword in keywords:
-                if keyword.lower() in text_lower:
-                    skills.append(keyword)
+    def _extract_skills(self, text: str, text_lower: str = None) -> List[str]:
+        """提取技能（text_lower 为已转换的小写全文，未传入时在此转换）"""
+        if text_lower is None:
+            text_lower = text.lower()
         
-        # 查找技能相关段落
-        skill_section_patterns = [
-            r'技能.*?(?=\n\n|\n[A-Z]|\n\d+\.|\Z)',
-            r'专业技能.*?(?=\n\n|\n[A-Z]|\n\d+\.|\Z)',
-            r'skills.*?(?=\n\n|\n[A-Z]|\n\d+\.|\Z)'
-        ]
-        
-        for pattern in skill_section_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                # 从技能段落中提取更多技能
-                for category, keywords in self.skill_keywords.items():
-                    for keyword in keywords:
-                        if keyword.lower() in match.lower() and keyword not in skills:
-                            skills.append(keyword)
-        
-        return list(set(skills))  # 去重
+        # 技能段落是全文的子串，全文扫描已覆盖其中的关键词，无需再单独扫描
+        return [keyword for keyword in self._skill_terms if keyword in text_lower]
     
-    def _extract_work_experience(self, text: str) -> List[Dict[str, str]]:
+    def _extract_work_experience(self, text: str, text_lower: str = None) -> List[Dict[str, str]]:
         """提取工作经历"""
         experiences = []
+        if text_lower is None:
+            text_lower = text.lower()
         
         # 查找工作经历段落
-        experience_patterns = [
-            r'工作经[历验].*?(?=\n\n|\n[A-Z]|\n教育|\n项目|\Z)',
-            r'职业经历.*?(?=\n\n|\n[A-Z]|\n教育|\n项目|\Z)',
-            r'work experience.*?(?=\n\n|\neducation|\nprojects|\Z)'
-        ]
-        
-        for pattern in experience_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                # 简单解析工作经历
-                lines = match.split('\n')
-                current_experience = {}
+        pattern = _WORK_SECTION_RE if 'work experience' in text_lower else _WORK_SECTION_CJK_RE
+        for match in pattern.findall(text):
+            # 简单解析工作经历
+            lines = match.split('\n')
+            current_experience = {}
+            
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                
+                # 查找时间段
+                date_match = _PERIOD_RE.search(line)
+                if date_match:
+                    current_experience['period'] = date_match.group(0)
                 
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # 查找时间段
-                    date_match = re.search(r'(\d{4})\s*[-至到]\s*(\d{4}|现在|至今)', line)
-                    if date_match:
-                        current_experience['period'] = date_match.group(0)
-                    
-                    # 查找公司名称（包含"公司"、"有限公司"等）
-                    if any(keyword in line for keyword in ['公司', '集团', 'company', 'corp', 'ltd']):
-                        current_experience['company'] = line
-                    
-                    # 查找职位
-                    if any(keyword in line for keyword in ['工程师', '经理', '主管', '总监', 'engineer', 'manager', 'director']):
-                        current_experience['position'] = line
+                # 查找公司名称（包含"公司"、"有限公司"等）
+                if any(keyword in line for keyword in ['公司', '集团', 'company', 'corp', 'ltd']):
+                    current_experience['company'] = line
                 
-                if current_experience:
-                    experiences.append(current_experience)
+                # 查找职位
+                if any(keyword in line for keyword in ['工程师', '经理', '主管', '总监', 'engineer', 'manager', 'director']):
+                    current_experience['position'] = line
+            
+            if current_experience:
+                experiences.append(current_experience)
         
         return experiences
     
-    def _extract_projects(self, text: str) -> List[Dict[str, str]]:
+    def _extract_projects(self, text: str, text_lower: str = None) -> List[Dict[str, str]]:
         """提取项目经历"""
         projects = []
+        if text_lower is None:
+            text_lower = text.lower()
         
         # 查找项目经历段落
-        project_patterns = [
-            r'项目经[历验].*?(?=\n\n|\n[A-Z]|\n工作|\n教育|\Z)',
-            r'项目.*?(?=\n\n|\n[A-Z]|\n工作|\n教育|\Z)',
-            r'projects.*?(?=\n\n|\nwork|\neducation|\Z)'
-        ]
-        
-        for pattern in project_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                # 简单解析项目信息
-                lines = match.split('\n')
-                current_project = {}
+        pattern = _PROJECT_SECTION_RE if 'projects' in text_lower else _PROJECT_SECTION_CJK_RE
+        for match in pattern.findall(text):
+            # 简单解析项目信息
+            lines = match.split('\n')
+            current_project = {}
+            
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
                 
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # 项目名称通常在开头
-                    if '项目' in line and not current_project.get('name'):
-                        current_project['name'] = line
-                    
-                    # 技术栈
-                    if any(keyword in line.lower() for keyword in ['技术', 'technology', 'tech']):
-                        current_project['technology'] = line
+                # 项目名称通常在开头
+                if '项目' in line and not current_project.get('name'):
+                    current_project['name'] = line
                 
-                if current_project:
-                    projects.append(current_project)
+                # 技术栈
+                line_lower = line.lower()
+                if any(keyword in line_lower for keyword in ['技术', 'technology', 'tech']):
+                    current_project['technology'] = line
+            
+            if current_project:
+                projects.append(current_project)
         
         return projects
 
+
+# 解析进程池（首次使用时创建，各请求共用）
+_parse_executor = None
+_parse_executor_lock = threading.Lock()
+# 子进程中的分析器
+_worker_analyzer = None
+
+
+def _analyze_in_worker(file_path: str) -> Dict[str, Any]:
+    """在子进程中解析文件（子进程内复用同一个分析器）"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = ResumeAnalyzer()
+    return _worker_analyzer.analyze_resume(file_path)
+
+
+def _get_parse_executor() -> ProcessPoolExecutor:
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            # 使用 spawn 启动子进程，避免在多线程的服务进程中 fork
+            _parse_executor = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _parse_executor
+
+
+def analyze_resume_file(file_path: str, analyzer: ResumeAnalyzer = None) -> Dict[str, Any]:
+    """
+    在解析进程池中分析文件，多个上传请求的解析可在不同核心上同时进行
+    
+    Args:
+        file_path: 文件路径
+        analyzer: 未启用进程池或进程池不可用时在当前线程使用的分析器
+        
+    Returns:
+        与 ResumeAnalyzer.analyze_resume 相同的分析结果
+    """
+    if PARSE_WORKERS > 0:
+        try:
+            return _get_parse_executor().submit(_analyze_in_worker, file_path).result()
+        except BrokenProcessPool:
+            # 子进程异常退出，丢弃进程池，下次使用时重新创建
+            global _parse_executor
+            with _parse_executor_lock:
+                _parse_executor = None
+    return (analyzer or ResumeAnalyzer()).analyze_resume(file_path)
@@ -8,6 +8,102 @@
 import re
 from typing import Dict, List, Tuple, Any
 
+# 解析岗位需求使用的正则表达式（模块加载时编译一次）
+_SKILL_REQUIREMENT_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'技能.*?[:：]\s*([^\n]+)',
+    r'要求.*?[:：]\s*([^\n]+)',
+    r'熟悉\s*([^\n，,。.]+)',
+    r'掌握\s*([^\n，,。.]+)',
+    r'精通\s*([^\n，,。.]+)'
+))
+_EXPERIENCE_REQUIREMENT_RES = tuple(re.compile(pattern) for pattern in (
+    r'(\d+)\s*年以上.*?经验',
+    r'(\d+)\s*年.*?工作经验',
+    r'(\d+)\+\s*years',
+    r'至少\s*(\d+)\s*年'
+))
+_EDUCATION_REQUIREMENT_RES = tuple(re.compile(pattern) for pattern in (
+    r'(本科|学士|bachelor)以上',
+    r'(硕士|master)以上',
+    r'(博士|phd|doctor)',
+    r'(专科|大专)以上'
+))
+_KEYWORD_REQUIREMENT_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'关键词.*?[:：]\s*([^\n]+)',
+    r'优先.*?[:：]\s*([^\n]+)'
+))
+_SALARY_REQUIREMENT_RES = tuple(re.compile(pattern) for pattern in (
+    r'薪资.*?(\d+)[-到至]\s*(\d+)',
+    r'(\d+)k[-到至]\s*(\d+)k',
+    r'月薪.*?(\d+)'
+))
+_LIST_SEPARATOR_RE = re.compile(r'[，,、；;]')
+
+# 学历等级映射
+_EDUCATION_LEVELS = {
+    '博士': 4, 'phd': 4, 'doctor': 4,
+    '硕士': 3, 'master': 3,
+    '本科': 2, '学士': 2, 'bachelor': 2,
+    '专科': 1, '大专': 1
+}
+
+# 常见技能别名（统一为简历分析器技能词库中的写法）
+_SKILL_ALIASES = {
+    'js': 'javascript',
+    'ts': 'typescript',
+    'k8s': 'kubernetes',
+    'golang': 'go',
+    'node': 'nodejs',
+    'node.js': 'nodejs',
+    'vue.js': 'vue',
+    'react.js': 'react',
+    'postgres': 'postgresql',
+    'tf': 'tensorflow',
+}
+
+
+def _normalize_skill(skill: str) -> str:
+    """技能名称标准化（去除首尾空白、转小写、别名统一）"""
+    skill = skill.strip().lower()
+    return _SKILL_ALIASES.get(skill, skill)
+
+
+def _is_ascii_alnum(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+def _contains_term(text: str, term: str) -> bool:
+    """
+    term 作为完整的词出现在 text 中
+    
+    英文字母或数字开头/结尾的 term 要求前/后不紧接英文字母或数字（go 不匹配 django、mongodb），
+    中文不要求词边界（机器学习 匹配 机器学习算法）
+    """
+    if not term:
+        return False
+    check_start = _is_ascii_alnum(term[0])
+    check_end = _is_ascii_alnum(term[-1])
+    start = text.find(term)
+    while start != -1:
+        end = start + len(term)
+        if (not check_start or start == 0 or not _is_ascii_alnum(text[start - 1])) and \
+                (not check_end or end == len(text) or not _is_ascii_alnum(text[end])):
+            return True
+        start = text.find(term, start + 1)
+    return False
+
+
+def _education_level(education: List[str]) -> int:
+    """返回学历描述中出现的最高学历等级（未识别时为0）"""
+    level = 0
+    for edu in education:
+        edu = edu.lower()
+        for level_name, level_value in _EDUCATION_LEVELS.items():
+            if level_name in edu:
+                level = max(level, level_value)
+    return level
+
+
 class ResumeScreener:
     """简历筛选器类"""
     
@@ -21,13 +117,15 @@ class ResumeScreener:
             'keywords': 0.1     # 关键词匹配权重
         }
     
-    def screen_resume(self, resume_analysis: Dict[str, Any], requirements: str) -> Tuple[float, Dict[str, Any]]:
+    def screen_resume(self, resume_analysis: Dict[str, Any], requirements: str,
+                      parsed_requirements: Dict[str, Any] = None) -> Tuple[float, Dict[str, Any]]:
         """
         筛选单份简历
         
         Args:
             resume_analysis: 简历分析结果
             requirements: 筛选需求文本
+            parsed_requirements: 已解析的需求（批量筛选时由调用方解析一次后传入）
             
         Returns:
             Tuple[匹配度评分(0-100), 匹配详情]
@@ -36,13 +134,20 @@ class ResumeScreener:
             return 0.0, {'error': '简历分析失败'}
         
         # 解析需求
-        parsed_requirements = self._parse_requirements(requirements)
+        if parsed_requirements is None:
+            parsed_requirements = self._parse_requirements(requirements)
+        
+        # 技能和关键词的匹配结果各计算一次，同时用于评分和匹配详情
+        matched_skills, missing_skills = self._match_skills(resume_analysis, parsed_requirements)
+        matched_keywords = self._get_matched_keywords(resume_analysis, parsed_requirements)
+        required_skills = parsed_requirements.get('required_skills', [])
+        keywords = parsed_requirements.get('keywords', [])
         
-        # 计算各维度匹配度
-        skills_score = self._calculate_skills_match(resume_analysis, parsed_requirements)
+        # 计算各维度匹配度（没有对应要求时为满分）
+        skills_score = len(matched_skills) / len(required_skills) if required_skills else 1.0
         experience_score = self._calculate_experience_match(resume_analysis, parsed_requirements)
         education_score = self._calculate_education_match(resume_analysis, parsed_requirements)
-        keywords_score = self._calculate_keywords_match(resume_analysis, parsed_requirements)
+        keywords_score = len(matched_keywords) / len(keywords) if keywords else 1.0
         
         # 加权计算总分
         total_score = (
@@ -56,8 +161,8 @@ class ResumeScreener:
         match_details = {
             'skills_match': {
                 'score': skills_score,
-                'matched_skills': self._get_matched_skills(resume_analysis, parsed_requirements),
-                'missing_skills': self._get_missing_skills(resume_analysis, parsed_requirements)
+                'matched_skills': matched_skills,
+                'missing_skills': missing_skills
             },
             'experience_match': {
                 'score': experience_score,
@@ -71,12 +176,16 @@ class ResumeScreener:
             },
             'keywords_match': {
                 'score': keywords_score,
-                'matched_keywords': self._get_matched_keywords(resume_analysis, parsed_requirements)
+                'matched_keywords': matched_keywords
             }
         }
         
         return round(total_score, 2), match_details
     
+    def parse_requirements(self, requirements: str) -> Dict[str, Any]:
+        """解析需求文本（技能、工作年限、学历、关键词、薪资）"""
+        return self._parse_requirements(requirements)
+    
     def _parse_requirements(self, requirements: str) -> Dict[str, Any]:
         """解析需求文本"""
         parsed = {
@@ -85,40 +194,28 @@ class ResumeScreener:
             'min_experience_years': 0,
             'education_requirements': [],
             'keywords': [],
-            'salary_range': None
+            'salary_range': None,
+            'min_education_level': 0,
+            'normalized_skills': [],
+            'keywords_lower': []
         }
         
         requirements_lower = requirements.lower()
         
         # 提取技能要求
-        skill_patterns = [
-            r'技能.*?[:：]\s*([^\n]+)',
-            r'要求.*?[:：]\s*([^\n]+)',
-            r'熟悉\s*([^\n，,。.]+)',
-            r'掌握\s*([^\n，,。.]+)',
-            r'精通\s*([^\n，,。.]+)'
-        ]
-        
-        for pattern in skill_patterns:
-            matches = re.findall(pattern, requirements, re.IGNORECASE)
+        for pattern in _SKILL_REQUIREMENT_RES:
+            matches = pattern.findall(requirements)
             for match in matches:
                 # 分割技能
-                skills = re.split(r'[，,、；;]', match)
+                skills = _LIST_SEPARATOR_RE.split(match)
                 for skill in skills:
                     skill = skill.strip()
                     if skill and len(skill) > 1:
                         parsed['required_skills'].append(skill)
         
         # 提取工作年限要求
-        experience_patterns = [
-            r'(\d+)\s*年以上.*?经验',
-            r'(\d+)\s*年.*?工作经验',
-            r'(\d+)\+\s*years',
-            r'至少\s*(\d+)\s*年'
-        ]
-        
-        for pattern in experience_patterns:
-            matches = re.findall(pattern, requirements)
+        for pattern in _EXPERIENCE_REQUIREMENT_RES:
+            matches = pattern.findall(requirements)
             if matches:
                 try:
                     parsed['min_experience_years'] = int(matches[0])
@@ -127,65 +224,36 @@ class ResumeScreener:
                     continue
         
         # 提取学历要求
-        education_patterns = [
-            r'(本科|学士|bachelor)以上',
-            r'(硕士|master)以上',
-            r'(博士|phd|doctor)',
-            r'(专科|大专)以上'
-        ]
-        
-        for pattern in education_patterns:
-            matches = re.findall(pattern, requirements_lower)
+        for pattern in _EDUCATION_REQUIREMENT_RES:
+            matches = pattern.findall(requirements_lower)
             if matches:
                 parsed['education_requirements'].extend(matches)
         
-        # 提取关键词
-        keyword_patterns = [
-            r'关键词.*?[:：]\s*([^\n]+)',
-            r'优先.*?[:：]\s*([^\n]+)'
-        ]
+        # 要求的学历等级只计算一次，批量筛选时各简历直接复用
+        parsed['min_education_level'] = _education_level(parsed['education_requirements'])
         
-        for pattern in keyword_patterns:
-            matches = re.findall(pattern, requirements, re.IGNORECASE)
+        # 提取关键词
+        for pattern in _KEYWORD_REQUIREMENT_RES:
+            matches = pattern.findall(requirements)
             for match in matches:
-                keywords = re.split(r'[，,、；;]', match)
+                keywords = _LIST_SEPARATOR_RE.split(match)
                 for keyword in keywords:
                     keyword = keyword.strip()
                     if keyword:
                         parsed['keywords'].append(keyword)
         
         # 提取薪资要求
-        salary_patterns = [
-            r'薪资.*?(\d+)[-到至]\s*(\d+)',
-            r'(\d+)k[-到至]\s*(\d+)k',
-            r'月薪.*?(\d+)'
-        ]
-        
-        for pattern in salary_patterns:
-            matches = re.findall(pattern, requirements_lower)
+        for pattern in _SALARY_REQUIREMENT_RES:
+            matches = pattern.findall(requirements_lower)
             if matches:
                 parsed['salary_range'] = matches[0]
                 break
         
-        return parsed
-    
-    def _calculate_skills_match(self, resume_analysis: Dict[str, Any], requirements: Dict[str, Any]) -> float:
-        """计算技能匹配度"""
-        resume_skills = [skill.lower() for skill in resume_analysis.get('skills', [])]
-        required_skills = [skill.lower() for skill in requirements.get('required_skills', [])]
-        
-        if not required_skills:
-            return 1.0  # 如果没有技能要求，返回满分
+        # 标准化的需求技能和小写关键词只计算一次，批量筛选时各简历直接复用
+        parsed['normalized_skills'] = [_normalize_skill(skill) for skill in parsed['required_skills']]
+        parsed['keywords_lower'] = [keyword.lower() for keyword in parsed['keywords']]
         
-        matched_count = 0
-        for required_skill in required_skills:
-            # 模糊匹配
-            for resume_skill in resume_skills:
-                if required_skill in resume_skill or resume_skill in required_skill:
-                    matched_count += 1
-                    break
-        
-        return matched_count / len(required_skills)
+        return parsed
     
     def _calculate_experience_match(self, resume_analysis: Dict[str, Any], requirements: Dict[str, Any]) -> float:
         """计算经验匹配度"""
@@ -206,93 +274,68 @@ class ResumeScreener:
     
     def _calculate_education_match(self, resume_analysis: Dict[str, Any], requirements: Dict[str, Any]) -> float:
         """计算学历匹配度"""
-        resume_education = [edu.lower() for edu in resume_analysis.get('education', [])]
-        required_education = [edu.lower() for edu in requirements.get('education_requirements', [])]
+        required_education = requirements.get('education_requirements', [])
         
         if not required_education:
             return 1.0  # 如果没有学历要求，返回满分
         
-        # 学历等级映射
-        education_levels = {
-            '博士': 4, 'phd': 4, 'doctor': 4,
-            '硕士': 3, 'master': 3,
-            '本科': 2, '学士': 2, 'bachelor': 2,
-            '专科': 1, '大专': 1
-        }
-        
-        # 获取简历最高学历等级
-        resume_max_level = 0
-        for edu in resume_education:
-            for level_name, level_value in education_levels.items():
-                if level_name in edu:
-                    resume_max_level = max(resume_max_level, level_value)
-        
-        # 获取要求最低学历等级
-        required_min_level = 0
-        for edu in required_education:
-            for level_name, level_value in education_levels.items():
-                if level_name in edu:
-                    required_min_level = max(required_min_level, level_value)
+        # 获取要求最低学历等级（解析需求时已计算）
+        required_min_level = requirements.get('min_education_level')
+        if required_min_level is None:
+            required_min_level = _education_level(required_education)
         
         if required_min_level == 0:
             return 1.0
         
-        return min(1.0, resume_max_level / required_min_level)
-    
-    def _calculate_keywords_match(self, resume_analysis: Dict[str, Any], requirements: Dict[str, Any]) -> float:
-        """计算关键词匹配度"""
-        resume_text = resume_analysis.get('raw_text', '').lower()
-        keywords = requirements.get('keywords', [])
-        
-        if not keywords:
-            return 1.0  # 如果没有关键词要求，返回满分
-        
-        matched_count = 0
-        for keyword in keywords:
-            if keyword.lower() in resume_text:
-                matched_count += 1
+        # 获取简历最高学历等级
+        resume_max_level = _education_level(resume_analysis.get('education', []))
         
-        return matched_count / len(keywords)
+        return min(1.0, resume_max_level / required_min_level)
     
-    def _get_matched_skills(self, resume_analysis: Dict[str, Any], requirements: Dict[str, Any]) -> List[str]:
-        """获取匹配的技能列表"""
-        resume_skills = [skill.lower() for skill in resume_analysis.get('skills', [])]
-        required_skills = [skill.lower() for skill in requirements.get('required_skills', [])]
+    def _match_skills(self, resume_analysis: Dict[str, Any], requirements: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        """
+        技能匹配：标准化后先按名称精确查找，未命中时再做模糊匹配（需求技能与简历技能一方作为完整的词包含另一方即视为匹配）
         
-        matched_skills = []
-        for required_skill in required_skills:
-            for resume_skill in resume_analysis.get('skills', []):
-                if required_skill in resume_skill.lower() or resume_skill.lower() in required_skill:
-                    matched_skills.append(resume_skill)
-                    break
+        Returns:
+            Tuple[匹配的简历技能列表, 缺失的需求技能列表]
+        """
+        # 标准化名称 -> 简历中的原始写法（每份简历只标准化一次）
+        resume_skills = {}
+        for skill in resume_analysis.get('skills', []):
+            resume_skills.setdefault(_normalize_skill(skill), skill)
         
-        return matched_skills
-    
-    def _get_missing_skills(self, resume_analysis: Dict[str, Any], requirements: Dict[str, Any]) -> List[str]:
-        """获取缺失的技能列表"""
-        resume_skills = [skill.lower() for skill in resume_analysis.get('skills', [])]
         required_skills = requirements.get('required_skills', [])
+        normalized_skills = requirements.get('normalized_skills')
+        if normalized_skills is None:
+            normalized_skills = [_normalize_skill(skill) for skill in required_skills]
         
+        matched_skills = []
         missing_skills = []
-        for required_skill in required_skills:
-            found = False
-            for resume_skill in resume_skills:
-                if required_skill.lower() in resume_skill or resume_skill in required_skill.lower():
-                    found = True
-                    break
-            if not found:
+        for required_skill, required_norm in zip(required_skills, normalized_skills):
+            resume_skill = resume_skills.get(required_norm)
+            if resume_skill is None:
+                for resume_norm, skill in resume_skills.items():
+                    if _contains_term(resume_norm, required_norm) or _contains_term(required_norm, resume_norm):
+                        resume_skill = skill
+                        break
+            if resume_skill is None:
                 missing_skills.append(required_skill)
+            else:
+                matched_skills.append(resume_skill)
         
-        return missing_skills
+        return matched_skills, missing_skills
     
     def _get_matched_keywords(self, resume_analysis: Dict[str, Any], requirements: Dict[str, Any]) -> List[str]:
         """获取匹配的关键词列表"""
         resume_text = resume_analysis.get('raw_text', '').lower()
         keywords = requirements.get('keywords', [])
+        keywords_lower = requirements.get('keywords_lower')
+        if keywords_lower is None:
+            keywords_lower = [keyword.lower() for keyword in keywords]
         
         matched_keywords = []
-        for keyword in keywords:
-            if keyword.lower() in resume_text:
+        for keyword, keyword_lower in zip(keywords, keywords_lower):
+            if keyword_lower in resume_text:
                 matched_keywords.append(keyword)
         
         return matched_keywords
@@ -6,21 +6,269 @@ API 测试脚本
 """
 
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-import google.generativeai as genai
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+import env_cache
+import openai
+from ai_clients import get_openai_client, get_genai, get_gemini_model, close_gemini_stream
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # 随 google-generativeai 安装，缺失时只对 OpenAI 兼容接口的错误重试
+    google_exceptions = None
 
 # 加载环境变量
-load_dotenv()
+env_cache.load()
+
+# 被限流的测试结果缓存文件，在服务商要求的等待时间内再次运行时直接跳过该测试（留空则不缓存）
+PROBE_CACHE_FILE = os.getenv('PROBE_CACHE_FILE', os.path.join('.cache', 'probe_results.json'))
+# 服务商未返回 Retry-After 时，被限流后跳过测试的秒数
+PROBE_FAILURE_TTL = float(os.getenv('PROBE_FAILURE_TTL', '300'))
+
+# 并发测试时各线程的输出先写入缓冲区，全部完成后按顺序打印，避免输出交错
+_output = threading.local()
+
+def log(text=""):
+    """输出一行（在 run_buffered 中调用时写入当前线程的缓冲区）"""
+    lines = getattr(_output, 'lines', None)
+    if lines is None:
+        print(text)
+    else:
+        lines.append(text)
+
+def _is_retryable(error):
+    """限流、超时、连接失败和服务端错误可以重试；认证失败等其他错误直接返回"""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError,
+                          openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if google_exceptions is not None:
+        return isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable,
+                                  google_exceptions.DeadlineExceeded, google_exceptions.InternalServerError))
+    return False
+
+def _is_quota_error(error):
+    """Gemini 配额超限"""
+    return google_exceptions is not None and isinstance(error, google_exceptions.ResourceExhausted)
+
+def _is_network_error(error):
+    """Gemini 服务不可用、超时或连接失败"""
+    if google_exceptions is not None and isinstance(
+            error, (google_exceptions.ServiceUnavailable, google_exceptions.DeadlineExceeded)):
+        return True
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+def _retry_after(error):
+    """读取服务商返回的 Retry-After 秒数（没有时返回 None）"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class ClientLimiter:
+    """
+    客户端限流：每个 key（服务地址 + 密钥）在 window 秒内最多发出 limit 个请求
+    
+    收到限流响应时将上限减半，之后每过一个时间窗口没有再被限流就翻倍恢复，直到配置的上限
+    """
+    
+    def __init__(self, window=60.0, limit=20):
+        self.window = window
+        self.max_limit = limit
+        self._calls = defaultdict(deque)  # {key: 时间窗口内各请求的发出时间}
+        self._limits = {}  # {key: (当前上限, 上次调整时间)}
+        self._lock = threading.Lock()
+    
+    def _limit(self, key, now):
+        """当前上限（被限流后逐步恢复）"""
+        limit, adjusted_at = self._limits.get(key, (self.max_limit, now))
+        while limit < self.max_limit and now - adjusted_at >= self.window:
+            limit = min(self.max_limit, limit * 2)
+            adjusted_at += self.window
+        self._limits[key] = (limit, adjusted_at)
+        return limit
+    
+    def _expire(self, key, now):
+        calls = self._calls[key]
+        while calls and calls[0] <= now - self.window:
+            calls.popleft()
+        return calls
+    
+    def allow(self, key):
+        """时间窗口内还有余量时登记一次请求并返回 True"""
+        with self._lock:
+            now = time.monotonic()
+            calls = self._expire(key, now)
+            if len(calls) < self._limit(key, now):
+                calls.append(now)
+                return True
+            return False
+    
+    def time_until_slot(self, key):
+        """距离出现可用余量还需等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            calls = self._expire(key, now)
+            excess = len(calls) - self._limit(key, now)
+            if excess < 0:
+                return 0.0
+            return max(0.0, calls[excess] + self.window - now)
+    
+    def wait(self, key):
+        """等待直到可以发出请求"""
+        while not self.allow(key):
+            time.sleep(self.time_until_slot(key))
+    
+    def on_rate_limited(self, key):
+        """收到限流响应，上限减半"""
+        with self._lock:
+            now = time.monotonic()
+            self._limits[key] = (max(1, self._limit(key, now) // 2), now)
+
+# 各测试共用的限流器（相同服务地址和密钥的请求合并计数）
+_limiter = ClientLimiter()
+
+def retry(fn, max_retries=3, base=1.0, cap=30.0, jitter=0.5, limiter_key=None):
+    """
+    调用 fn，遇到可重试的错误时按指数退避（带随机抖动）重试
+    
+    服务商返回 Retry-After 时按其等待，否则等待 min(cap, base * 2^重试次数) 秒并随机浮动 ±jitter。
+    传入 limiter_key 时每次请求（包括重试）前先经过客户端限流。
+    """
+    for attempt in range(max_retries + 1):
+        if limiter_key is not None:
+            _limiter.wait(limiter_key)
+        try:
+            return fn()
+        except Exception as e:
+            if limiter_key is not None and isinstance(e, openai.RateLimitError):
+                _limiter.on_rate_limited(limiter_key)
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = min(cap, base * 2 ** attempt) * (1 + random.uniform(-jitter, jitter))
+            delay = min(cap, delay)
+            log(f"⏳ 请求失败（{type(e).__name__}），{delay:.1f} 秒后重试（{attempt + 1}/{max_retries}）")
+            time.sleep(delay)
+
+def create_completion(client, **kwargs):
+    """
+    以流式方式发送对话请求，收到第一段内容即结束，返回 (第一段内容, 实际使用的 HTTP 协议版本)
+    
+    测试只需确认接口能正常返回，不必等待完整回复。
+    DeepSeek 和 Llama 测试指向同一服务地址，共用一个客户端；安装 h2 后两个并发请求在同一条 HTTP/2 连接上复用
+    """
+    raw = client.chat.completions.with_raw_response.create(stream=True, **kwargs)
+    stream = raw.parse()
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                return chunk.choices[0].delta.content, raw.http_response.http_version
+        return "", raw.http_response.http_version
+    finally:
+        stream.close()  # 提前结束读取，关闭响应流（不再接收剩余内容）
+
+def generate_first_chunk(model, prompt, **kwargs):
+    """以流式方式调用 Gemini，返回第一段内容"""
+    response = model.generate_content(prompt, stream=True, **kwargs)
+    try:
+        for chunk in response:
+            if chunk.parts:
+                return chunk.text
+        return ""
+    finally:
+        close_gemini_stream(response)  # 提前结束读取，关闭响应流
+
+_probe_cache_lock = threading.Lock()
+
+def _read_probe_results():
+    try:
+        with open(PROBE_CACHE_FILE, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def _update_probe_results(update):
+    """读取缓存文件，调用 update 修改后写回（先写临时文件再替换）；写入失败不影响测试"""
+    if not PROBE_CACHE_FILE:
+        return
+    with _probe_cache_lock:
+        results = _read_probe_results()
+        update(results)
+        try:
+            cache_dir = os.path.dirname(PROBE_CACHE_FILE) or '.'
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                    json.dump(results, file, ensure_ascii=False)
+                os.replace(tmp_path, PROBE_CACHE_FILE)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
+
+def cached_failure(key):
+    """该服务地址和模型最近被限流且仍在等待期内时，返回 (距上次失败的秒数, 剩余等待秒数)，否则返回 None"""
+    if not PROBE_CACHE_FILE:
+        return None
+    with _probe_cache_lock:
+        entry = _read_probe_results().get(key)
+    if not entry:
+        return None
+    elapsed = time.time() - entry['ts']
+    remaining = entry['retry_after'] - elapsed
+    return (elapsed, remaining) if remaining > 0 else None
+
+def record_result(key, error=None):
+    """记录测试结果：被限流时记下时间和等待时长，成功或其他错误时清除记录"""
+    def update(results):
+        if error is not None and (isinstance(error, openai.RateLimitError) or _is_quota_error(error)):
+            retry_after = _retry_after(error)
+            results[key] = {
+                'status': type(error).__name__,
+                'ts': time.time(),
+                'retry_after': retry_after if retry_after is not None else PROBE_FAILURE_TTL
+            }
+        else:
+            results.pop(key, None)
+    _update_probe_results(update)
+
+def skip_if_rate_limited(key):
+    """最近被限流且仍在等待期内时输出说明并返回 True"""
+    cached = cached_failure(key)
+    if cached is None:
+        return False
+    elapsed, remaining = cached
+    log(f"⏭️  {elapsed:.0f} 秒前的测试被限流，{remaining:.0f} 秒内跳过（删除 {PROBE_CACHE_FILE} 可立即重新测试）")
+    return True
+
+def run_buffered(test):
+    """执行测试函数，返回 (测试结果, 输出的行)"""
+    _output.lines = []
+    try:
+        return test(), _output.lines
+    finally:
+        _output.lines = None
 
 def print_separator(title=""):
     """打印分隔线"""
     if title:
-        print(f"\n{'='*60}")
-        print(f"  {title}")
-        print('='*60)
+        log(f"\n{'='*60}")
+        log(f"  {title}")
+        log('='*60)
     else:
-        print('-'*60)
+        log('-'*60)
 
 def test_deepseek_openrouter():
     """测试 DeepSeek (通过 OpenRouter)"""
@@ -30,56 +278,60 @@ def test_deepseek_openrouter():
     base_url = os.getenv('OPENAI_BASE_URL')
     model = os.getenv('OPENAI_MODEL')
     
-    print(f"📋 配置信息:")
-    print(f"   API Key: {api_key[:20]}...{api_key[-10:] if api_key else 'None'}")
-    print(f"   Base URL: {base_url}")
-    print(f"   Model: {model}")
+    log(f"📋 配置信息:")
+    log(f"   API Key: {api_key[:20]}...{api_key[-10:] if api_key else 'None'}")
+    log(f"   Base URL: {base_url}")
+    log(f"   Model: {model}")
     
     if not api_key:
-        print("❌ 错误: OPENAI_API_KEY 未配置")
+        log("❌ 错误: OPENAI_API_KEY 未配置")
+        return False
+    
+    cache_key = f"{base_url}|{model}"
+    if skip_if_rate_limited(cache_key):
         return False
     
     try:
-        print("\n🔄 发送测试请求...")
-        client = OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        log("\n🔄 发送测试请求...")
+        # 相同配置的测试复用同一客户端和连接；重试由 retry 统一处理，关闭 SDK 自带的重试
+        client = get_openai_client(api_key, base_url).with_options(max_retries=0)
         
-        response = client.chat.completions.create(
+        result, http_version = retry(lambda: create_completion(
+            client,
             model=model,
             messages=[
                 {"role": "user", "content": "你好，请用一句话介绍你自己"}
             ],
             max_tokens=100,
             temperature=0.7
-        )
+        ), limiter_key=(base_url, api_key))
         
-        result = response.choices[0].message.content
-        print("✅ DeepSeek API 测试成功！")
-        print(f"📝 响应: {result[:150]}...")
+        record_result(cache_key)
+        log("✅ DeepSeek API 测试成功！")
+        log(f"🔗 协议: {http_version}")
+        log(f"📝 首段响应: {result[:150]}...")
         return True
         
     except Exception as e:
-        error_msg = str(e)
-        print(f"❌ DeepSeek API 测试失败!")
-        print(f"📛 错误信息: {error_msg[:200]}")
+        record_result(cache_key, e)
+        log(f"❌ DeepSeek API 测试失败!")
+        log(f"📛 错误信息: {str(e)[:200]}")
         
-        # 分析错误类型
-        if "429" in error_msg:
-            print("\n💡 诊断:")
-            print("   - 错误类型: 速率限制 (Rate Limit)")
-            print("   - 原因: OpenRouter 的免费 DeepSeek 模型被限流")
-            print("   - 建议: ")
-            print("     1. 等待几分钟后重试")
-            print("     2. 注册 OpenRouter 账号并添加自己的 API Key")
-            print("     3. 切换到 Gemini 模型")
-            print("     4. 使用其他免费模型（如 Llama）")
-        elif "401" in error_msg:
-            print("\n💡 诊断:")
-            print("   - 错误类型: 认证失败")
-            print("   - 原因: API Key 无效或已过期")
-            print("   - 建议: 获取新的 OpenRouter API Key")
+        # 按异常类型分析错误
+        if isinstance(e, openai.RateLimitError):
+            log("\n💡 诊断:")
+            log("   - 错误类型: 速率限制 (Rate Limit)")
+            log("   - 原因: OpenRouter 的免费 DeepSeek 模型被限流")
+            log("   - 建议: ")
+            log("     1. 等待几分钟后重试")
+            log("     2. 注册 OpenRouter 账号并添加自己的 API Key")
+            log("     3. 切换到 Gemini 模型")
+            log("     4. 使用其他免费模型（如 Llama）")
+        elif isinstance(e, openai.AuthenticationError):
+            log("\n💡 诊断:")
+            log("   - 错误类型: 认证失败")
+            log("   - 原因: API Key 无效或已过期")
+            log("   - 建议: 获取新的 OpenRouter API Key")
         
         return False
 
@@ -91,76 +343,82 @@ def test_gemini():
     base_url = os.getenv('GOOGLE_BASE_URL')
     model_name = os.getenv('GOOGLE_MODEL')
     
-    print(f"📋 配置信息:")
-    print(f"   API Key: {api_key[:20]}...{api_key[-10:] if api_key else 'None'}")
-    print(f"   Base URL: {base_url}")
-    print(f"   Model: {model_name}")
+    log(f"📋 配置信息:")
+    log(f"   API Key: {api_key[:20]}...{api_key[-10:] if api_key else 'None'}")
+    log(f"   Base URL: {base_url}")
+    log(f"   Model: {model_name}")
     
     if not api_key:
-        print("❌ 错误: GOOGLE_API_KEY 未配置")
+        log("❌ 错误: GOOGLE_API_KEY 未配置")
+        return False
+    
+    cache_key = f"{base_url}|{model_name}"
+    if skip_if_rate_limited(cache_key):
         return False
     
     try:
-        print("\n🔄 发送测试请求...")
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
+        log("\n🔄 发送测试请求...")
+        genai = get_genai()
+        model = get_gemini_model(api_key, model_name)  # 按密钥和模型名缓存，重复测试不再重新初始化
         
-        response = model.generate_content(
+        result = retry(lambda: generate_first_chunk(
+            model,
             "你好，请用一句话介绍你自己",
             generation_config=genai.types.GenerationConfig(
                 max_output_tokens=100,
                 temperature=0.7,
             )
-        )
+        ))
         
-        result = response.text
-        print("✅ Gemini API 测试成功！")
-        print(f"📝 响应: {result[:150]}...")
+        record_result(cache_key)
+        log("✅ Gemini API 测试成功！")
+        log(f"📝 首段响应: {result[:150]}...")
         return True
         
     except Exception as e:
-        error_msg = str(e)
-        print(f"❌ Gemini API 测试失败!")
-        print(f"📛 错误信息: {error_msg[:200]}")
+        record_result(cache_key, e)
+        log(f"❌ Gemini API 测试失败!")
+        log(f"📛 错误信息: {str(e)[:200]}")
         
-        # 分析错误类型
-        if "429" in error_msg or "quota" in error_msg.lower():
-            print("\n💡 诊断:")
-            print("   - 错误类型: 配额超限")
-            print("   - 原因: Gemini 免费配额已用完")
-            print("   - 建议: 等待配额重置或升级到付费版")
-        elif "503" in error_msg or "timeout" in error_msg.lower():
-            print("\n💡 诊断:")
-            print("   - 错误类型: 网络连接问题")
-            print("   - 原因: 无法连接到 Google API 服务")
-            print("   - 建议: ")
-            print("     1. 检查网络连接")
-            print("     2. 使用 VPN（如果在国内）")
-            print("     3. 稍后重试")
+        # 按异常类型分析错误
+        if _is_quota_error(e):
+            log("\n💡 诊断:")
+            log("   - 错误类型: 配额超限")
+            log("   - 原因: Gemini 免费配额已用完")
+            log("   - 建议: 等待配额重置或升级到付费版")
+        elif _is_network_error(e):
+            log("\n💡 诊断:")
+            log("   - 错误类型: 网络连接问题")
+            log("   - 原因: 无法连接到 Google API 服务")
+            log("   - 建议: ")
+            log("     1. 检查网络连接")
+            log("     2. 使用 VPN（如果在国内）")
+            log("     3. 稍后重试")
         
         return False
 
+# OpenRouter 推荐的免费模型（内容固定，导入时拼接好，输出时一次写出）
+FREE_MODELS = (
+    ("meta-llama/llama-3.1-8b-instruct:free", "Llama 3.1 8B (推荐)"),
+    ("meta-llama/llama-3.2-3b-instruct:free", "Llama 3.2 3B"),
+    ("google/gemma-2-9b-it:free", "Gemma 2 9B"),
+    ("mistralai/mistral-7b-instruct:free", "Mistral 7B"),
+    ("deepseek/deepseek-chat-v3.1:free", "DeepSeek Chat (当前被限流)"),
+)
+
+_FREE_MODELS_TEXT = (
+    "\n可选的免费模型列表:\n"
+    + "".join(f"  • {model_id}\n    {description}\n\n" for model_id, description in FREE_MODELS)
+    + "💡 如何切换模型:\n"
+    "   1. 编辑 .env 文件\n"
+    "   2. 修改 OPENAI_MODEL=模型ID\n"
+    "   3. 重启服务或等待热重载"
+)
+
 def list_available_openrouter_models():
     """列出 OpenRouter 可用的免费模型"""
     print_separator("📋 OpenRouter 推荐的免费模型")
-    
-    free_models = [
-        ("meta-llama/llama-3.1-8b-instruct:free", "Llama 3.1 8B (推荐)"),
-        ("meta-llama/llama-3.2-3b-instruct:free", "Llama 3.2 3B"),
-        ("google/gemma-2-9b-it:free", "Gemma 2 9B"),
-        ("mistralai/mistral-7b-instruct:free", "Mistral 7B"),
-        ("deepseek/deepseek-chat-v3.1:free", "DeepSeek Chat (当前被限流)"),
-    ]
-    
-    print("\n可选的免费模型列表:")
-    for model_id, description in free_models:
-        print(f"  • {model_id}")
-        print(f"    {description}\n")
-    
-    print("💡 如何切换模型:")
-    print("   1. 编辑 .env 文件")
-    print("   2. 修改 OPENAI_MODEL=模型ID")
-    print("   3. 重启服务或等待热重载")
+    log(_FREE_MODELS_TEXT)
 
 def test_alternative_model():
     """测试替代模型 (Llama 3.1)"""
@@ -170,56 +428,49 @@ def test_alternative_model():
     base_url = os.getenv('OPENAI_BASE_URL')
     alternative_model = "meta-llama/llama-3.1-8b-instruct:free"
     
-    print(f"📋 测试模型: {alternative_model}")
+    log(f"📋 测试模型: {alternative_model}")
     
     if not api_key:
-        print("❌ 错误: API Key 未配置")
+        log("❌ 错误: API Key 未配置")
+        return False
+    
+    cache_key = f"{base_url}|{alternative_model}"
+    if skip_if_rate_limited(cache_key):
         return False
     
     try:
-        print("\n🔄 发送测试请求...")
-        client = OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        log("\n🔄 发送测试请求...")
+        # 相同配置的测试复用同一客户端和连接；重试由 retry 统一处理，关闭 SDK 自带的重试
+        client = get_openai_client(api_key, base_url).with_options(max_retries=0)
         
-        response = client.chat.completions.create(
+        result, http_version = retry(lambda: create_completion(
+            client,
             model=alternative_model,
             messages=[
                 {"role": "user", "content": "你好，请用中文简单介绍你自己"}
             ],
             max_tokens=100,
             temperature=0.7
-        )
+        ), limiter_key=(base_url, api_key))
         
-        result = response.choices[0].message.content
-        print("✅ Llama 3.1 模型测试成功！")
-        print(f"📝 响应: {result[:150]}...")
+        record_result(cache_key)
+        log("✅ Llama 3.1 模型测试成功！")
+        log(f"🔗 协议: {http_version}")
+        log(f"📝 首段响应: {result[:150]}...")
         
-        print("\n💡 建议:")
-        print("   这个模型可用！可以在 .env 中将 OPENAI_MODEL 改为:")
-        print(f"   OPENAI_MODEL={alternative_model}")
+        log("\n💡 建议:")
+        log("   这个模型可用！可以在 .env 中将 OPENAI_MODEL 改为:")
+        log(f"   OPENAI_MODEL={alternative_model}")
         
         return True
         
     except Exception as e:
-        print(f"❌ 测试失败: {str(e)[:200]}")
+        record_result(cache_key, e)
+        log(f"❌ 测试失败: {str(e)[:200]}")
         return False
 
-def main():
-    """主函数"""
-    print("\n" + "="*60)
-    print("  🚀 AI 模型 API 测试工具")
-    print("="*60)
-    print("\n正在读取 .env 配置...")
-    
-    # 检查 .env 文件
-    if not os.path.exists('.env'):
-        print("❌ 错误: .env 文件不存在！")
-        return
-    
-    print("✅ .env 文件找到\n")
-    
+def print_report(outcomes):
+    """输出各测试的结果、免费模型列表和总结"""
     # 测试统计
     results = {
         'deepseek': False,
@@ -227,45 +478,66 @@ def main():
         'llama': False
     }
     
-    # 执行测试
-    results['deepseek'] = test_deepseek_openrouter()
-    print("\n")
-    
-    results['gemini'] = test_gemini()
-    print("\n")
-    
-    results['llama'] = test_alternative_model()
-    print("\n")
+    for name, (passed, lines) in outcomes.items():
+        results[name] = passed
+        log("\n".join(lines))
+        log("\n")
     
     list_available_openrouter_models()
     
     # 总结
     print_separator("📊 测试总结")
-    print(f"\n测试结果:")
-    print(f"  DeepSeek (OpenRouter): {'✅ 可用' if results['deepseek'] else '❌ 不可用'}")
-    print(f"  Gemini (Google):       {'✅ 可用' if results['gemini'] else '❌ 不可用'}")
-    print(f"  Llama 3.1 (替代):      {'✅ 可用' if results['llama'] else '❌ 不可用'}")
+    log(f"\n测试结果:")
+    log(f"  DeepSeek (OpenRouter): {'✅ 可用' if results['deepseek'] else '❌ 不可用'}")
+    log(f"  Gemini (Google):       {'✅ 可用' if results['gemini'] else '❌ 不可用'}")
+    log(f"  Llama 3.1 (替代):      {'✅ 可用' if results['llama'] else '❌ 不可用'}")
     
-    print("\n🎯 推荐方案:")
+    log("\n🎯 推荐方案:")
     if results['gemini']:
-        print("  ✨ 使用 Gemini 模型（在界面选择 Gemini）")
+        log("  ✨ 使用 Gemini 模型（在界面选择 Gemini）")
     elif results['llama']:
-        print("  ✨ 使用 Llama 3.1 模型")
-        print("     1. 编辑 .env 文件")
-        print("     2. 修改: OPENAI_MODEL=meta-llama/llama-3.1-8b-instruct:free")
-        print("     3. 服务会自动重载")
+        log("  ✨ 使用 Llama 3.1 模型")
+        log("     1. 编辑 .env 文件")
+        log("     2. 修改: OPENAI_MODEL=meta-llama/llama-3.1-8b-instruct:free")
+        log("     3. 服务会自动重载")
     elif results['deepseek']:
-        print("  ✨ DeepSeek 可用（在界面选择 DeepSeek）")
+        log("  ✨ DeepSeek 可用（在界面选择 DeepSeek）")
     else:
-        print("  ⚠️  所有模型都不可用，需要:")
-        print("     1. 检查网络连接")
-        print("     2. 获取有效的 API Key")
-        print("     3. 等待限流恢复")
+        log("  ⚠️  所有模型都不可用，需要:")
+        log("     1. 检查网络连接")
+        log("     2. 获取有效的 API Key")
+        log("     3. 等待限流恢复")
     
+    log("\n" + "="*60)
+    log("  测试完成！")
+    log("="*60 + "\n")
+
+def main():
+    """主函数"""
     print("\n" + "="*60)
-    print("  测试完成！")
-    print("="*60 + "\n")
+    print("  🚀 AI 模型 API 测试工具")
+    print("="*60)
+    print("\n正在读取 .env 配置...")
+    
+    # 检查 .env 文件
+    if not os.path.exists('.env'):
+        print("❌ 错误: .env 文件不存在！")
+        return
+    
+    print("✅ .env 文件找到\n")
+    
+    # 并发执行测试（各请求的网络等待相互重叠，总耗时接近最慢的一个），完成后按顺序输出
+    tests = {
+        'deepseek': test_deepseek_openrouter,
+        'gemini': test_gemini,
+        'llama': test_alternative_model
+    }
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        outcomes = dict(zip(tests, executor.map(run_buffered, tests.values())))
+    
+    # 报告先写入缓冲区，最后一次性输出
+    _, lines = run_buffered(lambda: print_report(outcomes))
+    sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     main()
-
@@ -5,9 +5,11 @@
 测试从 .env 文件动态加载和配置多个 AI 模型
 """
 
+import io
 import os
 import sys
-from dotenv import load_dotenv
+from contextlib import redirect_stdout
+import env_cache
 from config_manager import get_ai_config_manager
 
 def print_separator(title):
@@ -21,7 +23,7 @@ def test_config_loading():
     print_separator("测试配置加载")
     
     # 加载环境变量
-    load_dotenv()
+    env_cache.load()
     
     # 获取配置管理器
     config_manager = get_ai_config_manager()
@@ -57,11 +59,8 @@ def test_model_configs(config_manager):
     """测试模型配置"""
     print_separator("测试模型配置")
     
-    for model in config_manager.get_available_models():
-        model_name = model['value']
-        config = config_manager.get_model_config(model_name)
-        
-        print(f"🔧 {model['display_name']} 配置:")
+    for model_name, config in config_manager.get_all_model_configs().items():
+        print(f"🔧 {config['display_name']} 配置:")
         print(f"   API Key: {config['api_key'][:20]}...{config['api_key'][-10:] if config['api_key'] else 'None'}")
         print(f"   Base URL: {config['base_url']}")
         print(f"   Model: {config['model']}")
@@ -72,16 +71,17 @@ def test_model_availability(config_manager):
     """测试模型可用性"""
     print_separator("测试模型可用性")
     
+    configured = config_manager.get_configured_models()
+    
     # 测试已配置的模型
-    for model in config_manager.get_available_models():
-        model_name = model['value']
-        is_available = config_manager.is_model_available(model_name)
-        print(f"✅ {model['display_name']}: {'可用' if is_available else '不可用'}")
+    for model_name, config in config_manager.get_all_model_configs().items():
+        is_available = model_name in configured
+        print(f"✅ {config['display_name']}: {'可用' if is_available else '不可用'}")
     
     # 测试不存在的模型
     test_models = ['nonexistent', 'invalid', 'test']
     for model in test_models:
-        is_available = config_manager.is_model_available(model)
+        is_available = model in configured
         print(f"❌ {model}: {'可用' if is_available else '不可用'}")
 
 def test_default_model(config_manager):
@@ -150,7 +150,16 @@ DEFAULT_AI_MODEL=deepseek
     print("💡 您可以复制此文件为 .env 并填入真实的 API 密钥")
 
 def main():
-    """主测试函数"""
+    """主测试函数（输出先写入缓冲区，结束后一次性输出）"""
+    buffer = io.StringIO()
+    try:
+        with redirect_stdout(buffer):
+            run_tests()
+    finally:
+        sys.stdout.write(buffer.getvalue())
+
+def run_tests():
+    """依次执行各项测试"""
     print("🚀 动态配置功能测试")
     print("=" * 60)
     
@@ -190,7 +199,7 @@ def main():
     except Exception as e:
         print(f"\n❌ 测试失败: {e}")
         import traceback
-        traceback.print_exc()
+        traceback.print_exc(file=sys.stdout)  # 与其他输出一起写入缓冲区，保持先后顺序
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""合并分析：按模型返回的编号取回各份简历的结果"""
+
+import pytest
+
+import ai_resume_analyzer
+
+
+class FakeCache:
+    def __init__(self):
+        self.keys = []
+    
+    def set(self, key, value):
+        self.keys.append(key)
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = object.__new__(ai_resume_analyzer.AIResumeAnalyzer)
+    analyzer.cache = FakeCache()
+    analyzer.fallbacks = []
+    analyzer._extract = lambda item: {'name': item.get('name')}
+    analyzer.analyze_resume_with_ai = lambda text: analyzer.fallbacks.append(text) or {'name': '单独分析'}
+    return analyzer
+
+
+def reply(analyzer, text):
+    analyzer._chat_with_cache = lambda *args, **kwargs: (text, 'key')
+
+
+def test_string_indexes_are_accepted(analyzer):
+    reply(analyzer, '{"results": [{"index": "1", "name": "张三"}, {"index": 2, "name": "李四"}]}')
+    results = analyzer._analyze_marshaled_group(['简历一', '简历二'])
+    assert [r['name'] for r in results] == ['张三', '李四']
+    assert analyzer.fallbacks == []
+    assert analyzer.cache.keys == ['key']
+
+
+def test_out_of_range_index_is_not_cached(analyzer):
+    reply(analyzer, '{"results": [{"index": 0, "name": "张三"}, {"index": 2, "name": "李四"}]}')
+    results = analyzer._analyze_marshaled_group(['简历一', '简历二'])
+    assert [r['name'] for r in results] == ['单独分析', '李四']
+    assert analyzer.fallbacks == ['简历一']
+    assert analyzer.cache.keys == []
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""池存储：按文件内容哈希查找文档"""
+
+import pytest
+
+import pool_store
+
+
+@pytest.fixture(params=['local', 'sqlite'])
+def pool(request, tmp_path):
+    if request.param == 'local':
+        return pool_store.LocalPool()
+    return pool_store.SQLitePool(str(tmp_path / 'pools.db'), 'resume_pool')
+
+
+def test_find_by_hash(pool):
+    pool['a'] = {'filename': 'a.txt', 'content_hash': b'\x01', 'embedding': None}
+    pool['b'] = {'filename': 'b.txt', 'content_hash': b'\x02', 'embedding': None}
+    assert pool.find_by_hash(b'\x01') == 'a'
+    assert pool.find_by_hash(b'\x03') is None
+    
+    pool.pop('a')
+    assert pool.find_by_hash(b'\x01') is None
+    assert pool.find_by_hash(b'\x02') == 'b'
+    
+    pool.clear()
+    assert pool.find_by_hash(b'\x02') is None
+
+
+def test_pop_missing_keeps_version(pool):
+    pool['a'] = {'filename': 'a.txt', 'content_hash': b'\x01', 'embedding': None}
+    version = pool.version
+    assert pool.pop('missing', None) is None
+    assert pool.version == version
+    assert pool.pop('a')['filename'] == 'a.txt'
+    assert pool.version > version
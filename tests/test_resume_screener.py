@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""简历筛选器的技能匹配"""
+
+from resume_screener import ResumeScreener
+
+
+def match(resume_skills, required_skills):
+    return ResumeScreener()._match_skills({'skills': resume_skills}, {'required_skills': required_skills})
+
+
+def test_golang_does_not_match_django_or_mongodb():
+    assert match(['django', 'python'], ['Golang', 'node']) == ([], ['Golang', 'node'])
+    assert match(['MongoDB'], ['Golang']) == ([], ['Golang'])
+
+
+def test_aliases_match_exactly():
+    assert match(['Go', 'Node.js'], ['Golang', 'node']) == (['Go', 'Node.js'], [])
+
+
+def test_fuzzy_match_requires_whole_words():
+    assert match(['Spring Boot'], ['spring']) == (['Spring Boot'], [])
+    assert match(['JavaScript'], ['Java']) == ([], ['Java'])
+    assert match(['机器学习算法'], ['机器学习']) == (['机器学习算法'], [])
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""上传去重：相同内容的简历直接返回已有记录，分析失败的记录重新分析"""
+
+import importlib
+import io
+import os
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """在临时目录中导入应用（数据库、上传目录和日志都写在临时目录下）"""
+    monkeypatch.chdir(tmp_path)
+    for name in ('app', 'db'):
+        sys.modules.pop(name, None)
+    module = importlib.import_module('app')
+    module.init_database()
+    monkeypatch.setattr(module, 'is_ai_enabled', lambda model_type: False)
+    monkeypatch.setattr(module, 'get_analyzer', lambda model_type: None)
+    yield module
+    for name in ('app', 'db'):
+        sys.modules.pop(name, None)
+
+
+def upload(client, content):
+    response = client.post(
+        '/upload',
+        data={'files': (io.BytesIO(content), 'resume.txt')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    return response.get_json()['files'][0]
+
+
+def test_failed_resume_is_reanalyzed_on_reupload(app_module, monkeypatch):
+    results = iter([
+        {'error': '分析简历时出错: rate limited'},
+        {'name': '张三', 'skills': ['python'], 'experience_years': 3, 'raw_text': '张三 python'},
+    ])
+    calls = []
+    
+    def analyze_resume(file_path):
+        calls.append(file_path)
+        return next(results)
+    
+    monkeypatch.setattr(app_module.resume_analyzer, 'analyze_resume', analyze_resume)
+    client = app_module.app.test_client()
+    content = '张三 python 3年经验'.encode('utf-8')
+    
+    failed = upload(client, content)
+    assert failed['status'] == 'failed'
+    assert not failed.get('duplicate')
+    
+    retried = upload(client, content)
+    assert len(calls) == 2
+    assert not retried.get('duplicate')
+    assert retried['status'] == 'done'
+    assert retried['analysis']['name'] == '张三'
+    assert retried['id'] == failed['id']
+    
+    # 分析成功后再次上传直接返回已有记录
+    duplicate = upload(client, content)
+    assert len(calls) == 2
+    assert duplicate['duplicate'] is True
+    assert duplicate['id'] == failed['id']
+    assert duplicate['analysis']['name'] == '张三'
+
+
+def add_to_pool(client, content):
+    response = client.post(
+        '/api/batch_add_resume',
+        data={'file': (io.BytesIO(content), 'resume.txt')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_failed_pool_entry_is_replaced_on_reupload(app_module, monkeypatch):
+    parse_errors = iter([True, False])
+    
+    class Screener:
+        def add_resume_to_pool(self, doc_id, file_path, filename, pool):
+            pool[doc_id] = {
+                'filename': filename,
+                'file_path': file_path,
+                'raw_text': '',
+                'basic_info': {'name': '张三', 'skills': []},
+                'embedding': None,
+                'parse_error': next(parse_errors)
+            }
+            return {'success': True, 'doc_id': doc_id, 'filename': filename}
+    
+    monkeypatch.setattr(app_module, 'get_batch_screener', lambda model_type: Screener())
+    client = app_module.app.test_client()
+    content = '张三 python 3年经验'.encode('utf-8')
+    
+    failed = add_to_pool(client, content)
+    failed_path = app_module.global_resume_pool.get(failed['doc_id'])['file_path']
+    
+    retried = add_to_pool(client, content)
+    assert not retried.get('duplicate')
+    assert retried['doc_id'] == failed['doc_id']
+    entry = app_module.global_resume_pool.get(failed['doc_id'])
+    assert entry['parse_error'] is False
+    assert entry['file_path'] != failed_path
+    assert len(app_module.global_resume_pool) == 1
+    
+    duplicate = add_to_pool(client, content)
+    assert duplicate['duplicate'] is True
+    assert duplicate['doc_id'] == failed['doc_id']
+
+
+def test_files_before_a_failing_file_are_saved(app_module, monkeypatch):
+    def analyze_resume(file_path):
+        with open(file_path, encoding='utf-8') as f:
+            text = f.read()
+        if '出错' in text:
+            raise RuntimeError('boom')
+        return {'name': '张三', 'skills': ['python'], 'experience_years': 3, 'raw_text': text}
+    
+    monkeypatch.setattr(app_module.resume_analyzer, 'analyze_resume', analyze_resume)
+    client = app_module.app.test_client()
+    response = client.post(
+        '/upload',
+        data={'files': [
+            (io.BytesIO('张三 python'.encode('utf-8')), 'a.txt'),
+            (io.BytesIO('出错'.encode('utf-8')), 'b.txt'),
+        ]},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 500
+    saved = response.get_json()['files']
+    assert [f['filename'] for f in saved] == ['a.txt']
+    assert saved[0]['id'] is not None
+    
+    with app_module.get_conn() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM resumes').fetchone()[0] == 1
+    # 出错的文件不保留在上传目录中
+    upload_folder = app_module.app.config['UPLOAD_FOLDER']
+    assert len(os.listdir(upload_folder)) == 1
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本处理工具 - 轻量级文本向量化、相似度计算与截断
+使用字符二元组哈希向量，无需额外模型依赖，对中文简历同样适用
+"""
+
+import re
+import math
+import zlib
+from array import array
+from typing import List, Tuple
+
+# 向量维度
+EMBEDDING_DIM = 1024
+
+# 发送给大模型的简历文本长度上限（字符数）
+RESUME_CHAR_LIMIT = 3000
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> array:
+    """
+    将文本转换为L2归一化的字符二元组哈希向量
+
+    Args:
+        text: 文本内容
+        dim: 向量维度
+
+    Returns:
+        float32 向量
+    """
+    vector = array('f', bytes(4 * dim))
+    normalized = _WHITESPACE_RE.sub('', text.lower())
+
+    for i in range(len(normalized) - 1):
+        bucket = zlib.crc32(normalized[i:i + 2].encode('utf-8')) % dim
+        vector[bucket] += 1.0
+
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm:
+        for i in range(dim):
+            vector[i] /= norm
+
+    return vector
+
+
+def cosine_similarity(a: array, b: array) -> float:
+    """计算两个已归一化向量的余弦相似度"""
+    return sum(x * y for x, y in zip(a, b))
+
+
+def sparse_terms(vector: array) -> List[Tuple[int, float]]:
+    """
+    取出向量的非零分量 [(下标, 值), ...]
+
+    查询等短文本只有少量非零分量，与大量简历向量比较时先取出非零分量，
+    每次只需计算这些分量的乘积（配合 sparse_similarity 使用）
+    """
+    return [(i, value) for i, value in enumerate(vector) if value]
+
+
+def sparse_similarity(terms: List[Tuple[int, float]], vector: array) -> float:
+    """计算稀疏表示的向量与另一个向量的余弦相似度（均已归一化）"""
+    return sum(value * vector[i] for i, value in terms)
+
+
+def truncate_text(text: str, max_chars: int = RESUME_CHAR_LIMIT, tail_ratio: float = 0.25) -> str:
+    """
+    截断过长的文本，同时保留开头和结尾
+
+    简历的技能、证书等信息常位于末尾，直接截取开头会丢失这部分内容。
+    截断位置尽量落在换行处，避免切断一行文字。
+
+    Args:
+        text: 文本内容
+        max_chars: 截断后的最大字符数
+        tail_ratio: 结尾部分所占比例
+
+    Returns:
+        截断后的文本
+    """
+    if len(text) <= max_chars:
+        return text
+
+    separator = '\n…\n'
+    budget = max_chars - len(separator)
+    tail_chars = int(budget * tail_ratio)
+    head_chars = budget - tail_chars
+
+    head = text[:head_chars]
+    cut = head.rfind('\n')
+    if cut > head_chars * 0.8:
+        head = head[:cut]
+
+    tail = text[-tail_chars:] if tail_chars else ''
+    cut = tail.find('\n')
+    if 0 <= cut < tail_chars * 0.2:
+        tail = tail[cut + 1:]
+
+    return head + separator + tail
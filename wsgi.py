@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生产环境入口 - 供 gunicorn 等 WSGI 服务器加载
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app, init_database, warm_up_ai_analyzer
+
+# 开发环境下由 app.py 的 __main__ 完成以下初始化，生产环境在此完成
+init_database()
+warm_up_ai_analyzer()